@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 
 from src.Core.Services.BattleService import init_service, get_service
 # Use new BattleWebServer from Core
-from src.Core import BattleWebServer
+from src.Core import BattleWebServer, AsyncBattleWebServer, Config
 
 load_dotenv()
 
@@ -39,8 +39,10 @@ def main():
     # Start web server
     print("[Headless] Starting web server on http://0.0.0.0:5010")
     
-    # Instantiate BattleWebServer with service provider callback
-    web_server = BattleWebServer(service_provider=get_service)
+    # Instantiate the web server with service provider callback
+    # (BATTLE_SERVER_MODE=asgi: python-socketio + uvicorn, frames processed off the event loop)
+    server_class = AsyncBattleWebServer if Config.SERVER_MODE == "asgi" else BattleWebServer
+    web_server = server_class(service_provider=get_service)
     web_server.start(host='0.0.0.0', port=5010)
 
 
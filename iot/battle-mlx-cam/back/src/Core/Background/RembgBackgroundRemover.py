@@ -0,0 +1,88 @@
+"""RembgBackgroundRemover - rembg/ONNX background removal with a warm session on a dedicated worker."""
+import io
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+from src.Framework.Background.AbstractBackgroundRemover import AbstractBackgroundRemover
+from src.Core.Config import Config
+
+try:
+    import rembg
+except ImportError:  # Optional dependency (pip install rembg)
+    rembg = None
+
+
+class RembgBackgroundRemover(AbstractBackgroundRemover):
+    """
+    Background removal for Linux render boxes (no macOS Vision).
+
+    - One ONNX session, created once (`model`: u2netp, isnet-general-use,
+      silueta...) instead of rembg.remove() building one per call.
+    - Input is decoded once and capped to `input_size` (the 560x420 Flux
+      output), so the mask is never computed or upscaled beyond it.
+    - alpha_only=True applies the predicted mask as the alpha channel only,
+      skipping rembg's cutout compositing.
+    - All inference runs on a single dedicated worker that owns the session,
+      so removal for one role overlaps the next Fal request of the other.
+    """
+
+    def __init__(self, model: str = Config.BG_REMOVAL_MODEL, input_size: tuple[int, int] = Config.BG_REMOVAL_INPUT_SIZE,
+                 alpha_only: bool = Config.BG_REMOVAL_ALPHA_ONLY, warm_up: bool = True):
+        if rembg is None:
+            raise ImportError("RembgBackgroundRemover requires rembg (pip install rembg)")
+        self.model = model
+        self.input_size = input_size
+        self.alpha_only = alpha_only
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BackgroundRemoval")
+        if warm_up:
+            # Load the model in the background so the first battle image does not pay for it
+            self._worker.submit(self._get_session)
+
+    # --- PUBLIC API ---
+
+    def remove_background(self, image_bytes: bytes) -> tuple[bytes, float]:
+        """Blocking wrapper: run on the background-removal worker and wait."""
+        return self.submit(image_bytes).result()
+
+    def submit(self, image_bytes: bytes) -> Future:
+        """Queue a removal on the dedicated worker; resolves to (png bytes, seconds)."""
+        return self._worker.submit(self._remove, image_bytes)
+
+    def close(self) -> None:
+        self._worker.shutdown(wait=False, cancel_futures=True)
+
+    # --- INTERNALS ---
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                start = time.time()
+                self._session = rembg.new_session(self.model)
+                print(f"[RembgBackgroundRemover] Session '{self.model}' ready ({time.time() - start:.2f}s)")
+            return self._session
+
+    def _remove(self, image_bytes: bytes) -> tuple[bytes, float]:
+        start = time.time()
+        try:
+            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            image.thumbnail(self.input_size)
+
+            session = self._get_session()
+            if self.alpha_only:
+                mask = rembg.remove(image, session=session, only_mask=True)
+                output = image.copy()
+                output.putalpha(mask.convert("L"))
+            else:
+                output = rembg.remove(image, session=session)
+
+            buffer = io.BytesIO()
+            output.save(buffer, format="PNG")
+            return buffer.getvalue(), time.time() - start
+        except Exception as e:
+            print(f"⚠️ rembg failed: {e}")
+            return image_bytes, time.time() - start
@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 # Load .env file from up up directory relative to this file? 
@@ -30,10 +31,88 @@ class Config:
         """Get WebSocket server URL."""
         return os.getenv("WS_URL", "ws://127.0.0.1:8000/ws")
 
+    @staticmethod
+    def get_public_url() -> str:
+        """Base URL other Rift devices use to reach this backend (served images)."""
+        url = os.getenv("BATTLE_PUBLIC_URL")
+        if url:
+            return url.rstrip("/")
+        try:
+            # No packet is sent: connect() on UDP only selects the outgoing interface
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("10.255.255.255", 1))
+                host = s.getsockname()[0]
+        except OSError:
+            host = "127.0.0.1"
+        return f"http://{host}:5010"
+
     # --- CONSTANTS ---
     
     # Threshold for KNN distance (lower = stricter)
     KNN_DISTANCE_THRESHOLD = 13.0
+
+    # KNN query mode
+    KNN_K = 1                   # Neighbours for majority voting (1 = plain nearest neighbour)
+    KNN_USE_CENTROIDS = False   # Fast mode: compare against per-label centroids only
+
+    # Per-role temporal smoothing (RecognitionStream): only stable labels validate / generate
+    KNN_MIN_MARGIN = 1.0        # Min distance gap between the best and second-best label
+    KNN_VOTE_WINDOW = 3         # Sliding window of recent frames (front cameras send one every 2s)
+    KNN_VOTE_MIN = 2            # Frames of the window that must agree on a label
+
+    # KNN feature extractor (MobileNetV2)
+    KNN_EXTRACTOR_BACKEND = os.getenv("KNN_EXTRACTOR_BACKEND", "torch")  # torch (fp32) | torch-int8 | onnx (needs onnxruntime)
+    KNN_INPUT_SIZE = int(os.getenv("KNN_INPUT_SIZE", "224"))  # 160 = ~2x fewer FLOPs, embeddings drift: check with benchmark_extractors.py
+    KNN_MODEL_DIR = os.path.join(base_dir, "model")          # Datasets and exported ONNX models
+    KNN_WEIGHTS_DIR = os.path.join(KNN_MODEL_DIR, "weights")  # Pretrained weights, loaded offline (fetch: python -m src.Core.Recognition.ModelArtifacts)
+
+    # Change detection before decode + KNN (ChangeDetector, per role)
+    CHANGE_DETECTION = True     # Reuse the last frame's result while the camera image is unchanged
+    CHANGE_THUMB_SIZE = 32      # Grayscale thumbnail side (px) compared between frames
+    CHANGE_PIXEL_DELTA = 16     # Min gray-level difference for a thumbnail pixel to count as changed
+    CHANGE_MIN_RATIO = 0.01     # Share of changed pixels that makes a frame "changed" (~10 of 32x32)
+    CHANGE_REFRESH_S = 10.0     # Force a full decode + KNN at least this often
+
+    # Embedding cache (skip MobileNetV2 for frames already embedded)
+    EMBEDDING_CACHE_SIZE = 256              # Max vectors kept (LRU), 0 = disabled
+    EMBEDDING_CACHE_PHASH = False           # Also match near-identical frames by perceptual hash
+    EMBEDDING_CACHE_PHASH_TOLERANCE = 4     # Max differing bits (out of 64) for a perceptual match
+
+    # Micro-batching of MobileNetV2 inference (dream + nightmare in one pass)
+    KNN_BATCH_MAX_SIZE = 8      # Max frames per forward pass
+    KNN_BATCH_MAX_WAIT_MS = 4   # Max time to wait for other frames before running
+
+    # AI generation pipeline (recognize -> generate -> matte -> publish)
+    GENERATION_MAX_WORKERS = 2  # Generate stage workers: concurrent Fal requests (one per role)
+    PIPELINE_MATTE_WORKERS = 1  # Background-removal stage workers (CPU/GPU bound)
+    PIPELINE_QUEUE_SIZE = 2     # Max jobs waiting in front of each stage (full = upstream waits)
+
+    # Fal.ai editor
+    FAL_BASE_URL = os.getenv("FAL_BASE_URL", "https://queue.fal.run")  # Queue API root (point at tests/fake_fal_server.py to benchmark offline)
+    FAL_ASYNC_EDITOR = os.getenv("FAL_ASYNC_EDITOR", "0") == "1"  # asyncio + HTTP/2 editor (needs httpx)
+    FAL_STREAM_STATUS = True    # Async editor: follow the SSE status stream, poll as fallback
+    FAL_POLL_INITIAL_MS = 50    # Async editor: first poll delay, then x1.5 backoff
+    FAL_POLL_MAX_MS = 1000      # Async editor: max poll delay
+    FAL_TIMEOUT_S = 60          # Async editor: max time for one generation
+    FAL_MAX_CONNECTIONS = 8     # Async editor: pooled connections to Fal
+
+    # Background removal
+    BG_REMOVAL_ENGINE = os.getenv("BG_REMOVAL_ENGINE", "auto")  # auto (Vision on macOS, else rembg) | vision | rembg
+    BG_REMOVAL_MODEL = os.getenv("BG_REMOVAL_MODEL", "u2netp")  # rembg: u2netp (fast) | isnet-general-use | silueta
+    BG_REMOVAL_INPUT_SIZE = (560, 420)  # rembg: cap input to the Flux output size
+    BG_REMOVAL_ALPHA_ONLY = False       # rembg: only apply the mask as alpha (skip cutout compositing)
+
+    # Generated-image cache (same prompt + same input hash = no Fal call, persisted on disk)
+    GENERATION_CACHE = False            # Opt-in
+    GENERATION_CACHE_DIR = os.path.join(base_dir, "cache", "generations")
+    GENERATION_CACHE_MAX_MB = 200
+    GENERATION_CACHE_PHASH_TOLERANCE = 0   # >0 also reuses inputs within this many dHash bits (out of 64); 0 = exact bytes only
+
+    # Speculative generation (start Fal before KNN confirms the counter)
+    SPECULATIVE_GENERATION = False      # Opt-in
+    SPECULATIVE_LIKELY_DISTANCE = 16.0  # Start when the required label's nearest sample is this close
+    SPECULATIVE_MAX_AGE_S = 8.0         # Older speculations are not promoted (drawing has changed)
+    SPECULATIVE_MAX_INFLIGHT = 2        # Worker threads for blocking editors
     
     # Labels that should NOT trigger 'recognised: true'
     NON_RECOGNITION_LABELS = ["empty"]
@@ -42,6 +121,28 @@ class Config:
     CAMERA_ZOOM = 2.0       # 1.0 = No zoom, 2.0 = 2x zoom (center)
     LOW_LIGHT_BOOST = True  # Enhance brightness/contrast for dark environments
 
+    # Web server
+    SERVER_MODE = os.getenv("BATTLE_SERVER_MODE", "threading")  # threading (Flask-SocketIO/Werkzeug) | asgi (python-socketio + uvicorn)
+    SOCKETIO_MAX_PAYLOAD_BYTES = 10 * 1024 * 1024
+    ASGI_FRAME_WORKERS = 2      # ASGI: threads decoding/KNN-ing frames (latest frame per role wins while they are busy)
+    ASGI_EVENT_WORKERS = 4      # ASGI: threads running the other socket events
+    ASGI_HTTP_WORKERS = 8       # ASGI: threads running Flask REST requests (concurrently, like threading mode)
+
+    # Socket.IO fan-out
+    PREVIEW_MAX_FPS = 5         # Max preview frames/s per subscribed client (latest frame wins)
+    STATUS_MAX_RATE_HZ = 5      # Max status updates/s (bursts are coalesced into one diff)
+    STATUS_HISTORY_SIZE = 100   # Status patches kept for /status?since=<version>
+
+    # Latency tracing (/metrics, /debug/traces)
+    TRACE_BUFFER_SIZE = 200     # Finished frame traces kept for /debug/traces
+    FRAME_RECORD_DIR = os.getenv("BATTLE_RECORD_DIR")  # Save incoming camera frames to <dir>/<role>/ (replayed by lab/benchmarks/benchmark_pipeline.py)
+
+    # Rift state sync
+    RIFT_DEVICE_ID = "battle-camera"
+    RIFT_LARGE_FIELD_CHARS = 4096   # Values above this (base64 images) are only sent when freshly produced, never echoed
+    IMAGE_OFFLOAD = True            # Publish generated images as /images/<id> URLs + hash instead of inline base64
+    IMAGE_STORE_MAX_MB = 64         # In-memory budget of served images (LRU)
+
     # Camera Compression Defaults
     JPEG_QUALITY = 85           # 1-100
     CAPTURE_SCALE = 1.0         # 0.25-1.0
@@ -0,0 +1,213 @@
+"""AsyncFalFluxEditor - asyncio Fal.ai queue client with pooled HTTP/2 and streamed status."""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from src.Core.Config import Config
+from src.Core.Editors.FalFluxEditor import FalFluxEditor
+from src.Core.Services.Tracer import record
+
+try:
+    import httpx
+except ImportError:  # Optional dependency (pip install httpx[http2])
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AsyncFalFluxEditor(FalFluxEditor):
+    """
+    Fal.ai Flux editor running on a shared asyncio loop.
+
+    - One pooled httpx.AsyncClient (HTTP/2 when `h2` is installed) for submit,
+      status, result and image download - connections are reused.
+    - Status: the queue's SSE stream (`<status_url>/stream`) when available,
+      otherwise adaptive polling (starts fast, backs off exponentially).
+    - Any number of requests can be in flight; the loop runs in one daemon
+      thread, so callers do not hold a thread per HTTP round-trip.
+
+    edit_image() keeps the blocking AbstractEditor contract for the existing
+    pipeline; submit() returns a Future so one caller can fan out requests.
+    """
+
+    def __init__(self, model: str = FalFluxEditor.DEFAULT_MODEL, base_url: str = FalFluxEditor.DEFAULT_BASE_URL,
+                 use_stream: bool = Config.FAL_STREAM_STATUS):
+        if httpx is None:
+            raise ImportError("AsyncFalFluxEditor requires httpx (pip install 'httpx[http2]')")
+        super().__init__(model=model, base_url=base_url)
+        self.use_stream = use_stream
+        self.poll_initial_s = Config.FAL_POLL_INITIAL_MS / 1000.0
+        self.poll_max_s = Config.FAL_POLL_MAX_MS / 1000.0
+        self.timeout_s = Config.FAL_TIMEOUT_S
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: "httpx.AsyncClient | None" = None
+        self._loop_lock = threading.Lock()
+
+    # --- PUBLIC API ---
+
+    def edit_image(self, image_bytes: bytes, prompt: str) -> tuple[bytes | None, float]:
+        """Blocking wrapper: schedule on the editor loop and wait for the result."""
+        return self.submit(image_bytes, prompt).result()
+
+    def edit_prepared(self, compressed: bytes, prompt: str) -> tuple[bytes | None, float]:
+        """Blocking wrapper around submit_prepared()."""
+        return self.submit_prepared(compressed, prompt).result()
+
+    def submit(self, image_bytes: bytes, prompt: str) -> Future:
+        """Schedule a generation on the editor loop; resolves to (bytes | None, seconds)."""
+        # Resize/encode in the caller thread so the event loop never runs PIL work
+        compressed = self._prepare_input(image_bytes)
+        if compressed is None:
+            return self._done(None, 0.0)
+        return self.submit_prepared(compressed, prompt)
+
+    def submit_prepared(self, compressed: bytes, prompt: str) -> Future:
+        """submit() for an input already returned by _prepare_input()."""
+        start = time.time()
+
+        key = self._get_api_key()
+        if not key:
+            print("[AsyncFalFluxEditor] FAL_KEY not found in environment")
+            return self._done(None, 0.0)
+
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._edit(compressed, prompt, key, start), loop)
+
+    async def _edit(self, compressed: bytes, prompt: str, key: str, start: float) -> tuple[bytes | None, float]:
+        headers = {"Authorization": f"Key {key}"}
+        payload = self._build_payload(compressed, prompt)
+
+        prompt_preview = prompt[:50] + "..." if len(prompt) > 50 else prompt
+        print(f"[AsyncFalFluxEditor] 🚀 Starting inference ({self.model}) | Prompt: \"{prompt_preview}\"")
+
+        try:
+            output_bytes = await asyncio.wait_for(self._run(headers, payload), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            print(f"[AsyncFalFluxEditor] ❌ Timed out after {self.timeout_s}s")
+            return None, 0.0
+        except Exception as e:
+            print(f"[AsyncFalFluxEditor] Exception during inference: {e}")
+            return None, 0.0
+
+        if output_bytes is None:
+            return None, 0.0
+
+        elapsed = time.time() - start
+        print(f"[AsyncFalFluxEditor] ✅ Inference complete | Duration: {elapsed:.2f}s")
+        return output_bytes, elapsed
+
+    def close(self) -> None:
+        """Close the HTTP client and stop the loop thread."""
+        with self._loop_lock:
+            loop, client = self._loop, self._client
+            self._loop, self._client = None, None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    @staticmethod
+    def _done(*result) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    # --- QUEUE PROTOCOL ---
+
+    async def _run(self, headers: dict, payload: dict) -> bytes | None:
+        client = self._client
+        submit_start = time.perf_counter()
+        response = await client.post(self.api_url, headers=headers, json=payload)
+        record("fal.submit", submit_start)
+        if response.status_code != 200:
+            print(f"[AsyncFalFluxEditor] ❌ API error {response.status_code}: {response.text[:100]}")
+            return None
+
+        result = response.json()
+
+        if result.get("status") == "IN_QUEUE" or "request_id" in result:
+            status_url = result.get("status_url")
+            response_url = result.get("response_url")
+            if not status_url:
+                print("[AsyncFalFluxEditor] Missing status URL in response")
+                return None
+
+            status = await self._wait_for_completion(client, status_url, headers, {"submitted": time.perf_counter()})
+            if status != "COMPLETED":
+                print(f"[AsyncFalFluxEditor] Transform failed: {status}")
+                return None
+
+            result = (await client.get(response_url, headers=headers)).json()
+
+        if "images" not in result or len(result["images"]) == 0:
+            print("[AsyncFalFluxEditor] No images in response")
+            return None
+
+        image_url = result["images"][0].get("url", "")
+        output_bytes = self._decode_data_uri(image_url)
+        if output_bytes is None:
+            download_start = time.perf_counter()
+            output_bytes = (await client.get(image_url)).content
+            record("fal.download", download_start)
+        return output_bytes
+
+    async def _wait_for_completion(self, client, status_url: str, headers: dict, phases: dict) -> str:
+        if self.use_stream:
+            status = await self._stream_status(client, status_url, headers, phases)
+            if status is not None:
+                return status
+        return await self._poll_status(client, status_url, headers, phases)
+
+    async def _stream_status(self, client, status_url: str, headers: dict, phases: dict) -> str | None:
+        """Follow the SSE status stream. Returns None if streaming is unavailable."""
+        try:
+            async with client.stream("GET", f"{status_url}/stream", headers=headers) as resp:
+                if resp.status_code != 200:
+                    return None
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    status = json.loads(line[5:].strip()).get("status", "")
+                    self._track_status(status, phases)
+                    if status in ("COMPLETED", "FAILED", "CANCELLED"):
+                        return status
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"[AsyncFalFluxEditor] Status stream unavailable ({e}), falling back to polling")
+        return None
+
+    async def _poll_status(self, client, status_url: str, headers: dict, phases: dict) -> str:
+        """Adaptive polling: FAL_POLL_INITIAL_MS, backing off x1.5 up to FAL_POLL_MAX_MS."""
+        delay = self.poll_initial_s
+        while True:
+            status = (await client.get(status_url, headers=headers)).json().get("status", "")
+            self._track_status(status, phases)
+            if status in ("COMPLETED", "FAILED", "CANCELLED"):
+                return status
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, self.poll_max_s)
+
+    # --- EVENT LOOP ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="AsyncFalFluxEditor", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    limits=httpx.Limits(max_connections=Config.FAL_MAX_CONNECTIONS,
+                                        max_keepalive_connections=Config.FAL_MAX_CONNECTIONS),
+                )
+                self._loop = loop
+        return self._loop
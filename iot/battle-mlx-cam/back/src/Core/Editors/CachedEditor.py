@@ -0,0 +1,184 @@
+"""CachedEditor - Persistent LRU cache of generated images in front of an editor."""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+from src.Framework.Editors.AbstractEditor import AbstractEditor
+from src.Core.Config import Config
+from src.Core.Recognition.EmbeddingCache import EmbeddingCache
+
+
+@dataclass
+class _CacheEntry:
+    model: str
+    prompt: str
+    phash: Optional[int]    # Input dHash, only kept when near matching is enabled
+    size: int
+    last_used: float
+
+
+class CachedEditor(AbstractEditor):
+    """
+    Wraps an editor and reuses results for (model, prompt, input hash).
+
+    The key uses a SHA-256 of the *preprocessed* input (the 560x420 JPEG
+    actually sent to Fal), so by default only byte-identical inputs hit. A
+    `tolerance` > 0 opts into near hits: the output of an earlier re-draw whose
+    64-bit dHash is within that many bits is reused too. Outputs live on disk
+    (one file per entry + index.json) and survive restarts; the total size is
+    bounded and least-recently-used entries are evicted first.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, editor: AbstractEditor, cache_dir: str = Config.GENERATION_CACHE_DIR,
+                 max_bytes: int = Config.GENERATION_CACHE_MAX_MB * 1024 * 1024,
+                 tolerance: int = Config.GENERATION_CACHE_PHASH_TOLERANCE):
+        self.editor = editor
+        self.model = getattr(editor, "model", type(editor).__name__)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._entries: dict[str, _CacheEntry] = self._load_index()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    # --- EDITOR API ---
+
+    def edit_image(self, image_bytes: bytes, prompt: str) -> tuple[bytes | None, float]:
+        start = time.time()
+        # Hash what Fal would actually receive (same resize as the wrapped editor)
+        prepare = getattr(self.editor, "_prepare_input", None)
+        prepared = prepare(image_bytes) if prepare else image_bytes
+        if not prepared:
+            return self.editor.edit_image(image_bytes, prompt)
+        content_hash = hashlib.sha256(prepared).hexdigest()
+        phash = EmbeddingCache.perceptual_hash(prepared) if self.tolerance > 0 else None
+
+        cached = self._lookup(prompt, content_hash, phash)
+        if cached is not None:
+            elapsed = time.time() - start
+            print(f"[CachedEditor] ♻️ Cache hit | Duration: {elapsed:.3f}s")
+            return cached, elapsed
+
+        if prepare and hasattr(self.editor, "edit_prepared"):
+            output, elapsed = self.editor.edit_prepared(prepared, prompt)  # No second resize
+        else:
+            output, elapsed = self.editor.edit_image(image_bytes, prompt)
+        if output is not None:
+            self._store(prompt, content_hash, phash, output)
+        return output, elapsed
+
+    # --- CACHE ---
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.size for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for digest in list(self._entries):
+                self._remove(digest)
+            self._save_index()
+
+    def _key(self, prompt: str, content_hash: str) -> str:
+        return hashlib.blake2b(f"{self.model}\n{prompt}\n{content_hash}".encode(), digest_size=16).hexdigest()
+
+    def _lookup(self, prompt: str, content_hash: str, phash: Optional[int]) -> Optional[bytes]:
+        with self._lock:
+            digest = self._key(prompt, content_hash)
+            exact = digest in self._entries
+            if not exact:
+                digest = self._find_similar(prompt, phash) if phash is not None else None
+            if digest is None:
+                self.misses += 1
+                return None
+
+            try:
+                output = (self.cache_dir / digest).read_bytes()
+            except OSError:
+                self._remove(digest)
+                self.misses += 1
+                return None
+
+            self._entries[digest].last_used = time.time()
+            if exact:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+            return output
+
+    def _find_similar(self, prompt: str, phash: int) -> Optional[str]:
+        best, best_dist = None, self.tolerance + 1
+        for digest, entry in self._entries.items():
+            if entry.model != self.model or entry.prompt != prompt or entry.phash is None:
+                continue
+            dist = (entry.phash ^ phash).bit_count()
+            if dist < best_dist:
+                best, best_dist = digest, dist
+        return best
+
+    def _store(self, prompt: str, content_hash: str, phash: Optional[int], output: bytes) -> None:
+        digest = self._key(prompt, content_hash)
+        with self._lock:
+            tmp = self.cache_dir / f"{digest}.tmp"
+            tmp.write_bytes(output)
+            os.replace(tmp, self.cache_dir / digest)
+            self._entries[digest] = _CacheEntry(self.model, prompt, phash, len(output), time.time())
+
+            total = sum(e.size for e in self._entries.values())
+            for old in sorted(self._entries, key=lambda d: self._entries[d].last_used):
+                if total <= self.max_bytes:
+                    break
+                total -= self._entries[old].size
+                self._remove(old)
+            self._save_index()
+
+    def _remove(self, digest: str) -> None:
+        # Called with self._lock held
+        self._entries.pop(digest, None)
+        try:
+            (self.cache_dir / digest).unlink()
+        except FileNotFoundError:
+            pass
+
+    # --- INDEX ---
+
+    def _load_index(self) -> dict[str, _CacheEntry]:
+        path = self.cache_dir / self.INDEX_FILE
+        if not path.exists():
+            return {}
+        try:
+            raw = json.loads(path.read_text())
+            return {
+                digest: _CacheEntry(**entry) for digest, entry in raw.items()
+                if (self.cache_dir / digest).exists()
+            }
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[CachedEditor] Ignoring corrupt cache index: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+        # Called with self._lock held
+        path = self.cache_dir / self.INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({d: asdict(e) for d, e in self._entries.items()}))
+        os.replace(tmp, path)
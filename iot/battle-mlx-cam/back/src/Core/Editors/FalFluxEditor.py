@@ -5,6 +5,7 @@ import requests
 from io import BytesIO
 from PIL import Image
 from src.Framework.Editors.AbstractEditor import AbstractEditor
+from src.Core.Services.Tracer import record
 
 class FalFluxEditor(AbstractEditor):
     """
@@ -12,55 +13,89 @@ class FalFluxEditor(AbstractEditor):
     """
     
     DEFAULT_MODEL = "fal-ai/flux-2/klein/4b/edit"
+    DEFAULT_BASE_URL = "https://queue.fal.run"
 
-    def __init__(self, model: str = DEFAULT_MODEL):
+    # Input sent to Fal (smaller = faster upload and inference)
+    INPUT_SIZE = (560, 420)
+    INPUT_QUALITY = 80
+
+    def __init__(self, model: str = DEFAULT_MODEL, base_url: str = DEFAULT_BASE_URL):
         self.model = model
-        self.api_url = f"https://queue.fal.run/{model}"
+        self.api_url = f"{base_url.rstrip('/')}/{model}"
         self._session = requests.Session()
 
     def _get_api_key(self) -> str | None:
         return os.getenv("FAL_KEY")
 
-    def edit_image(self, image_bytes: bytes, prompt: str) -> tuple[bytes | None, float]:
-        start = time.time()
-        
-        key = self._get_api_key()
-        if not key:
-            print("[FalFluxEditor] FAL_KEY not found in environment")
-            return None, 0.0
-        
-        # Compress input image (560x420 for speed)
+    def _prepare_input(self, image_bytes: bytes) -> bytes | None:
+        """Resize + re-encode the input image (560x420 JPEG for speed)."""
         try:
             img = Image.open(BytesIO(image_bytes))
-            img = img.resize((560, 420), Image.LANCZOS)
+            img = img.resize(self.INPUT_SIZE, Image.LANCZOS)
             
             buffer = BytesIO()
-            img.save(buffer, format='JPEG', quality=80)
-            compressed = buffer.getvalue()
+            img.convert('RGB').save(buffer, format='JPEG', quality=self.INPUT_QUALITY)
+            return buffer.getvalue()
         except Exception as e:
-            print(f"[FalFluxEditor] Error processing image: {e}")
+            print(f"[{type(self).__name__}] Error processing image: {e}")
+            return None
+
+    def _build_payload(self, compressed: bytes, prompt: str) -> dict:
+        b64 = base64.b64encode(compressed).decode('utf-8')
+        return {
+            "prompt": prompt,
+            "image_urls": [f"data:image/jpeg;base64,{b64}"]
+        }
+
+    @staticmethod
+    def _decode_data_uri(url: str) -> bytes | None:
+        if url.startswith("data:"):
+            _, data = url.split(",", 1)
+            return base64.b64decode(data)
+        return None
+
+    @staticmethod
+    def _track_status(status: str, phases: dict) -> None:
+        """Record fal.queue / fal.inference spans from queue status transitions."""
+        now = time.perf_counter()
+        if status not in ("", "IN_QUEUE") and "running" not in phases:
+            record("fal.queue", phases["submitted"], now)
+            phases["running"] = now
+        if status == "COMPLETED" and "completed" not in phases:
+            record("fal.inference", phases["running"], now)
+            phases["completed"] = now
+
+    def edit_image(self, image_bytes: bytes, prompt: str) -> tuple[bytes | None, float]:
+        # Compress input image (560x420 for speed)
+        compressed = self._prepare_input(image_bytes)
+        if compressed is None:
             return None, 0.0
+        return self.edit_prepared(compressed, prompt)
+
+    def edit_prepared(self, compressed: bytes, prompt: str) -> tuple[bytes | None, float]:
+        """Generate from an input already returned by _prepare_input() (no second resize)."""
+        start = time.time()
         
-        # Convert to base64 data URI
-        b64 = base64.b64encode(compressed).decode('utf-8')
-        data_uri = f"data:image/jpeg;base64,{b64}"
+        key = self._get_api_key()
+        if not key:
+            print("[FalFluxEditor] FAL_KEY not found in environment")
+            return None, 0.0
         
         headers = {
             "Authorization": f"Key {key}",
             "Content-Type": "application/json",
         }
         
-        payload = {
-            "prompt": prompt,
-            "image_urls": [data_uri]
-        }
+        payload = self._build_payload(compressed, prompt)
         
         prompt_preview = prompt[:50] + "..." if len(prompt) > 50 else prompt
         print(f"[FalFluxEditor] 🚀 Starting inference ({self.model}) | Prompt: \"{prompt_preview}\"")
         
         try:
             # Submit request
+            submit_start = time.perf_counter()
             response = self._session.post(self.api_url, headers=headers, json=payload, timeout=60)
+            record("fal.submit", submit_start)
             
             if response.status_code != 200:
                 print(f"[FalFluxEditor] ❌ API error {response.status_code}: {response.text[:100]}")
@@ -77,10 +112,12 @@ class FalFluxEditor(AbstractEditor):
                     print("[FalFluxEditor] Missing status URL in response")
                     return None, 0.0
                 
+                phases = {"submitted": time.perf_counter()}
                 while True:
                     status_resp = self._session.get(status_url, headers=headers, timeout=30)
                     status_data = status_resp.json()
                     status = status_data.get("status", "")
+                    self._track_status(status, phases)
                     
                     if status == "COMPLETED":
                         result = self._session.get(response_url, headers=headers, timeout=60).json()
@@ -98,12 +135,12 @@ class FalFluxEditor(AbstractEditor):
             
             image_url = result["images"][0].get("url", "")
             
-            if image_url.startswith("data:"):
-                _, data = image_url.split(",", 1)
-                output_bytes = base64.b64decode(data)
-            else:
+            output_bytes = self._decode_data_uri(image_url)
+            if output_bytes is None:
+                download_start = time.perf_counter()
                 img_resp = self._session.get(image_url, timeout=60)
                 output_bytes = img_resp.content
+                record("fal.download", download_start)
             
             elapsed = time.time() - start
             print(f"[FalFluxEditor] ✅ Inference complete | Duration: {elapsed:.2f}s")
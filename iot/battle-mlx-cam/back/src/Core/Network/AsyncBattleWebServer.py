@@ -0,0 +1,169 @@
+"""AsyncBattleWebServer - ASGI production mode (python-socketio + uvicorn) of BattleWebServer."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+from src.Core.Config import Config
+from src.Core.Network.BattleWebServer import BattleWebServer
+
+try:
+    import uvicorn
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # Optional dependencies (pip install "uvicorn[standard]" a2wsgi)
+    uvicorn = None
+
+
+class SocketIOBridge:
+    """
+    Thread-safe, synchronous facade over a socketio.AsyncServer.
+
+    BattleService, StatusPublisher and PreviewBroadcaster call emit() from
+    worker threads as they would with Flask-SocketIO; emits are scheduled on
+    the server's event loop. Emits before the server started are dropped.
+    """
+
+    def __init__(self, sio: socketio.AsyncServer):
+        self.sio = sio
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def emit(self, event, data=None, to=None, room=None, **kwargs):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        coro = self.sio.emit(event, data, to=to or room, **kwargs)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def start_background_task(self, target, *args, **kwargs):
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class AsyncBattleWebServer(BattleWebServer):
+    """
+    Same REST routes and socket events as BattleWebServer, on an event loop.
+
+    Socket.IO runs on python-socketio's ASGI server under uvicorn, the Flask
+    routes are mounted next to it through a2wsgi, which runs up to
+    `http_workers` requests at once (a slow /knn/predict does not hold up
+    /images or /ready). The event loop only does I/O: REST requests and
+    socket events run on thread pools, and camera
+    frames (decode, crop, KNN) on a dedicated one. While frame workers are busy, a newer frame
+    for a role replaces the one still waiting (latest frame wins), so a slow
+    MobileNet never builds a backlog or stalls the other clients.
+    """
+
+    def __init__(self, service_provider, frame_workers: int = Config.ASGI_FRAME_WORKERS,
+                 event_workers: int = Config.ASGI_EVENT_WORKERS, http_workers: int = Config.ASGI_HTTP_WORKERS):
+        self.sio = socketio.AsyncServer(
+            async_mode='asgi',
+            cors_allowed_origins="*",
+            max_http_buffer_size=Config.SOCKETIO_MAX_PAYLOAD_BYTES
+        )
+        self._frame_executor = ThreadPoolExecutor(max_workers=frame_workers, thread_name_prefix="Frames")
+        self._event_executor = ThreadPoolExecutor(max_workers=event_workers, thread_name_prefix="SocketEvents")
+        self.http_workers = http_workers
+        self._http_app = None
+        self._frame_lock = threading.Lock()
+        self._waiting_frames: dict[str, tuple[str, dict]] = {}  # role -> (sid, data) not yet picked by a worker
+        self.frames_received = 0
+        self.frames_coalesced = 0
+        super().__init__(service_provider)
+
+    def _create_socketio(self):
+        return SocketIOBridge(self.sio)
+
+    def asgi_app(self):
+        if uvicorn is None:
+            raise ImportError('AsyncBattleWebServer requires uvicorn and a2wsgi (pip install "uvicorn[standard]" a2wsgi)')
+        if self._http_app is None:
+            self._http_app = WSGIMiddleware(self.app, workers=self.http_workers)
+        return socketio.ASGIApp(self.sio, other_asgi_app=self._http_app, on_startup=self._on_startup)
+
+    def start(self, host: str = '0.0.0.0', port: int = 5010):
+        app = self.asgi_app()
+        print(f"[AsyncBattleWebServer] Starting on http://{host}:{port} (ASGI)")
+        self._attach_service()
+        uvicorn.run(app, host=host, port=port, log_level="warning")
+
+    def stop(self):
+        self._frame_executor.shutdown(wait=False, cancel_futures=True)
+        self._event_executor.shutdown(wait=False, cancel_futures=True)
+        if self._http_app is not None:
+            self._http_app.executor.shutdown(wait=False, cancel_futures=True)
+
+    def server_stats(self) -> dict:
+        with self._frame_lock:
+            return {
+                "mode": "asgi",
+                "frames_received": self.frames_received,
+                "frames_coalesced": self.frames_coalesced,
+                "frames_waiting": len(self._waiting_frames),
+            }
+
+    async def _on_startup(self):
+        self.socketio.loop = asyncio.get_running_loop()
+
+    # --- SOCKET EVENTS ---
+
+    def _register_socket_events(self):
+        """Bind the shared handlers to the AsyncServer, running them off the event loop."""
+        async def connect(sid, environ, auth=None):
+            await self._run(self._on_connect, sid)
+
+        async def disconnect(sid, reason=None):
+            await self._run(self._on_disconnect, sid)
+
+        async def process_frame(sid, data=None):
+            self._submit_frame(sid, data)
+
+        self.sio.on('connect', connect)
+        self.sio.on('disconnect', disconnect)
+        for event, handler in self._socket_handlers().items():
+            if event == 'process_frame':
+                self.sio.on(event, process_frame)
+            else:
+                self.sio.on(event, self._threaded(handler))
+
+    def _threaded(self, handler):
+        async def handle(sid, data=None, *args):
+            return await self._run(handler, sid, data)
+        return handle
+
+    async def _run(self, fn, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._event_executor, fn, *args)
+        except Exception as e:
+            print(f"[AsyncBattleWebServer] {getattr(fn, '__name__', fn)} failed: {e}")
+
+    def _submit_frame(self, sid, data):
+        role = (data or {}).get('role')
+        with self._frame_lock:
+            self.frames_received += 1
+            waiting = role in self._waiting_frames
+            self._waiting_frames[role] = (sid, data)
+            if waiting:
+                self.frames_coalesced += 1  # The queued job will pick up this newer frame
+                return
+        self._frame_executor.submit(self._process_waiting_frame, role)
+
+    def _process_waiting_frame(self, role):
+        with self._frame_lock:
+            sid, data = self._waiting_frames.pop(role)
+        try:
+            self._on_process_frame(sid, data)
+        except Exception as e:
+            print(f"[AsyncBattleWebServer] Frame processing failed: {e}")
@@ -1,5 +1,6 @@
 import base64
-from flask import Flask, jsonify, request
+import time
+from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO
 from flask_cors import CORS
 
@@ -7,6 +8,7 @@ from src.Framework.Network.AbstractWebServer import AbstractWebServer
 from src.Core.Config import Config
 from src.Core.Camera.CameraSettings import get_camera_settings, update_camera_settings, reset_camera_settings
 from src.Core.Camera.CameraScanner import CameraScanner
+from src.Core.Network.PreviewBroadcaster import PreviewBroadcaster
 
 class BattleWebServer(AbstractWebServer):
     """
@@ -21,13 +23,9 @@ class BattleWebServer(AbstractWebServer):
         """
         self.app = Flask(__name__)
         CORS(self.app, origins="*")
-        self.socketio = SocketIO(
-            self.app, 
-            cors_allowed_origins="*", 
-            async_mode='threading', 
-            max_http_buffer_size=10*1024*1024
-        )
+        self.socketio = self._create_socketio()
         self.service_provider = service_provider
+        self.previews = PreviewBroadcaster(self.socketio)
         
         self._remote_devices_map = {}
         self._assignments = {'dream': None, 'nightmare': None}
@@ -36,18 +34,28 @@ class BattleWebServer(AbstractWebServer):
         self._register_routes()
         self._register_socket_events()
 
+    def _create_socketio(self):
+        return SocketIO(
+            self.app, 
+            cors_allowed_origins="*", 
+            async_mode='threading', 
+            max_http_buffer_size=Config.SOCKETIO_MAX_PAYLOAD_BYTES
+        )
+
     def _get_service(self):
         return self.service_provider()
 
-    def start(self, host: str = '0.0.0.0', port: int = 5010):
-        print(f"[BattleWebServer] Starting on http://{host}:{port}")
-        
+    def _attach_service(self):
         # Inject socketio into service if available
         service = self._get_service()
         if service:
-            service.set_socketio(self.socketio)
+            service.set_socketio(self.socketio, self.previews)
             print("[BattleWebServer] SocketIO injected into Service")
 
+    def start(self, host: str = '0.0.0.0', port: int = 5010):
+        print(f"[BattleWebServer] Starting on http://{host}:{port}")
+        self._attach_service()
+
         self.socketio.run(
             self.app, 
             host=host, 
@@ -60,25 +68,87 @@ class BattleWebServer(AbstractWebServer):
     def stop(self):
         pass
 
+    def server_stats(self) -> dict:
+        return {"mode": "threading"}
+
+    @staticmethod
+    def _frame_bytes(image) -> bytes | None:
+        """Frame payload as bytes: Socket.IO binary attachment, or legacy base64 string."""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image)
+        if isinstance(image, str) and image:
+            try:
+                return base64.b64decode(image)
+            except ValueError:
+                print("[BattleWebServer] Invalid base64 frame")
+        return None
+
     def _register_routes(self):
         @self.app.route('/health')
         def health():
             return jsonify({
                 "status": "ok",
                 "mode": "headless",
-                "service": self._get_service() is not None
+                "service": self._get_service() is not None,
+                "server": self.server_stats()
             })
 
+        @self.app.route('/ready')
+        def ready():
+            # 200 once the KNN extractor is loaded and warmed up, 503 before (kiosks wait on it)
+            knn = getattr(self._get_service(), "knn", None)
+            if knn is None:
+                return jsonify({"state": "cold", "ready": False, "error": "No service available"}), 503
+            readiness = knn.extractor.readiness()
+            return jsonify(readiness), 200 if readiness["ready"] else 503
+
         @self.app.route('/status')
         def status():
             service = self._get_service()
             if service:
                 try:
+                    # ?since=<version>: patches missed since that version (or a full snapshot)
+                    since = request.args.get('since', type=int)
+                    if since is not None and service.status_publisher:
+                        return jsonify(service.status_publisher.since(since))
                     return jsonify(service.get_status())
                 except Exception as e:
                     return jsonify({"error": str(e)}), 500
             return jsonify({"error": "No service available"}), 500
 
+        @self.app.route('/images/<image_id>')
+        def get_image(image_id):
+            """Battle image referenced by the Rift state (content-addressed, immutable)."""
+            service = self._get_service()
+            entry = service.image_store.get(image_id) if service else None
+            if entry is None:
+                return jsonify({"error": "Unknown image"}), 404
+            data, content_type = entry
+            return Response(data, mimetype=content_type, headers={
+                "Cache-Control": "public, max-age=31536000, immutable",
+                "ETag": image_id,
+            })
+
+        @self.app.route('/metrics')
+        def metrics():
+            """Span latency histograms in Prometheus text format."""
+            service = self._get_service()
+            if not service:
+                return Response("", mimetype="text/plain")
+            return Response(service.tracer.prometheus(), mimetype="text/plain; version=0.0.4")
+
+        @self.app.route('/debug/traces')
+        def debug_traces():
+            """Recent frame traces (?limit=, ?role=) and p50/p95/p99 per span."""
+            service = self._get_service()
+            if not service:
+                return jsonify({"error": "No service"}), 500
+            limit = request.args.get('limit', default=50, type=int)
+            return jsonify({
+                "spans": service.tracer.stats(),
+                "traces": service.tracer.traces(limit=limit, role=request.args.get('role')),
+            })
+
         @self.app.route('/cameras')
         def get_cameras():
             # Server side cameras
@@ -225,139 +295,175 @@ class BattleWebServer(AbstractWebServer):
 
 
     def _register_socket_events(self):
+        """Bind the shared handlers to Flask-SocketIO (one thread per client)."""
         @self.socketio.on('connect')
-        def handle_connect():
-            print(f"[BattleWebServer] Client connected: {request.sid}")
+        def handle_connect(*args):
+            self._on_connect(request.sid)
 
-        @self.socketio.on('trigger_attack')
-        def handle_trigger_attack(data):
-            """Allow frontend/debug to manually trigger an attack."""
-            service = self._get_service()
-            if service and service.state:
-                print(f"[BattleWebServer] Manual Attack Triggered")
-                service.state.trigger_attack()
+        @self.socketio.on('disconnect')
+        def handle_disconnect(*args):
+            self._on_disconnect(request.sid)
+
+        for event, handler in self._socket_handlers().items():
+            self.socketio.on(event)(self._with_sid(handler))
+
+    @staticmethod
+    def _with_sid(handler):
+        def handle(data=None, *args):
+            return handler(request.sid, data)
+        return handle
+
+    def _socket_handlers(self) -> dict:
+        """Socket event -> handler(sid, data), shared by the threading and ASGI servers."""
+        return {
+            'subscribe_previews': self._on_subscribe_previews,
+            'unsubscribe_previews': self._on_unsubscribe_previews,
+            'trigger_attack': self._on_trigger_attack,
+            'force_start_fight': self._on_force_start_fight,
+            'force_end_fight': self._on_force_end_fight,
+            'process_frame': self._on_process_frame,
+            'update_camera_settings': self._on_update_camera_settings,
+            'register_client': self._on_register_client,
+            'assign_device': self._on_assign_device,
+            'update_crop': self._on_update_crop,
+            'update_rotation': self._on_update_rotation,
+            'update_grayscale': self._on_update_grayscale,
+            'set_debug_mode': self._on_set_debug_mode,
+            'proxy_to_rift': self._on_proxy_to_rift,
+        }
+
+    # --- SOCKET EVENTS ---
+
+    def _on_connect(self, sid):
+        print(f"[BattleWebServer] Client connected: {sid}")
+        # Full status once; later updates arrive as 'status_patch' diffs
+        service = self._get_service()
+        if service and service.status_publisher:
+            self.socketio.emit('status', service.status_publisher.snapshot(), to=sid)
+
+    def _on_disconnect(self, sid):
+        print(f"[BattleWebServer] Client disconnected: {sid}")
+        self.previews.remove_client(sid)
+        if sid in self._remote_devices_map:
+            del self._remote_devices_map[sid]
+
+    def _on_subscribe_previews(self, sid, data):
+        """Opt in to preview frames: {events: [...], roles: [...], fps: 5}."""
+        data = data or {}
+        rooms = self.previews.subscribe(sid, data.get('events'), data.get('roles'), data.get('fps'))
+        print(f"[BattleWebServer] Client {sid} subscribed to {rooms}")
+
+    def _on_unsubscribe_previews(self, sid, data):
+        data = data or {}
+        self.previews.unsubscribe(sid, data.get('events'), data.get('roles'))
+
+    def _on_trigger_attack(self, sid, data):
+        """Allow frontend/debug to manually trigger an attack."""
+        service = self._get_service()
+        if service and service.state:
+            print(f"[BattleWebServer] Manual Attack Triggered")
+            service.state.trigger_attack()
 
-        @self.socketio.on('force_start_fight')
-        def handle_force_start_fight(data):
-            """Allow frontend/debug to manually start the fight."""
-            service = self._get_service()
-            if service:
-                service.force_start_fight()
+    def _on_force_start_fight(self, sid, data):
+        """Allow frontend/debug to manually start the fight."""
+        service = self._get_service()
+        if service:
+            service.force_start_fight()
 
-        @self.socketio.on('force_end_fight')
-        def handle_force_end_fight(data):
-            """Allow frontend/debug to manually end the fight."""
-            service = self._get_service()
-            if service:
-                service.force_end_fight()
-        @self.socketio.on('disconnect')
-        def handle_disconnect():
-            print(f"[BattleWebServer] Client disconnected: {request.sid}")
-            sid = request.sid
-            if sid in self._remote_devices_map:
-                del self._remote_devices_map[sid]
-
-        @self.socketio.on('process_frame')
-        def handle_process_frame(data):
-            role = data.get('role')
-            image_b64 = data.get('image')
-            if not role or not image_b64: return
+    def _on_force_end_fight(self, sid, data):
+        """Allow frontend/debug to manually end the fight."""
+        service = self._get_service()
+        if service:
+            service.force_end_fight()
 
-            # Broadcast raw camera frame to all clients
-            self.socketio.emit('camera_preview', {'role': role, 'frame': image_b64})
+    def _on_process_frame(self, sid, data):
+        data = data or {}
+        role = data.get('role')
+        image_bytes = self._frame_bytes(data.get('image'))
+        if not role or not image_bytes: return
 
-            service = self._get_service()
-            if service:
-                try:
-                    image_bytes = base64.b64decode(image_b64)
-                    service.process_client_frame(role, image_bytes)
-                except Exception as e:
-                    print(f"[BattleWebServer] Frame processing failed: {e}")
+        # The frame's trace (ID + spans) starts here, see /debug/traces
+        service = self._get_service()
+        trace = service.tracer.start(role) if service else None
 
-        @self.socketio.on('update_camera_settings')
-        def handle_update_camera_settings(data):
-            new_settings = update_camera_settings(data)
-            self.socketio.emit('camera_settings_updated', new_settings)
+        # Fan out to subscribed clients (same buffer, binary attachment, FPS-capped)
+        start = time.perf_counter()
+        self.previews.publish('camera_preview', role, {'role': role, 'frame': image_bytes})
+        if trace:
+            trace.add("socketio_emit", (time.perf_counter() - start) * 1000, start)
 
-        @self.socketio.on('register_client')
-        def handle_register_client(data):
-            devices = data.get('devices', [])
-            sid = request.sid
-            print(f"[BattleWebServer] Client {sid} registered {len(devices)} devices")
-            self._remote_devices_map[sid] = devices
-            
-            # Update admins
-            all_devices = []
-            for d_list in self._remote_devices_map.values():
-                all_devices.extend(d_list)
-            self.socketio.emit('remote_devices_update', all_devices)
-            
-            # Send assignments
-            for role, device_id in self._assignments.items():
-                if device_id:
-                    self.socketio.emit('set_device', {'role': role, 'deviceId': device_id}, room=sid)
-
-        @self.socketio.on('assign_device')
-        def handle_assign_device(data):
-            role = data.get('role')
-            device_id = data.get('deviceId')
-            if role and device_id:
-                print(f"[BattleWebServer] Assigning {device_id} to {role}")
-                self._assignments[role] = device_id
-                self.socketio.emit('set_device', {'role': role, 'deviceId': device_id})
-
-        @self.socketio.on('update_crop')
-        def handle_update_crop(data):
-            role = data.get('role')
-            crop = data.get('crop')
-            service = self._get_service()
-            if service:
-                service.update_role_crop(role, crop)
-                # self.socketio.emit('crop_updated', ...) # Service emits status, but we can ack if needed
-                # Actually, let's keep emitting crop_updated for frontend feedback
-                self.socketio.emit('crop_updated', {'role': role, 'crop': crop})
-
-        @self.socketio.on('update_rotation')
-        def handle_update_rotation(data):
-            role = data.get('role')
-            rotation = data.get('rotation', 0)
-            service = self._get_service()
-            if service:
-                service.update_role_rotation(role, rotation)
-                self.socketio.emit('rotation_updated', {'role': role, 'rotation': rotation})
+        if service:
+            try:
+                service.process_client_frame(role, image_bytes, trace)
+            except Exception as e:
+                print(f"[BattleWebServer] Frame processing failed: {e}")
 
-        @self.socketio.on('update_grayscale')
-        def handle_update_grayscale(data):
-            role = data.get('role')
-            enabled = data.get('enabled', False)
-            service = self._get_service()
-            if service:
-                service.update_role_grayscale(role, enabled)
-                self.socketio.emit('grayscale_updated', {'role': role, 'enabled': enabled})
-
-        @self.socketio.on('set_debug_mode')
-        def handle_set_debug_mode(data):
-            self._debug_mode = data.get('enabled', False)
-            print(f"[BattleWebServer] Debug mode: {self._debug_mode}")
-            self.socketio.emit('debug_mode_changed', {'enabled': self._debug_mode})
-            
-        @self.socketio.on('proxy_to_rift')
-        def handle_proxy_to_rift(data):
-            """Forward payload from Frontend to Rift Server via BattleService."""
-            service = self._get_service()
-            if service and service.ws:
-                # Assuming data is the full payload
-                # Use service.ws.send_json or similar if available, or raw send
-                # RiftWebSocket expects dictionary for send() typically? 
-                # Let's check RiftWebSocket implementation. 
-                # For now assuming send_custom_payload exists or we add it.
-                # Actually checking RiftWebSocket usage in BattleService:
-                # self.ws.send_image uses self.ws.send(payload)
-                
-                try:
-                    # We need to ensure we don't accidentally double-wrap if send() wraps it
-                    # But RiftWebSocket.send takes a dict and sends it as JSON string
-                    service.ws.send_raw(data) 
-                    print(f"[BattleWebServer] Proxied to Rift: {data.get('battle_state', 'Unknown')}")
-                except Exception as e:
-                    print(f"[BattleWebServer] Proxy failed: {e}")
+    def _on_update_camera_settings(self, sid, data):
+        new_settings = update_camera_settings(data)
+        self.socketio.emit('camera_settings_updated', new_settings)
+
+    def _on_register_client(self, sid, data):
+        devices = data.get('devices', [])
+        print(f"[BattleWebServer] Client {sid} registered {len(devices)} devices")
+        self._remote_devices_map[sid] = devices
+        
+        # Update admins
+        all_devices = []
+        for d_list in self._remote_devices_map.values():
+            all_devices.extend(d_list)
+        self.socketio.emit('remote_devices_update', all_devices)
+        
+        # Send assignments
+        for role, device_id in self._assignments.items():
+            if device_id:
+                self.socketio.emit('set_device', {'role': role, 'deviceId': device_id}, room=sid)
+
+    def _on_assign_device(self, sid, data):
+        role = data.get('role')
+        device_id = data.get('deviceId')
+        if role and device_id:
+            print(f"[BattleWebServer] Assigning {device_id} to {role}")
+            self._assignments[role] = device_id
+            self.socketio.emit('set_device', {'role': role, 'deviceId': device_id})
+
+    def _on_update_crop(self, sid, data):
+        role = data.get('role')
+        crop = data.get('crop')
+        service = self._get_service()
+        if service:
+            service.update_role_crop(role, crop)
+            # Service emits status; crop_updated is kept for frontend feedback
+            self.socketio.emit('crop_updated', {'role': role, 'crop': crop})
+
+    def _on_update_rotation(self, sid, data):
+        role = data.get('role')
+        rotation = data.get('rotation', 0)
+        service = self._get_service()
+        if service:
+            service.update_role_rotation(role, rotation)
+            self.socketio.emit('rotation_updated', {'role': role, 'rotation': rotation})
+
+    def _on_update_grayscale(self, sid, data):
+        role = data.get('role')
+        enabled = data.get('enabled', False)
+        service = self._get_service()
+        if service:
+            service.update_role_grayscale(role, enabled)
+            self.socketio.emit('grayscale_updated', {'role': role, 'enabled': enabled})
+
+    def _on_set_debug_mode(self, sid, data):
+        self._debug_mode = data.get('enabled', False)
+        print(f"[BattleWebServer] Debug mode: {self._debug_mode}")
+        self.socketio.emit('debug_mode_changed', {'enabled': self._debug_mode})
+
+    def _on_proxy_to_rift(self, sid, data):
+        """Forward payload from Frontend to Rift Server via BattleService."""
+        service = self._get_service()
+        if service and service.ws:
+            # The frontend sends its whole state: forward it as-is, never
+            # echoing images back
+            try:
+                service.ws.forward(data)
+                print(f"[BattleWebServer] Proxied to Rift: {data.get('battle_state', 'Unknown')}")
+            except Exception as e:
+                print(f"[BattleWebServer] Proxy failed: {e}")
@@ -0,0 +1,132 @@
+"""PreviewBroadcaster - Subscription-based, FPS-capped fan-out of preview frames."""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from src.Core.Config import Config
+
+
+@dataclass
+class _Subscription:
+    interval: float             # Min seconds between two frames for this client
+    next_due: float = 0.0
+    pending: Any = None         # Latest frame waiting for the FPS cap (latest wins)
+
+
+class PreviewBroadcaster:
+    """
+    Sends preview frames only to clients that subscribed to them.
+
+    Rooms are "<event>:<role>" (e.g. "camera_preview:dream"). Each client in a
+    room has its own FPS cap: a frame arriving too early replaces the client's
+    pending frame, and a flush loop sends it when the client is due again.
+    Frames are never re-encoded - the same payload object goes to every client.
+    """
+
+    EVENTS = ('camera_preview', 'debug_cropped_frame')
+    ROLES = ('nightmare', 'dream')
+    FLUSH_INTERVAL_S = 0.02
+
+    def __init__(self, socketio, max_fps: float = Config.PREVIEW_MAX_FPS):
+        self.socketio = socketio
+        self.max_fps = max_fps
+        self._lock = threading.Lock()
+        self._rooms: dict[str, dict[str, _Subscription]] = {}
+        self._flusher_started = False
+
+        self.sent = 0
+        self.coalesced = 0
+
+    # --- SUBSCRIPTIONS ---
+
+    def subscribe(self, sid: str, events: Optional[Iterable[str]] = None, roles: Optional[Iterable[str]] = None,
+                  fps: Optional[float] = None) -> list[str]:
+        """Join the rooms for events x roles. fps is capped at max_fps. Returns the joined rooms."""
+        fps = min(float(fps), self.max_fps) if fps else self.max_fps
+        interval = 1.0 / fps if fps > 0 else 0.0
+        rooms = self._rooms_for(events, roles)
+        with self._lock:
+            for room in rooms:
+                self._rooms.setdefault(room, {})[sid] = _Subscription(interval=interval)
+        self._ensure_flusher()
+        return rooms
+
+    def unsubscribe(self, sid: str, events: Optional[Iterable[str]] = None, roles: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            for room in self._rooms_for(events, roles):
+                members = self._rooms.get(room)
+                if members is not None:
+                    members.pop(sid, None)
+
+    def remove_client(self, sid: str) -> None:
+        self.unsubscribe(sid)
+
+    def has_subscribers(self, event: str, role: str) -> bool:
+        """Lets producers skip building a payload (e.g. JPEG encode) nobody will receive."""
+        with self._lock:
+            return bool(self._rooms.get(f"{event}:{role}"))
+
+    # --- PUBLISH ---
+
+    def publish(self, event: str, role: str, payload: Any) -> None:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for sid, sub in self._rooms.get(f"{event}:{role}", {}).items():
+                if now >= sub.next_due:
+                    sub.next_due = now + sub.interval
+                    sub.pending = None
+                    due.append(sid)
+                else:
+                    if sub.pending is not None:
+                        self.coalesced += 1
+                    sub.pending = payload
+            self.sent += len(due)
+
+        for sid in due:
+            self.socketio.emit(event, payload, to=sid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rooms": {room: len(members) for room, members in self._rooms.items() if members},
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+            }
+
+    # --- INTERNALS ---
+
+    def _rooms_for(self, events, roles) -> list[str]:
+        events = [e for e in (events or self.EVENTS) if e in self.EVENTS]
+        roles = [r for r in (roles or self.ROLES) if r in self.ROLES]
+        return [f"{event}:{role}" for event in events for role in roles]
+
+    def _ensure_flusher(self) -> None:
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self) -> None:
+        while True:
+            self.socketio.sleep(self.FLUSH_INTERVAL_S)
+            self.flush()
+
+    def flush(self) -> None:
+        """Send pending frames to clients whose FPS cap allows it again."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for room, members in self._rooms.items():
+                event = room.split(":", 1)[0]
+                for sid, sub in members.items():
+                    if sub.pending is not None and now >= sub.next_due:
+                        due.append((event, sid, sub.pending))
+                        sub.pending = None
+                        sub.next_due = now + sub.interval
+            self.sent += len(due)
+
+        for event, sid, payload in due:
+            self.socketio.emit(event, payload, to=sid)
@@ -1,6 +1,7 @@
 import json
 import threading
 import ssl
+from typing import Callable
 import websocket
 from src.Framework.Network.AbstractWebSocket import AbstractWebSocket
 from src.Core.Config import Config
@@ -14,9 +15,11 @@ class RiftWebSocket(AbstractWebSocket):
         self.url = url or Config.get_ws_url()
         self.ws = None
         self.connected = False
-        self.last_state = {}
+        self.last_state = {}        # Merged Rift state (partial updates applied, replaced copy-on-write)
+        self._state_lock = threading.Lock()
         self._on_connect = None
         self._on_disconnect = None
+        self._subscribers: list[Callable[[dict, dict], None]] = []
         
     def connect(self, on_connect=None, on_disconnect=None):
         """Connect to WebSocket server in background thread."""
@@ -29,10 +32,7 @@ class RiftWebSocket(AbstractWebSocket):
                 self._on_connect()
         
         def on_message(ws, message):
-            try:
-                self.last_state = json.loads(message)
-            except json.JSONDecodeError:
-                pass
+            self._handle_message(message)
         
         def on_close(ws, *args):
             self.connected = False
@@ -59,6 +59,48 @@ class RiftWebSocket(AbstractWebSocket):
         )
         thread.start()
 
+    def subscribe(self, callback: Callable[[dict, dict], None]) -> None:
+        """
+        Register callback(delta, state), called on the WS thread for every
+        message that changed something. `delta` holds only the changed keys.
+        """
+        self._subscribers.append(callback)
+
+    def _handle_message(self, message: str) -> None:
+        try:
+            update = json.loads(message)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(update, dict):
+            return
+
+        # Messages may be partial: merge them into the store
+        with self._state_lock:
+            delta = self._changes(update)
+            if not delta:
+                return
+            state = {**self.last_state, **delta}
+            self.last_state = state
+
+        for callback in list(self._subscribers):
+            try:
+                callback(delta, state)
+            except Exception as e:
+                print(f"[RiftWebSocket] Subscriber error: {e}")
+
+    def _changes(self, update: dict) -> dict:
+        # Called with self._state_lock held
+        return {k: v for k, v in update.items()
+                if k not in self.last_state or self.last_state[k] != v}
+
+    @staticmethod
+    def _is_large(value) -> bool:
+        return isinstance(value, str) and len(value) > Config.RIFT_LARGE_FIELD_CHARS
+
+    def summary(self) -> dict:
+        """Merged state without large fields (images reach the UI via battle_image_update)."""
+        return {k: v for k, v in self.last_state.items() if not self._is_large(v)}
+
     def send_raw(self, payload: dict) -> bool:
         """Send raw dictionary payload to server as JSON."""
         if not self.connected or not self.ws:
@@ -71,33 +113,70 @@ class RiftWebSocket(AbstractWebSocket):
             print(f"[RiftWebSocket] Send Raw error: {e}")
             return False
 
-    def send_image(self, image_base64: str, role: str, extra_data: dict = None) -> bool:
-        """Send transformed image to server."""
+    def send_update(self, changes: dict, large_keys: tuple = ()) -> bool:
+        """
+        Merge `changes` into the state and send the whole merged state, with
+        device_id (Config.RIFT_DEVICE_ID unless `changes` carries one).
+
+        The Rift server only relays messages and devices replace their state
+        with each one, so a message must never be partial. Large values (base64
+        images) are left out unless listed in `large_keys`, so a payload built
+        from an earlier state never echoes images back.
+        """
         if not self.connected or not self.ws:
             return False
-        
-        try:
-            payload = self.last_state.copy()
-            payload["device_id"] = "battle-camera"
-            
-            data_url = f"data:image/png;base64,{image_base64}"
-            
-            if role == "dream":
-                payload["battle_drawing_dream_image"] = data_url
-            else:
-                payload["battle_drawing_nightmare_image"] = data_url
-            
-            # Merge extra data (like recognition flags)
-            if extra_data:
-                payload.update(extra_data)
-            
-            self.ws.send(json.dumps(payload))
-            return True
-        
-        except Exception as e:
-            print(f"[RiftWebSocket] Send error: {e}")
+
+        device_id = changes.get("device_id", Config.RIFT_DEVICE_ID)
+        changes = {
+            k: v for k, v in changes.items()
+            if k != "device_id" and (k in large_keys or not self._is_large(v))
+        }
+        with self._state_lock:
+            state = {**self.last_state, **changes}
+            payload = {k: v for k, v in state.items() if k in large_keys or not self._is_large(v)}
+            payload["device_id"] = device_id
+            if not self.send_raw(payload):
+                return False
+            self.last_state = state
+        return True
+
+    def forward(self, payload: dict) -> bool:
+        """
+        Send a full payload built elsewhere (frontend proxy) as-is, only
+        without large values, and merge it into the state. Re-sends of an
+        unchanged value (same battle_state, reset_system) still go out.
+        """
+        if not self.connected or not self.ws:
             return False
 
+        payload = {k: v for k, v in payload.items() if not self._is_large(v)}
+        with self._state_lock:
+            if not self.send_raw(payload):
+                return False
+            self.last_state = {**self.last_state, **{k: v for k, v in payload.items() if k != "device_id"}}
+        return True
+
+    def send_image_ref(self, url: str, image_hash: str, role: str, extra_data: dict = None) -> bool:
+        """Publish a served image by URL + content hash instead of inline base64."""
+        changes = {
+            f"battle_drawing_{role}_image": url,
+            f"battle_drawing_{role}_image_hash": image_hash,
+        }
+        if extra_data:
+            changes.update(extra_data)
+        return self.send_update(changes)
+
+    def send_image(self, image_base64: str, role: str, extra_data: dict = None) -> bool:
+        """Send transformed image to server."""
+        key = "battle_drawing_dream_image" if role == "dream" else "battle_drawing_nightmare_image"
+        changes = {key: f"data:image/png;base64,{image_base64}"}
+
+        # Merge extra data (like recognition flags)
+        if extra_data:
+            changes.update(extra_data)
+
+        return self.send_update(changes, large_keys=(key,))
+
     def close(self):
         """Close WebSocket connection."""
         if self.ws:
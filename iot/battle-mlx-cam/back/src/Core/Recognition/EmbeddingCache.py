@@ -0,0 +1,163 @@
+"""EmbeddingCache - LRU cache of feature vectors keyed by frame content."""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+PHASH_BITS = 64
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    phash: Optional[int] = None
+
+
+class EmbeddingCache:
+    """
+    LRU cache so a frame is embedded by MobileNetV2 at most once.
+
+    Lookup order:
+    1. Exact content hash (blake2b of the encoded bytes)
+    2. Optional perceptual hash (64-bit dHash) within `phash_tolerance` bits,
+       so near-identical frames of a static drawing reuse the same vector.
+
+    Perceptual lookups use multi-index bucketing: the hash is split into
+    (tolerance + 1) chunks and, by pigeonhole, any hash within the tolerance
+    shares at least one chunk exactly - only those candidates are compared.
+    """
+
+    def __init__(self, max_size: int = 256, use_phash: bool = False, phash_tolerance: int = 4):
+        self.max_size = max_size
+        self.use_phash = use_phash
+        self.phash_tolerance = max(0, min(phash_tolerance, PHASH_BITS - 1))
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, _Entry] = OrderedDict()
+        self._buckets: dict[tuple[int, int], set[bytes]] = {}
+        self.hits = 0
+        self.phash_hits = 0
+        self.misses = 0
+
+    # --- PUBLIC API ---
+
+    def get(self, image_bytes) -> tuple[Optional[np.ndarray], bytes, Optional[int]]:
+        """
+        Look up a frame (encoded bytes or decoded RGB array).
+
+        Returns:
+            (vector or None, content key, perceptual hash or None) - pass the
+            key and hash back to put() on a miss to avoid hashing twice.
+        """
+        key = self.content_key(image_bytes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.vector, key, entry.phash
+
+        phash = self.perceptual_hash(image_bytes) if self.use_phash else None
+        if phash is not None:
+            with self._lock:
+                match = self._find_similar(phash)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.phash_hits += 1
+                    return self._entries[match].vector, key, phash
+
+        with self._lock:
+            self.misses += 1
+        return None, key, phash
+
+    def put(self, key: bytes, vector: np.ndarray, phash: Optional[int] = None) -> None:
+        """Store a vector under a content key (and its perceptual hash)."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = _Entry(vector=vector, phash=phash)
+            if phash is not None:
+                for chunk in self._chunks(phash):
+                    self._buckets.setdefault(chunk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._evict_oldest()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for /status."""
+        with self._lock:
+            lookups = self.hits + self.phash_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "phash_hits": self.phash_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.phash_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    # --- HASHING ---
+
+    @staticmethod
+    def content_key(image_bytes) -> bytes:
+        if isinstance(image_bytes, np.ndarray):
+            h = hashlib.blake2b(str(image_bytes.shape).encode(), digest_size=16)
+            h.update(np.ascontiguousarray(image_bytes).data)
+            return h.digest()
+        return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+    @staticmethod
+    def perceptual_hash(image_bytes) -> Optional[int]:
+        """64-bit difference hash (dHash) of the frame, or None if undecodable."""
+        try:
+            if isinstance(image_bytes, np.ndarray):
+                img = Image.fromarray(np.ascontiguousarray(image_bytes))
+            else:
+                img = Image.open(BytesIO(image_bytes))
+                img.draft('L', (64, 64))  # JPEG: decode at reduced scale (cheap)
+            small = np.asarray(img.convert('L').resize((9, 8), Image.BILINEAR), dtype=np.int16)
+        except Exception:
+            return None
+        bits = (small[:, 1:] > small[:, :-1]).ravel()
+        return int(np.packbits(bits).view('>u8')[0])
+
+    # --- INTERNALS ---
+
+    def _chunks(self, phash: int) -> list[tuple[int, int]]:
+        n = self.phash_tolerance + 1
+        size = PHASH_BITS // n
+        chunks = []
+        for i in range(n):
+            width = size if i < n - 1 else PHASH_BITS - size * (n - 1)
+            chunks.append((i, (phash >> (size * i)) & ((1 << width) - 1)))
+        return chunks
+
+    def _find_similar(self, phash: int) -> Optional[bytes]:
+        best_key, best_dist = None, self.phash_tolerance + 1
+        for chunk in self._chunks(phash):
+            for key in self._buckets.get(chunk, ()):
+                dist = (self._entries[key].phash ^ phash).bit_count()
+                if dist < best_dist:
+                    best_key, best_dist = key, dist
+        return best_key
+
+    def _evict_oldest(self) -> None:
+        key, entry = self._entries.popitem(last=False)
+        if entry.phash is not None:
+            for chunk in self._chunks(entry.phash):
+                bucket = self._buckets.get(chunk)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[chunk]
@@ -0,0 +1,187 @@
+import threading
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+from src.Framework.Recognition.AbstractFeatureBackend import AbstractFeatureBackend
+from src.Core.Config import Config
+from .EmbeddingCache import EmbeddingCache
+from .InferenceBatcher import InferenceBatcher
+from .TorchFeatureBackend import TorchFeatureBackend, QuantizedTorchFeatureBackend
+from .OnnxFeatureBackend import OnnxFeatureBackend
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (TorchFeatureBackend, QuantizedTorchFeatureBackend, OnnxFeatureBackend)
+}
+
+class FeatureExtractor:
+    """
+    MobileNetV2 feature-extraction engine (1280-d embeddings).
+
+    One instance is shared process-wide (see get_feature_extractor) so the
+    model is loaded once, whatever the number of recognizers using it.
+    Results are memoised in an EmbeddingCache keyed by frame content, and
+    concurrent requests are micro-batched into one forward pass. Inference
+    itself is done by a pluggable backend (Config.KNN_EXTRACTOR_BACKEND).
+
+    Lifecycle: cold -> loading -> ready | failed. The backend is loaded once
+    behind a lock from the local artifact cache (see ModelArtifacts), then
+    warmed up with one inference, so the first real frame is not the slow one.
+    """
+
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, cache: EmbeddingCache = None, backend: AbstractFeatureBackend = None):
+        self.backend = backend or create_feature_backend()
+        self.state = self.COLD
+        self.load_ms: float = None
+        self.warmup_ms: float = None
+        self.error: str = None
+        self._load_lock = threading.Lock()
+        self._listeners = []
+        self._preload_started = False
+        self.cache = cache or EmbeddingCache(
+            max_size=Config.EMBEDDING_CACHE_SIZE,
+            use_phash=Config.EMBEDDING_CACHE_PHASH,
+            phash_tolerance=Config.EMBEDDING_CACHE_PHASH_TOLERANCE
+        )
+        self.batcher = InferenceBatcher(
+            self._forward_batch,
+            max_batch=Config.KNN_BATCH_MAX_SIZE,
+            max_wait_ms=Config.KNN_BATCH_MAX_WAIT_MS
+        )
+
+    def preload(self):
+        """Load the model in a background thread (once)."""
+        if self._preload_started:
+            return
+        self._preload_started = True
+        print("[FeatureExtractor] Starting background preload...")
+        threading.Thread(target=self._preload, daemon=True).start()
+
+    def _preload(self):
+        try:
+            self.ensure_loaded()
+        except Exception as e:
+            print(f"[FeatureExtractor] ❌ Preload failed: {e}")
+
+    def ensure_loaded(self):
+        """Load and warm up the backend exactly once; other callers wait for it. Raises if loading failed."""
+        if self.state == self.READY:
+            return
+        with self._load_lock:
+            if self.state == self.READY:
+                return
+            if self.state == self.FAILED:
+                raise RuntimeError(f"Feature backend failed to load: {self.error}")
+            self._set_state(self.LOADING)
+            try:
+                start = time.perf_counter()
+                self.backend.load()
+                self.load_ms = round((time.perf_counter() - start) * 1000, 1)
+
+                start = time.perf_counter()
+                blank = Image.new("RGB", (self.backend.input_size, self.backend.input_size))
+                self.backend.forward([self.backend.preprocess(blank)])
+                self.warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+            except Exception as e:
+                self.error = str(e)
+                self._set_state(self.FAILED)
+                raise
+            print(f"[FeatureExtractor] ✓ {self.backend.name} ready (load {self.load_ms}ms, warm-up {self.warmup_ms}ms)")
+            self._set_state(self.READY)
+
+    def readiness(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.state == self.READY,
+            "backend": self.backend.name,
+            "input_size": self.backend.input_size,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+        }
+
+    def add_listener(self, callback):
+        """callback() is called on every lifecycle state change."""
+        self._listeners.append(callback)
+
+    def _set_state(self, state: str):
+        self.state = state
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[FeatureExtractor] Listener error: {e}")
+
+    def extract(self, image_bytes):
+        """
+        Run image through the backend (or the cache). Returns a (1280,) numpy vector or None.
+
+        Accepts encoded bytes or an already decoded RGB array (H, W, 3) - the
+        latter skips decoding entirely.
+        """
+        cached, key, phash = self.cache.get(image_bytes)
+        if cached is not None:
+            return cached
+
+        vector = self._infer(image_bytes)
+        if vector is not None:
+            self.cache.put(key, vector, phash)
+        return vector
+
+    def _infer(self, image_bytes):
+        try:
+            self.ensure_loaded()
+
+            # Decode + transform in the caller's thread, batch only the forward pass
+            input_array = self.backend.preprocess(self._to_image(image_bytes))
+            return self.batcher.submit(input_array).result()
+
+        except Exception as e:
+            print(f"[FeatureExtractor] Extraction error: {e}")
+            return None
+
+    def _forward_batch(self, arrays: list) -> list:
+        """One backend pass for a list of (3, S, S) arrays."""
+        return self.backend.forward(arrays)
+
+    @staticmethod
+    def _to_image(image) -> Image.Image:
+        if isinstance(image, np.ndarray):
+            return Image.fromarray(np.ascontiguousarray(image)).convert('RGB')
+        return Image.open(BytesIO(image)).convert('RGB')
+
+
+def create_feature_backend(name: str = None, input_size: int = None) -> AbstractFeatureBackend:
+    """Backend by name (default: Config.KNN_EXTRACTOR_BACKEND), falling back to fp32 torch."""
+    name = name or Config.KNN_EXTRACTOR_BACKEND
+    input_size = input_size or Config.KNN_INPUT_SIZE
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        print(f"[FeatureExtractor] ⚠️ Unknown backend '{name}' - using torch")
+        backend_class = TorchFeatureBackend
+    try:
+        return backend_class(input_size)
+    except ImportError as e:
+        print(f"[FeatureExtractor] ⚠️ {e} - using torch")
+        return TorchFeatureBackend(input_size)
+
+
+# Process-wide instance
+_extractor: FeatureExtractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_feature_extractor() -> FeatureExtractor:
+    """Return the shared FeatureExtractor, creating it on first use."""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = FeatureExtractor()
+        return _extractor
@@ -0,0 +1,221 @@
+"""KNNIndex - Contiguous float32 vector index for nearest-neighbour queries."""
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class KNNIndex:
+    """
+    In-memory index backing KNNRecognizer.
+
+    All sample vectors live in a single contiguous float32 matrix (grown by
+    doubling) together with their cached squared norms, so a query is one
+    batched distance computation instead of a Python loop over samples.
+
+    Supports:
+    - k=1 nearest neighbour (default)
+    - k>1 majority voting
+    - per-label centroids as an optional fast mode
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 64):
+        self._lock = threading.RLock()
+        self._dim = dim
+        self._capacity = capacity
+        self._size = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._sq_norms: Optional[np.ndarray] = None
+        self._labels: list[str] = []
+
+        # Lazily computed per-label centroids (invalidated on every mutation)
+        self._centroid_labels: list[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._centroids_dirty = True
+
+    # --- PROPERTIES ---
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    @property
+    def labels(self) -> list[str]:
+        """Labels in insertion order (copy)."""
+        with self._lock:
+            return list(self._labels)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored vectors, shape (n, dim)."""
+        with self._lock:
+            if self._vectors is None:
+                return np.empty((0, self._dim or 0), dtype=np.float32)
+            return self._vectors[:self._size]
+
+    # --- MUTATIONS ---
+
+    def reset(self, vectors=None, labels: Optional[list[str]] = None) -> None:
+        """Replace the whole index content (used on load / dataset switch)."""
+        with self._lock:
+            labels = list(labels or [])
+            if vectors is None or len(labels) == 0:
+                self._size = 0
+                self._labels = []
+                self._vectors = None
+                self._sq_norms = None
+                self._centroids_dirty = True
+                return
+
+            matrix = np.asarray(vectors, dtype=np.float32)
+            if matrix.ndim != 2 or matrix.shape[0] != len(labels):
+                raise ValueError(f"Vectors shape {matrix.shape} does not match {len(labels)} labels")
+
+            self._dim = matrix.shape[1]
+            self._capacity = max(self._capacity, matrix.shape[0])
+            self._vectors = np.empty((self._capacity, self._dim), dtype=np.float32)
+            self._vectors[:matrix.shape[0]] = matrix
+            self._sq_norms = np.empty(self._capacity, dtype=np.float32)
+            self._sq_norms[:matrix.shape[0]] = np.einsum('ij,ij->i', matrix, matrix)
+            self._labels = labels
+            self._size = matrix.shape[0]
+            self._centroids_dirty = True
+
+    def add(self, vector, label: str) -> None:
+        """Append one vector."""
+        vec = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if self._dim is None:
+                self._dim = vec.shape[0]
+            elif vec.shape[0] != self._dim:
+                raise ValueError(f"Vector dim {vec.shape[0]} != index dim {self._dim}")
+
+            self._grow(self._size + 1)
+            self._vectors[self._size] = vec
+            self._sq_norms[self._size] = float(vec @ vec)
+            self._labels.append(label)
+            self._size += 1
+            self._centroids_dirty = True
+
+    def remove_label(self, label: str) -> int:
+        """Remove all vectors of a label. Returns the number removed."""
+        with self._lock:
+            keep = [i for i, l in enumerate(self._labels) if l != label]
+            removed = self._size - len(keep)
+            if removed:
+                self.reset(self._vectors[keep] if keep else None, [self._labels[i] for i in keep])
+            return removed
+
+    def pop(self) -> Optional[str]:
+        """Remove the most recently added vector. Returns its label or None."""
+        with self._lock:
+            if self._size == 0:
+                return None
+            self._size -= 1
+            self._centroids_dirty = True
+            return self._labels.pop()
+
+    def _grow(self, needed: int) -> None:
+        if self._vectors is not None and needed <= self._vectors.shape[0]:
+            return
+        new_capacity = max(self._capacity, 1)
+        while new_capacity < needed:
+            new_capacity *= 2
+        vectors = np.empty((new_capacity, self._dim), dtype=np.float32)
+        sq_norms = np.empty(new_capacity, dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            sq_norms[:self._size] = self._sq_norms[:self._size]
+        self._vectors = vectors
+        self._sq_norms = sq_norms
+        self._capacity = new_capacity
+
+    # --- QUERIES ---
+
+    def distances(self, vector) -> np.ndarray:
+        """Euclidean distance from `vector` to every stored vector."""
+        q = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if self._size == 0:
+                return np.empty(0, dtype=np.float32)
+            return self._euclidean(q, self._vectors[:self._size], self._sq_norms[:self._size])
+
+    def query(self, vector, k: int = 1, use_centroids: bool = False) -> tuple[str, float]:
+        """
+        Find the best label for a vector.
+
+        Args:
+            vector: Query feature vector.
+            k: Number of neighbours for majority voting (ignored with centroids).
+            use_centroids: Compare against per-label centroids instead of samples.
+
+        Returns:
+            (label, distance) - distance is to the nearest vector (or centroid)
+            of the winning label. ("Unknown", inf) if the index is empty.
+        """
+        q = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if self._size == 0:
+                return "Unknown", float('inf')
+
+            if use_centroids:
+                self._ensure_centroids()
+                c_norms = np.einsum('ij,ij->i', self._centroids, self._centroids)
+                dists = self._euclidean(q, self._centroids, c_norms)
+                best = int(np.argmin(dists))
+                return self._centroid_labels[best], float(dists[best])
+
+            dists = self._euclidean(q, self._vectors[:self._size], self._sq_norms[:self._size])
+            labels = list(self._labels)  # Snapshot: add/pop/remove_label mutate the list in place
+
+        k = max(1, min(int(k), len(dists)))
+        if k == 1:
+            best = int(np.argmin(dists))
+            return labels[best], float(dists[best])
+
+        nearest = np.argpartition(dists, k - 1)[:k]
+        votes: dict[str, int] = {}
+        closest: dict[str, float] = {}
+        for i in nearest:
+            label = labels[i]
+            votes[label] = votes.get(label, 0) + 1
+            closest[label] = min(closest.get(label, float('inf')), float(dists[i]))
+
+        # Most votes wins, ties broken by the closest neighbour
+        winner = min(votes, key=lambda l: (-votes[l], closest[l]))
+        return winner, closest[winner]
+
+    def nearest_per_label(self, vector) -> dict[str, float]:
+        """Distance from a vector to the nearest sample of every label."""
+        q = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if self._size == 0:
+                return {}
+            dists = self._euclidean(q, self._vectors[:self._size], self._sq_norms[:self._size])
+            labels = list(self._labels)
+
+        nearest: dict[str, float] = {}
+        for label, dist in zip(labels, dists.tolist()):
+            if dist < nearest.get(label, float('inf')):
+                nearest[label] = dist
+        return nearest
+
+    def _ensure_centroids(self) -> None:
+        if not self._centroids_dirty:
+            return
+        names = sorted(set(self._labels))
+        labels = np.asarray(self._labels)
+        vectors = self._vectors[:self._size]
+        self._centroids = np.stack([vectors[labels == name].mean(axis=0) for name in names]).astype(np.float32)
+        self._centroid_labels = names
+        self._centroids_dirty = False
+
+    @staticmethod
+    def _euclidean(q: np.ndarray, matrix: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b  (one GEMV for the whole index)
+        sq = sq_norms - 2.0 * (matrix @ q) + float(q @ q)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq)
@@ -1,34 +1,21 @@
 
-import os
-import json
-import numpy as np
 import time
-import threading
-from PIL import Image
-import ssl
 from pathlib import Path
 
 from src.Framework.Recognition.AbstractRecognizer import AbstractRecognizer
-
-# Fix for MacOS SSL certificate verification error when downloading models
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-
-# Global imports (lazy loaded to avoid slowing down startup if missing)
-torch = None
-transforms = None
-models = None
+from src.Core.Config import Config
+from .KNNIndex import KNNIndex
+from .SampleStore import SampleStore
+from .FeatureExtractor import FeatureExtractor, get_feature_extractor
 
 class KNNRecognizer(AbstractRecognizer):
     """
     KNN Service for Object Recognition using MobileNetV2.
+
+    Feature extraction is delegated to a FeatureExtractor, shared
+    process-wide by default so every recognizer uses the same model.
     """
-    def __init__(self, dataset_name="default_dataset"):
+    def __init__(self, dataset_name="default_dataset", extractor: FeatureExtractor = None):
         # Since this class is in src/Core/Recognition, parent.parent.parent is src/
         # Adjust path dynamically based on file location
         current_file = Path(__file__).resolve()
@@ -38,50 +25,36 @@ class KNNRecognizer(AbstractRecognizer):
         self.model_dir = self.root_dir / "model"
         self.model_dir.mkdir(exist_ok=True)
         
+        # One-shot migration of legacy JSON datasets to the binary format
+        SampleStore.migrate_all(self.model_dir)
+        
         self.dataset_name = dataset_name
-        self.samples_file = self.model_dir / f"{dataset_name}.json"
+        self.store = SampleStore(self.model_dir, dataset_name)
         
-        self.training_samples = []  # List of {'label': str, 'vector': []}
-        self.model = None
-        self.transform = None
+        self.training_samples = []  # List of {'label': str, 'id': str} (vectors live in self.index)
+        self.index = KNNIndex()     # Contiguous float32 matrix, kept in sync with training_samples
+        self._dirty = False         # True when samples were added with save=False
+        self.extractor = extractor or get_feature_extractor()
         
         self.load_samples()
         
         # Preload dependencies and model in background
-        print("[KNNRecognizer] Starting background preload...")
-        threading.Thread(target=self._ensure_deps, daemon=True).start()
+        self.extractor.preload()
         
     def _ensure_deps(self):
-        """Lazy load dependencies."""
-        global torch, transforms, models
-        if torch is None:
-            import torch
-            from torchvision import transforms, models
-            
-        if self.model is None:
-            # Load MobileNetV2 (pretrained)
-            print("[KNNRecognizer] Loading MobileNetV2...")
-            base_model = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.DEFAULT)
-            # Remove classifier (last layer) to get features
-            self.model = torch.nn.Sequential(*list(base_model.children())[:-1])
-            self.model.eval()
-            
-            self.transform = transforms.Compose([
-                transforms.Resize(224),
-                transforms.CenterCrop(224),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                                     std=[0.229, 0.224, 0.225])
-            ])
+        """Block until the shared extractor is loaded and warmed up (once)."""
+        self.extractor.ensure_loaded()
 
     def set_dataset(self, name):
         """Switch dataset."""
         self.dataset_name = name
-        self.samples_file = self.model_dir / f"{name}.json"
+        self.store = SampleStore(self.model_dir, name)
+        self.store.migrate_legacy()
         
         # Ensure file exists if it's new
-        if not self.samples_file.exists():
+        if not self.store.exists():
             self.training_samples = []
+            self.index.reset()
             self._save_samples()
         else:
             self.load_samples()
@@ -92,8 +65,7 @@ class KNNRecognizer(AbstractRecognizer):
 
     def list_datasets(self):
         """List available datasets."""
-        files = [f.replace(".json", "") for f in os.listdir(self.model_dir) if f.endswith(".json")]
-        return files or ["default_dataset"]
+        return SampleStore.list_names(self.model_dir) or ["default_dataset"]
 
     def add_sample(self, image_bytes, label, save=True):
         """Extract features and save sample."""
@@ -103,12 +75,15 @@ class KNNRecognizer(AbstractRecognizer):
         if vector is not None:
             sample = {
                 "label": label,
-                "vector": vector.tolist(),  # Convert numpy to list for JSON
                 "id": str(time.time())
             }
             self.training_samples.append(sample)
+            self.index.add(vector, label)
             if save:
-                self._save_samples()
+                # Append-only: one row + one sidecar line
+                self.store.append(vector, sample)
+            else:
+                self._dirty = True
             print(f"[KNNRecognizer] Added sample '{label}' to {self.dataset_name} (Total: {len(self.training_samples)})")
             return True
         return False
@@ -117,9 +92,16 @@ class KNNRecognizer(AbstractRecognizer):
         """Force save to disk."""
         self._save_samples()
 
-    def predict(self, image_bytes) -> tuple[str, float]:
-        """Find nearest neighbor."""
-        if not self.training_samples:
+    def predict(self, image_bytes, k: int = None, use_centroids: bool = None) -> tuple[str, float]:
+        """
+        Find nearest neighbor.
+
+        Args:
+            image_bytes: Input image.
+            k: Neighbours for majority voting (default: Config.KNN_K).
+            use_centroids: Compare against per-label centroids (default: Config.KNN_USE_CENTROIDS).
+        """
+        if len(self.index) == 0:
             return "Need Training", 0.0
             
         self._ensure_deps()
@@ -127,27 +109,48 @@ class KNNRecognizer(AbstractRecognizer):
         vector = self._extract_vector(image_bytes)
         if vector is None:
             return "Error", 0.0
-            
-        # Linear scan for nearest neighbor (simple KNN k=1)
-        min_dist = float('inf')
-        best_label = "Unknown"
         
-        for sample in self.training_samples:
-            try:
-                sample_vec = np.array(sample['vector'])
-                dist = np.linalg.norm(vector - sample_vec)
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    best_label = sample['label']
-            except:
-                continue
-                
-        return best_label, min_dist
+        return self.index.query(
+            vector,
+            k=Config.KNN_K if k is None else k,
+            use_centroids=Config.KNN_USE_CENTROIDS if use_centroids is None else use_centroids
+        )
+
+    def label_distances(self, image_bytes) -> dict[str, float]:
+        """Distance to the nearest sample of each label ({} if untrained or on error)."""
+        if len(self.index) == 0:
+            return {}
+
+        self._ensure_deps()
+
+        vector = self._extract_vector(image_bytes)
+        if vector is None:
+            return {}
+        return self.index.nearest_per_label(vector)
+
+    def predict_with_distances(self, image_bytes, k: int = None,
+                               use_centroids: bool = None) -> tuple[str, float, dict[str, float]]:
+        """predict() plus label_distances() from a single embedding (for margin checks)."""
+        if len(self.index) == 0:
+            return "Need Training", 0.0, {}
+
+        self._ensure_deps()
+
+        vector = self._extract_vector(image_bytes)
+        if vector is None:
+            return "Error", 0.0, {}
+
+        label, distance = self.index.query(
+            vector,
+            k=Config.KNN_K if k is None else k,
+            use_centroids=Config.KNN_USE_CENTROIDS if use_centroids is None else use_centroids
+        )
+        return label, distance, self.index.nearest_per_label(vector)
 
     def delete_label(self, label):
         """Remove all samples of a label."""
         self.training_samples = [s for s in self.training_samples if s['label'] != label]
+        self.index.remove_label(label)
         self._save_samples()
         print(f"[KNNRecognizer] Deleted label '{label}' from {self.dataset_name}")
 
@@ -158,7 +161,11 @@ class KNNRecognizer(AbstractRecognizer):
             return None
         
         removed = self.training_samples.pop()
-        self._save_samples()
+        self.index.pop()
+        if self._dirty:
+            self._save_samples()
+        else:
+            self.store.pop()
         print(f"[KNNRecognizer] Popped last sample '{removed.get('label')}' (Remaining: {len(self.training_samples)})")
         return removed
         
@@ -171,39 +178,24 @@ class KNNRecognizer(AbstractRecognizer):
         return counts
 
     def _extract_vector(self, image_bytes):
-        """Run image through MobileNetV2."""
-        try:
-            import torch
-            from io import BytesIO
-            
-            img = Image.open(BytesIO(image_bytes)).convert('RGB')
-            input_tensor = self.transform(img).unsqueeze(0)  # Add batch dim
-            
-            with torch.no_grad():
-                features = self.model(input_tensor)
-                # Global Average Pooling (1280, 7, 7) -> (1280)
-                features = torch.nn.functional.adaptive_avg_pool2d(features, (1, 1))
-                features = torch.flatten(features, 1)
-                
-            return features[0].numpy()
-            
-        except Exception as e:
-            print(f"[KNNRecognizer] Extraction error: {e}")
-            return None
+        """Run image through the shared feature extractor."""
+        return self.extractor.extract(image_bytes)
 
     def _save_samples(self):
-        """Save to JSON."""
-        with open(self.samples_file, 'w') as f:
-            json.dump(self.training_samples, f)
+        """Rewrite the whole dataset to the binary store."""
+        vectors = self.index.vectors if len(self.index) else None
+        self.store.write_all(vectors, self.training_samples)
+        self._dirty = False
 
     def load_samples(self):
-        """Load from JSON."""
-        if os.path.exists(self.samples_file):
-            try:
-                with open(self.samples_file, 'r') as f:
-                    self.training_samples = json.load(f)
-                # print(f"[KNNRecognizer] Loaded {len(self.training_samples)} samples from {self.dataset_name}")
-            except Exception as e:
-                print(f"[KNNRecognizer] Load error: {e}")
-        else:
-            self.training_samples = []
+        """Load from the binary store (memory-mapped, no parsing)."""
+        try:
+            vectors, meta = self.store.load()
+        except Exception as e:
+            print(f"[KNNRecognizer] Load error: {e}")
+            vectors, meta = None, []
+        
+        self.training_samples = meta
+        self.index.reset(vectors, [m['label'] for m in meta])
+        self._dirty = False
+        # print(f"[KNNRecognizer] Loaded {len(self.training_samples)} samples from {self.dataset_name}")
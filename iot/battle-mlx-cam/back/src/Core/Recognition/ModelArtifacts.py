@@ -0,0 +1,86 @@
+"""ModelArtifacts - Local cache of model weights, loaded at runtime without network access."""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import ssl
+import urllib.request
+
+from src.Core.Config import Config
+
+try:
+    import certifi
+except ImportError:  # Installed with requests; falls back to the system CA store
+    certifi = None
+
+
+def weights_path(url: str) -> str:
+    return os.path.join(Config.KNN_WEIGHTS_DIR, os.path.basename(url))
+
+
+def load_state_dict(url: str) -> dict:
+    """
+    Weights for `url` from the artifact cache (model/weights/).
+
+    Never downloads: a checkpoint already in the torch hub cache is adopted,
+    otherwise this raises and `python -m src.Core.Recognition.ModelArtifacts`
+    must be run once (with network) to fetch it.
+    """
+    import torch
+
+    path = weights_path(url)
+    if not os.path.exists(path):
+        hub_checkpoint = os.path.join(torch.hub.get_dir(), "checkpoints", os.path.basename(url))
+        if os.path.exists(hub_checkpoint):
+            os.makedirs(Config.KNN_WEIGHTS_DIR, exist_ok=True)
+            shutil.copyfile(hub_checkpoint, path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Model weights {path} not found - run once: python -m src.Core.Recognition.ModelArtifacts"
+        )
+    return torch.load(path, map_location="cpu", weights_only=True)
+
+
+def fetch(url: str) -> str:
+    """Download weights into the artifact cache (verified TLS, checked against the file's hash prefix)."""
+    path = weights_path(url)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(Config.KNN_WEIGHTS_DIR, exist_ok=True)
+    context = ssl.create_default_context(cafile=certifi.where() if certifi else None)
+    tmp_path = path + ".tmp"
+    print(f"[ModelArtifacts] Downloading {url}...")
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url, context=context, timeout=60) as response, open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: response.read(1 << 20), b""):
+            digest.update(chunk)
+            f.write(chunk)
+
+    # torchvision file names end with the first hex digits of their SHA-256
+    expected = re.search(r"[-_]([0-9a-f]{8,})\.pth$", url)
+    if expected and not digest.hexdigest().startswith(expected.group(1)):
+        os.remove(tmp_path)
+        raise ValueError(f"Checksum mismatch for {url}")
+    os.replace(tmp_path, path)
+    return path
+
+
+def prepare(backend_name: str = None, input_size: int = None) -> None:
+    """Fetch everything a backend needs, then load and warm it once (ONNX: exports the model)."""
+    from .FeatureExtractor import create_feature_backend
+
+    backend = create_feature_backend(backend_name, input_size)
+    for url in backend.artifacts():
+        print(f"[ModelArtifacts] ✓ {fetch(url)}")
+    backend.load()
+    print(f"[ModelArtifacts] ✓ {backend.name} ({backend.input_size}px) ready")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch and prepare the KNN feature-extractor artifacts")
+    parser.add_argument("--backend", default=Config.KNN_EXTRACTOR_BACKEND, help="torch | torch-int8 | onnx")
+    parser.add_argument("--input-size", type=int, default=Config.KNN_INPUT_SIZE)
+    args = parser.parse_args()
+    prepare(args.backend, args.input_size)
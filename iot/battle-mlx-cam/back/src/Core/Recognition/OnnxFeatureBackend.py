@@ -0,0 +1,87 @@
+"""OnnxFeatureBackend - MobileNetV2 embeddings with ONNX Runtime (no torch import at runtime)."""
+import inspect
+import os
+
+import numpy as np
+
+from src.Framework.Recognition.AbstractFeatureBackend import AbstractFeatureBackend
+from src.Core.Config import Config
+
+try:
+    import onnxruntime
+except ImportError:  # Optional dependency (pip install onnxruntime)
+    onnxruntime = None
+
+
+class OnnxFeatureBackend(AbstractFeatureBackend):
+    """
+    The fp32 MobileNetV2 feature model exported to ONNX (pooling included).
+
+    The export is written once to `model_dir` (one file per input size) and
+    needs torch; later starts only load onnxruntime and the file, which is
+    much faster than importing torch. Embeddings match the torch backend up
+    to float rounding.
+    """
+
+    name = "onnx"
+
+    def __init__(self, input_size: int = 224, model_dir: str = Config.KNN_MODEL_DIR, threads: int = 0):
+        if onnxruntime is None:
+            raise ImportError("OnnxFeatureBackend requires onnxruntime (pip install onnxruntime)")
+        super().__init__(input_size)
+        self.model_path = os.path.join(model_dir, f"mobilenet_v2_features_{input_size}.onnx")
+        self.threads = threads  # 0 = onnxruntime default (all physical cores)
+        self.session = None
+
+    def artifacts(self) -> list[str]:
+        if os.path.exists(self.model_path):
+            return []
+        from .TorchFeatureBackend import TorchFeatureBackend
+        return TorchFeatureBackend(self.input_size).artifacts()  # Weights for the one-time export
+
+    def load(self) -> None:
+        if not os.path.exists(self.model_path):
+            self.export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+        print(f"[OnnxFeatureBackend] Loaded {os.path.basename(self.model_path)}")
+
+    def export(self) -> None:
+        """Export the torch fp32 feature model (+ global average pooling) to model_path."""
+        from .TorchFeatureBackend import TorchFeatureBackend, _import_torch
+        torch = _import_torch()
+
+        source = TorchFeatureBackend(self.input_size)
+        source.load()
+
+        class _Pooled(torch.nn.Module):
+            def __init__(self, features):
+                super().__init__()
+                self.features = features
+
+            def forward(self, x):
+                return self.features(x).mean(dim=(2, 3))
+
+        print(f"[OnnxFeatureBackend] Exporting MobileNetV2 to {self.model_path}...")
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        tmp_path = self.model_path + ".tmp"
+        # torch >= 2.5 defaults to the dynamo exporter (needs onnxscript): keep the TorchScript one
+        legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        torch.onnx.export(
+            _Pooled(source.model).eval(),
+            (torch.zeros(1, 3, self.input_size, self.input_size),),
+            tmp_path,
+            input_names=["input"],
+            output_names=["features"],
+            dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+            **legacy,
+        )
+        os.replace(tmp_path, self.model_path)
+
+    def forward(self, batch: list[np.ndarray]) -> list[np.ndarray]:
+        features = self.session.run(None, {self._input_name: np.stack(batch)})[0]
+        return list(features)
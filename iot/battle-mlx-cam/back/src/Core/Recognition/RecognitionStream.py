@@ -0,0 +1,81 @@
+"""RecognitionStream - Per-role temporal smoothing of KNN predictions."""
+import threading
+from collections import Counter, deque
+from typing import Optional
+
+from src.Core.Config import Config
+
+
+class RecognitionStream:
+    """
+    Turns noisy per-frame KNN predictions into a stable label.
+
+    Each frame's prediction is first accepted or rejected:
+    - distance: the nearest sample must be within `threshold`
+    - margin: the second-best label must be at least `margin` further away
+    Accepted labels (rejections count as "no label") go into a sliding window
+    of the last `window` frames; a label is stable once it has `votes` of them.
+    Only freshly recognized frames vote: frames skipped by the ChangeDetector
+    reuse a result without adding it to the window again.
+    One lucky frame can no longer validate a counter or start a generation,
+    and once a label is stable, frames rejected on their own still do not.
+    """
+
+    def __init__(self, threshold: float = Config.KNN_DISTANCE_THRESHOLD, margin: float = Config.KNN_MIN_MARGIN,
+                 window: int = Config.KNN_VOTE_WINDOW, votes: int = Config.KNN_VOTE_MIN):
+        self.threshold = threshold
+        self.margin = margin
+        self.votes = max(1, min(votes, window))
+        self._window: deque[Optional[str]] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+        self.stable_label: Optional[str] = None
+        self.frames = 0
+        self.rejected_distance = 0
+        self.rejected_margin = 0
+
+    def update(self, label: str, distance: float, distances: dict[str, float]) -> tuple[Optional[str], bool]:
+        """
+        Add one frame's prediction.
+
+        Returns (stable label, None while undecided; whether this frame itself
+        was accepted for that label). A stable label outlives a few rejected
+        frames, so only accepted frames should validate or be generated from.
+
+        distances: nearest distance per label for the same frame
+                   (labels missing from it, e.g. "Need Training", are rejected).
+        """
+        with self._lock:
+            self.frames += 1
+            accepted = self._accept(label, distances)
+            self._window.append(accepted)
+            counts = Counter(l for l in self._window if l is not None).most_common(1)
+            self.stable_label = counts[0][0] if counts and counts[0][1] >= self.votes else None
+            return self.stable_label, accepted is not None and accepted == self.stable_label
+
+    def _accept(self, label: str, distances: dict[str, float]) -> Optional[str]:
+        # Called with self._lock held
+        best = distances.get(label)
+        if best is None or best > self.threshold:
+            self.rejected_distance += 1
+            return None
+        second = min((d for l, d in distances.items() if l != label), default=float('inf'))
+        if second - best < self.margin:
+            self.rejected_margin += 1
+            return None
+        return label
+
+    def reset(self) -> None:
+        """Forget the window (new attack phase, new drawing expected)."""
+        with self._lock:
+            self._window.clear()
+            self.stable_label = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stable_label": self.stable_label,
+                "window": list(self._window),
+                "frames": self.frames,
+                "rejected_distance": self.rejected_distance,
+                "rejected_margin": self.rejected_margin,
+            }
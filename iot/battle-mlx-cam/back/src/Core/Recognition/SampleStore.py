@@ -0,0 +1,244 @@
+"""SampleStore - Compact binary on-disk format for KNN training samples."""
+import ast
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# Fixed header size (multiple of 64) so the shape can be rewritten in place on append
+NPY_HEADER_SIZE = 128
+
+
+class SampleStore:
+    """
+    Binary storage for one KNN dataset.
+
+    Layout in the model directory:
+    - <name>.npy          float32 matrix (n, dim), standard .npy readable by np.load
+    - <name>.labels.jsonl one {"label", "id"} object per line (sidecar)
+
+    Appending a sample writes one row + one sidecar line and patches the
+    fixed-size .npy header in place, so it is O(1) I/O regardless of the
+    dataset size. Loading memory-maps the matrix instead of parsing JSON.
+
+    The header row count is always written last (after the sidecar line on
+    append, before truncating it on pop), so after a crash the sidecar can
+    only be ahead of the matrix. The first access repairs that on disk by
+    truncating both files to the shorter length.
+    """
+
+    def __init__(self, model_dir: Path, name: str):
+        self.model_dir = Path(model_dir)
+        self.name = name
+        self.vectors_file = self.model_dir / f"{name}.npy"
+        self.labels_file = self.model_dir / f"{name}.labels.jsonl"
+        self.legacy_file = self.model_dir / f"{name}.json"
+        self._repaired = False
+
+    # --- READ ---
+
+    def exists(self) -> bool:
+        return self.vectors_file.exists() and self.labels_file.exists()
+
+    def load(self) -> tuple[Optional[np.ndarray], list[dict]]:
+        """
+        Load the dataset.
+
+        Returns:
+            (vectors, meta) - vectors is a read-only memory map of shape (n, dim)
+            (or None when empty), meta is the list of {"label", "id"} dicts.
+        """
+        if not self.exists():
+            return None, []
+        self._repair()
+
+        with open(self.vectors_file, 'rb') as f:
+            rows, _ = self._read_shape(f)
+        if rows == 0:
+            return None, []
+
+        meta = []
+        with open(self.labels_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    meta.append(json.loads(line))
+
+        vectors = np.load(self.vectors_file, mmap_mode='r')
+        n = min(vectors.shape[0], len(meta))  # Equal after _repair()
+        return vectors[:n], meta[:n]
+
+    # --- WRITE ---
+
+    def write_all(self, vectors: Optional[np.ndarray], meta: list[dict]) -> None:
+        """Rewrite the whole dataset (used for deletes and migration)."""
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self.vectors_file.with_suffix(".npy.tmp")
+        tmp_labels = self.labels_file.with_suffix(".jsonl.tmp")
+
+        if vectors is None or len(meta) == 0:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with open(tmp_vectors, 'wb') as f:
+            f.write(self._header(matrix.shape))
+            f.write(matrix.tobytes())
+        with open(tmp_labels, 'w') as f:
+            for m in meta:
+                f.write(json.dumps(m) + "\n")
+
+        os.replace(tmp_vectors, self.vectors_file)
+        os.replace(tmp_labels, self.labels_file)
+        self._repaired = True
+
+    def append(self, vector: np.ndarray, meta: dict) -> None:
+        """Append one sample (one row + one sidecar line)."""
+        row = np.ascontiguousarray(vector, dtype=np.float32).ravel()
+        if not self.exists():
+            self.write_all(row[None, :], [meta])
+            return
+        self._repair()
+
+        with open(self.vectors_file, 'r+b') as f:
+            rows, dim = self._read_shape(f)
+            if rows and dim != row.shape[0]:
+                raise ValueError(f"Vector dim {row.shape[0]} != dataset dim {dim}")
+            try:
+                f.seek(NPY_HEADER_SIZE + rows * row.shape[0] * 4)
+                f.write(row.tobytes())
+                f.truncate()
+                # Row, then sidecar line, then the header that makes both visible
+                with open(self.labels_file, 'a') as labels:
+                    labels.write(json.dumps(meta) + "\n")
+                f.seek(0)
+                f.write(self._header((rows + 1, row.shape[0])))
+            except Exception:
+                self._repaired = False  # Partial writes are trimmed on the next access
+                raise
+
+    def pop(self) -> None:
+        """Drop the last sample by truncating both files (no rewrite)."""
+        if not self.exists():
+            return
+        self._repair()
+
+        with open(self.vectors_file, 'r+b') as f:
+            rows, dim = self._read_shape(f)
+            if rows == 0:
+                return
+            rows -= 1
+            f.seek(0)
+            f.write(self._header((rows, dim) if rows else (0, 0)))
+            f.truncate(NPY_HEADER_SIZE + rows * dim * 4)
+        with open(self.labels_file, 'r+b') as f:
+            f.truncate(self._line_offset(f, 1))
+
+    def _repair(self) -> None:
+        """Truncate the matrix and the sidecar to the samples both hold (once per instance)."""
+        if self._repaired:
+            return
+        self._repaired = True
+
+        with open(self.vectors_file, 'r+b') as vectors, open(self.labels_file, 'r+b') as labels:
+            rows, dim = self._read_shape(vectors)
+            if dim:
+                rows = min(rows, (os.fstat(vectors.fileno()).st_size - NPY_HEADER_SIZE) // (dim * 4))
+
+            # Complete lines only: a torn last line does not count
+            offsets = [0]
+            for line in labels:
+                if not line.endswith(b"\n"):
+                    break
+                offsets.append(offsets[-1] + len(line))
+            n = min(rows, len(offsets) - 1)
+
+            if offsets[n] != os.fstat(labels.fileno()).st_size:
+                print(f"[SampleStore] Repairing {self.name}: {len(offsets) - 1} labels, {rows} vectors -> {n}")
+                labels.truncate(offsets[n])
+            if dim and os.fstat(vectors.fileno()).st_size != NPY_HEADER_SIZE + n * dim * 4:
+                vectors.seek(0)
+                vectors.write(self._header((n, dim) if n else (0, 0)))
+                vectors.truncate(NPY_HEADER_SIZE + n * dim * 4)
+
+    @staticmethod
+    def _line_offset(f, count: int, chunk_size: int = 4096) -> int:
+        """Byte offset where the last `count` lines of f start, reading backwards from the end."""
+        end = f.seek(0, os.SEEK_END)
+        pos, newlines = end, 0
+        while pos > 0:
+            start = max(0, pos - chunk_size)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            # The file's final newline ends the last line, it does not start it
+            for i in range(len(chunk) - 1, -1, -1):
+                if chunk[i] == 0x0A and start + i != end - 1:
+                    newlines += 1
+                    if newlines == count:
+                        return start + i + 1
+            pos = start
+        return 0
+
+    # --- MIGRATION ---
+
+    def migrate_legacy(self) -> bool:
+        """
+        Convert <name>.json (list of {'label', 'vector', 'id'}) to the binary format.
+        The JSON file is kept as <name>.json.migrated. Returns True if migrated.
+        """
+        if self.exists() or not self.legacy_file.exists():
+            return False
+
+        with open(self.legacy_file, 'r') as f:
+            samples = json.load(f)
+
+        samples = [s for s in samples if s.get('vector')]
+        vectors = np.asarray([s['vector'] for s in samples], dtype=np.float32) if samples else None
+        meta = [{"label": s['label'], "id": s.get('id', str(i))} for i, s in enumerate(samples)]
+        self.write_all(vectors, meta)
+        os.replace(self.legacy_file, self.legacy_file.with_suffix(".json.migrated"))
+        print(f"[SampleStore] Migrated {self.legacy_file.name} -> {self.vectors_file.name} ({len(meta)} samples)")
+        return True
+
+    @staticmethod
+    def migrate_all(model_dir: Path) -> int:
+        """One-shot migration of every legacy model/*.json dataset. Returns count migrated."""
+        model_dir = Path(model_dir)
+        if not model_dir.exists():
+            return 0
+        migrated = 0
+        for f in sorted(model_dir.glob("*.json")):
+            try:
+                if SampleStore(model_dir, f.stem).migrate_legacy():
+                    migrated += 1
+            except Exception as e:
+                print(f"[SampleStore] Migration failed for {f.name}: {e}")
+        return migrated
+
+    @staticmethod
+    def list_names(model_dir: Path) -> list[str]:
+        return sorted(f.stem for f in Path(model_dir).glob("*.npy"))
+
+    # --- NPY HEADER ---
+
+    @staticmethod
+    def _header(shape: tuple) -> bytes:
+        desc = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % shape
+        body_len = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+        body = desc.ljust(body_len - 1) + "\n"
+        return NPY_MAGIC + len(body).to_bytes(2, 'little') + body.encode('latin1')
+
+    @staticmethod
+    def _read_shape(f) -> tuple[int, int]:
+        f.seek(0)
+        head = f.read(NPY_HEADER_SIZE)
+        if not head.startswith(NPY_MAGIC):
+            raise ValueError("Not a .npy file")
+        header_len = int.from_bytes(head[8:10], 'little')
+        if 10 + header_len != NPY_HEADER_SIZE:
+            raise ValueError("Unsupported .npy header size (not written by SampleStore)")
+        shape = ast.literal_eval(head[10:10 + header_len].decode('latin1'))['shape']
+        return shape if len(shape) == 2 else (0, 0)
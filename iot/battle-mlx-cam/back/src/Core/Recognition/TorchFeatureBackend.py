@@ -0,0 +1,73 @@
+"""TorchFeatureBackend - MobileNetV2 embeddings with PyTorch (fp32 eager or int8 quantized)."""
+import numpy as np
+
+from src.Framework.Recognition.AbstractFeatureBackend import AbstractFeatureBackend
+from .ModelArtifacts import load_state_dict
+
+# Lazy loaded: importing torch is the slowest part of startup
+torch = None
+
+
+def _import_torch():
+    global torch
+    if torch is None:
+        import torch as _torch
+        torch = _torch
+    return torch
+
+
+class TorchFeatureBackend(AbstractFeatureBackend):
+    """torchvision MobileNetV2 (ImageNet weights) without its classifier, fp32 eager mode."""
+
+    name = "torch"
+
+    def __init__(self, input_size: int = 224):
+        super().__init__(input_size)
+        self.model = None
+
+    def load(self) -> None:
+        _import_torch()
+        print(f"[{type(self).__name__}] Loading MobileNetV2 ({self.input_size}px)...")
+        self.model = self._build_model()
+        self.model.eval()
+
+    def artifacts(self) -> list[str]:
+        from torchvision import models
+        return [models.MobileNet_V2_Weights.DEFAULT.url]
+
+    def _build_model(self):
+        from torchvision import models
+        base_model = models.mobilenet_v2(weights=None)
+        base_model.load_state_dict(load_state_dict(self.artifacts()[0]))
+        # Remove classifier (last layer) to get features
+        return torch.nn.Sequential(*list(base_model.children())[:-1])
+
+    def forward(self, batch: list[np.ndarray]) -> list[np.ndarray]:
+        with torch.inference_mode():
+            features = self.model(torch.from_numpy(np.stack(batch)))
+            # Global Average Pooling (N, 1280, h, w) -> (N, 1280)
+            features = torch.nn.functional.adaptive_avg_pool2d(features, (1, 1))
+            features = torch.flatten(features, 1)
+        return list(features.numpy())
+
+
+class QuantizedTorchFeatureBackend(TorchFeatureBackend):
+    """
+    int8 MobileNetV2 from torchvision's quantized model zoo (fused conv+bn+relu,
+    qnnpack kernels, which the pretrained int8 weights are calibrated for).
+    Embeddings stay close to the fp32 ones, so existing datasets keep working
+    (see benchmark_extractors.py).
+    """
+
+    name = "torch-int8"
+
+    def artifacts(self) -> list[str]:
+        from torchvision.models import quantization
+        return [quantization.MobileNet_V2_QuantizedWeights.DEFAULT.url]
+
+    def _build_model(self):
+        from torchvision.models import quantization
+        base_model = quantization.mobilenet_v2(weights=None, quantize=True, backend="qnnpack")
+        base_model.load_state_dict(load_state_dict(self.artifacts()[0]))
+        # quant -> int8 features -> dequant (classifier dropped)
+        return torch.nn.Sequential(base_model.quant, base_model.features, base_model.dequant)
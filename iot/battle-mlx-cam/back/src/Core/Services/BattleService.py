@@ -1,9 +1,8 @@
 """Headless Battle Service - Core battle logic using State Pattern."""
+import os
 import threading
 import time
-import base64
-import io
-from PIL import Image
+from dataclasses import dataclass
 from typing import Optional
 
 from ..Config import Config
@@ -14,6 +13,13 @@ from ..Recognition.KNNRecognizer import KNNRecognizer
 # New OOP Classes
 from .RoleState import RoleState
 from .SyncManager import SyncManager
+from .FramePipeline import FramePipeline, DecodedFrame
+from .Cancellation import CancelToken
+from .GenerationPipeline import GenerationPipeline, PipelineStage
+from .StatusPublisher import StatusPublisher
+from .Scheduler import Scheduler
+from .ImageStore import ImageStore
+from .Tracer import Trace, Tracer
 
 from .BattleState.BattleState import BattleState
 from .BattleState.IdleState import IdleState
@@ -28,6 +34,16 @@ GENERATION_RATE_LIMIT_S = 2.0
 INITIAL_HP = 3  # 3-phase combat: BOUCLIER → PLUIE → LUNE
 
 
+@dataclass
+class _ImageTask:
+    """A frame travelling through the generation pipeline."""
+    state: RoleState
+    frame: DecodedFrame
+    prediction: Optional[tuple] = None
+    result: Optional[ProcessingResult] = None
+    trace: Optional[Trace] = None
+
+
 class BattleService:
     """Headless battle service managing AI processing and WebSocket."""
     
@@ -39,12 +55,22 @@ class BattleService:
         }
         
         # Core services
-        self.processor = ImageProcessor()
-        self.ws = RiftWebSocket()
+        # One recognizer (and one shared MobileNetV2) for the quick check, the
+        # generation pipeline and the /knn/* training routes
         self.knn = KNNRecognizer()
+        self.processor = ImageProcessor(knn=self.knn)
+        self.frame_pipeline = FramePipeline()
+        self.tracer = Tracer()
+        self.generation = self._create_pipeline()
+        self.image_store = ImageStore()
+        self.ws = RiftWebSocket()
         
         self.running = False
         self.socketio = None
+        self.previews = None
+        self.status_publisher: Optional[StatusPublisher] = None
+        # Push model readiness (cold -> loading -> ready) to the kiosks
+        self.knn.extractor.add_listener(self._emit_status)
         
         # Sync manager for dual-side attack coordination (initialized after socketio)
         self.sync_manager: Optional[SyncManager] = None
@@ -56,19 +82,41 @@ class BattleService:
         self.current_hp = INITIAL_HP
         self.current_attack = None
         self.state: BattleState = IdleState(self)
+        self._state_lock = threading.RLock()
+        self.scheduler = Scheduler()
         
+        # Rift updates drive the state machine directly (no polling loop)
+        self.ws.subscribe(self._on_rift_update)
         self.ws.connect()
         print("[BattleService] Initialized (OOP Refactor)")
     
-    def set_socketio(self, socketio):
+    def set_socketio(self, socketio, previews=None):
         self.socketio = socketio
+        self.previews = previews
+        self.status_publisher = StatusPublisher(self.get_status, self.socketio.emit)
         # Initialize sync manager with socketio
         self.sync_manager = SyncManager(self.roles, self.socketio)
 
-    def change_state(self, new_state: BattleState):
-        """Transition to a new state."""
-        self.state = new_state
-        self.state.enter()
+    def change_state(self, new_state: BattleState, expected: Optional[BattleState] = None):
+        """
+        Transition to a new state.
+
+        expected: only transition if this is still the current state
+                  (used by timers that may fire after another transition).
+        """
+        with self._state_lock:
+            if expected is not None and self.state is not expected:
+                return
+            self.state.exit()
+            self.state = new_state
+            self.state.enter()
+
+    def _on_rift_update(self, delta: dict, state: dict):
+        """Called on the WebSocket thread for every Rift state change."""
+        if not self.running:
+            return
+        with self._state_lock:
+            self.state.on_rift_update(delta, state)
 
     def get_status(self) -> dict:
         return {
@@ -77,13 +125,25 @@ class BattleService:
             "current_hp": self.current_hp,
             "battle_state": type(self.state).__name__.replace("State", "").upper(), # IDLE, FIGHTING...
             "ws_connected": self.ws.connected if self.ws else False,
-            "ws_state": self.ws.last_state,
+            "ws_state": self.ws.summary(),
+            "model": self.knn.extractor.readiness() if self.knn else None,
+            "embedding_cache": self.knn.extractor.cache.stats() if self.knn else None,
+            "inference_batches": self.knn.extractor.batcher.stats() if self.knn else None,
+            "recognition": {role: p.recognition.stats() for role, p in self.roles.items()},
+            "change_detection": {role: p.change_gate.stats() for role, p in self.roles.items()},
+            "frame_timings_ms": self.frame_pipeline.get_timings(),
+            "generation": self.generation.stats(),
+            "speculative": self.processor.speculative.stats(),
+            "generation_cache": self.processor.editor.stats() if hasattr(self.processor.editor, "stats") else None,
+            "previews": self.previews.stats() if self.previews else None,
+            "image_store": self.image_store.stats(),
             "cameras": {
                 role: {
                     "recognition": p.recognition_status,
                     "label": p.last_label,
                     "knn_label": p.knn_label,
                     "knn_distance": p.knn_distance,
+                    "stable_label": p.recognition.stable_label,
                     "processing": p.processing,
                     "crop": p.crop,
                     "rotation": p.rotation,
@@ -104,142 +164,189 @@ class BattleService:
         print(f"[BattleService] Started (HP: {self.current_hp}, Attack: {self.current_attack})")
         
         # Enter initial state
-        self.state.enter()
-        
-        self._monitor_thread = threading.Thread(target=self._state_monitor, daemon=True)
-        self._monitor_thread.start()
+        with self._state_lock:
+            self.state.enter()
         return True
     
     def stop(self):
         self.running = False
+        self.scheduler.cancel_all()
         print("[BattleService] Stopped")
-    
-    def _state_monitor(self):
-        while self.running:
-            # Delegate to current state
-            self.state.handle_monitor()
-            time.sleep(0.5)
 
-    def process_client_frame(self, role: str, image_bytes: bytes):
+    def process_client_frame(self, role: str, image_bytes: bytes, trace: Optional[Trace] = None):
+        """Entry point for camera frames. `trace` is started by the web server (a new one otherwise)."""
+        trace = trace or self.tracer.start(role)
         if not self.running or role not in self.roles:
+            trace.finish("not_running")
             return
             
         state = self.roles[role]
+        if Config.FRAME_RECORD_DIR:
+            self._record_frame(role, image_bytes)
         
-        # Apply crop if exists
-        if state.crop:
-            print(f"[BattleService] Applying crop for {role}: {state.crop}")
-            try:
-                img = Image.open(io.BytesIO(image_bytes))
-                original_size = img.size
-                w, h = img.size
-                left = int(state.crop['x'] * w)
-                top = int(state.crop['y'] * h)
-                width = int(state.crop['w'] * w)
-                height = int(state.crop['h'] * h)
-                
-                if width > 0 and height > 0:
-                    img = img.crop((left, top, left + width, top + height))
-                    buf = io.BytesIO()
-                    img.save(buf, format='JPEG')
-                    image_bytes = buf.getvalue()
-                    print(f"[BattleService] Crop applied for {role}: {original_size} -> {img.size}")
-                else:
-                    print(f"[BattleService] Invalid crop dimensions for {role}: width={width}, height={height}")
-            except Exception as e:
-                print(f"[BattleService] Crop failed for {role}: {e}")
-        else:
-            # Log only occasionally to avoid spam
-            if not hasattr(state, '_crop_warned'):
-                print(f"[BattleService] No crop configured for {role}")
-                state._crop_warned = True
-        
-        # Apply rotation if set
-        if state.rotation and state.rotation != 0:
-            try:
-                img = Image.open(io.BytesIO(image_bytes))
-                # PIL rotate is counter-clockwise, so we negate for clockwise rotation
-                # Also, expand=True ensures the image is resized to fit the rotated content
-                if state.rotation == 90:
-                    img = img.transpose(Image.ROTATE_270)  # 90° clockwise
-                elif state.rotation == 180:
-                    img = img.transpose(Image.ROTATE_180)
-                elif state.rotation == 270:
-                    img = img.transpose(Image.ROTATE_90)   # 270° clockwise = 90° counter-clockwise
-                
-                buf = io.BytesIO()
-                img.save(buf, format='JPEG')
-                image_bytes = buf.getvalue()
-                print(f"[BattleService] Rotation {state.rotation}° applied for {role}")
-            except Exception as e:
-                print(f"[BattleService] Rotation failed for {role}: {e}")
-        
-        # Apply grayscale (black & white) if enabled
-        if state.grayscale:
-            try:
-                img = Image.open(io.BytesIO(image_bytes))
-                # Convert to grayscale then back to RGB (for consistent format)
-                img = img.convert('L').convert('RGB')
-                buf = io.BytesIO()
-                img.save(buf, format='JPEG')
-                image_bytes = buf.getvalue()
-                print(f"[BattleService] Grayscale applied for {role}")
-            except Exception as e:
-                print(f"[BattleService] Grayscale failed for {role}: {e}")
+        if not state.crop and not hasattr(state, '_crop_warned'):
+            # Log only once to avoid spam
+            print(f"[BattleService] No crop configured for {role}")
+            state._crop_warned = True
         
-        # DEBUG: Emit the actual image being processed (cropped + rotated + grayscale)
-        if self.socketio:
-            encoded_crop = base64.b64encode(image_bytes).decode('utf-8')
-            self.socketio.emit('debug_cropped_frame', {'role': role, 'frame': encoded_crop})
+        # Unchanged drawing: reuse the last processed frame and its recognized
+        # label instead of decoding and embedding it again
+        needs_knn = bool(self.knn and self.current_attack)
+        gate_start = time.perf_counter()
+        context = (self.current_attack, state.crop, state.rotation, state.grayscale)
+        cached = state.change_gate.check(image_bytes, crop=state.crop, context=context)
+        trace.add("change_check", (time.perf_counter() - gate_start) * 1000, gate_start)
 
-        # ALWAYS run KNN to keep last_label updated (for SYNC check)
-        # This runs every frame, not rate-limited
-        if self.knn and self.current_attack:
+        if cached is not None:
+            # Held still since a frame accepted for the stable label: no decode,
+            # no KNN and no new vote (the window needs independent frames)
+            frame, prediction = cached
+        else:
+            # Decode once, then crop / rotate / grayscale on the array (no re-encoding)
             try:
-                label, distance = self.knn.predict(image_bytes)
-                state.knn_label = label
-                state.knn_distance = distance
-                state.last_label = label
-                
-                # Check if valid counter
-                required = Config.ATTACK_TO_COUNTER_LABEL.get(self.current_attack)
-                is_valid = (label == required)
-                
-                # Set persistent flag when valid (stays True until phase changes)
-                if is_valid:
-                    state.counter_validated = True
-                
-                # Emit status update with latest KNN
-                state.recognition_status = f"{'✓' if is_valid else '✗'} {label} (d={distance:.1f})"
-                self._emit_status()
+                frame = self.frame_pipeline.process(
+                    role, image_bytes,
+                    crop=state.crop, rotation=state.rotation, grayscale=state.grayscale
+                )
             except Exception as e:
-                print(f"[BattleService] KNN quick check failed for {role}: {e}")
+                print(f"[BattleService] Frame decode failed for {role}: {e}")
+                trace.finish("decode_failed")
+                return
+            for stage, ms in frame.timings.items():
+                trace.add(stage, ms)
+            
+            # DEBUG: Emit the actual image being processed (cropped + rotated + grayscale),
+            # only encoded when a client subscribed to debug frames
+            if self.previews and self.previews.has_subscribers('debug_cropped_frame', role):
+                with trace.span("socketio_emit"):
+                    self.previews.publish('debug_cropped_frame', role, {'role': role, 'frame': frame.to_jpeg()})
+
+            prediction, outcome = self._quick_check(role, state, frame, trace) if needs_knn else (None, None)
+            self.frame_pipeline.record(frame)
+            if outcome:
+                trace.finish(outcome)
+                return
+            # Only frames that passed recognition are reused while nothing changes
+            state.change_gate.remember(frame, prediction)
 
         # Rate limit full AI processing (not KNN)
         if time.time() - state.last_gen_time < GENERATION_RATE_LIMIT_S:
+            trace.finish("rate_limited")
             return
         
-        if state.processing:
-            return
-
-        state.processing = True
         state.last_gen_time = time.time()
         
-        threading.Thread(
-            target=self._process_image_task,
-            args=(role, state, image_bytes),
-            daemon=True
-        ).start()
+        # Staged pipeline: if this role is still in flight, the frame waits in its
+        # slot and replaces any older waiting frame (latest-frame-wins)
+        if not self.generation.submit(role, _ImageTask(state, frame, prediction, trace=trace), trace=trace):
+            trace.finish("rejected")
 
-    def _process_image_task(self, role: str, state: RoleState, image_bytes: bytes):
+    def _quick_check(self, role: str, state: RoleState, frame: DecodedFrame,
+                     trace: Trace) -> tuple[Optional[tuple], Optional[str]]:
+        """
+        KNN on every changed frame (keeps last_label updated for the SYNC check).
+
+        Only frames accepted for the role's stable label (RecognitionStream:
+        threshold, margin, N-of-M vote) validate a counter or reach the
+        generation pipeline, which then reuses that label.
+        Returns ((label, distance), None), or (None, outcome) to end the frame.
+        """
         try:
-            # Delegate entirely to the Current State
-            self.state.on_image_task(role, state, image_bytes)
-        except Exception as e:
-            print(f"[BattleService] Error in task wrapper: {e}")
-        finally:
-            state.processing = False
+            knn_start = time.perf_counter()
+            label, distance, distances = self.knn.predict_with_distances(frame.pixels)
+            frame.timings['knn'] = (time.perf_counter() - knn_start) * 1000
+            trace.add("knn", frame.timings['knn'], knn_start)
+            state.knn_label = label
+            state.knn_distance = distance
+            state.last_label = label
+
+            stable, accepted = state.recognition.update(label, distance, distances)
+            usable = stable if accepted else None
+            
+            # Check if valid counter
+            required = Config.ATTACK_TO_COUNTER_LABEL.get(self.current_attack)
+            is_valid = usable is not None and usable == required
+            
+            # Set persistent flag when valid (stays True until phase changes)
+            if is_valid:
+                state.counter_validated = True
+            else:
+                self._speculate(role, state, frame, required, distances)
+            
+            # Emit status update with latest KNN
+            pending = "" if usable is not None else " …"
+            state.recognition_status = f"{'✓' if is_valid else '✗'} {label} (d={distance:.1f}){pending}"
             self._emit_status()
+        except Exception as e:
+            # No fallback: ImageProcessor would run an unsmoothed predict()
+            print(f"[BattleService] KNN quick check failed for {role}: {e}")
+            return None, "knn_failed"
+
+        # No stable label yet, or this frame was rejected: nothing worth a generation call
+        if usable is None:
+            return None, "unstable" if stable is None else "frame_rejected"
+        return (usable, distances.get(usable, distance)), None
+
+    def _record_frame(self, role: str, image_bytes: bytes):
+        """Keep the raw camera frame for offline replay (benchmark_pipeline.py)."""
+        try:
+            role_dir = os.path.join(Config.FRAME_RECORD_DIR, role)
+            os.makedirs(role_dir, exist_ok=True)
+            with open(os.path.join(role_dir, f"{time.time_ns() // 1_000_000}.jpg"), "wb") as f:
+                f.write(image_bytes)
+        except OSError as e:
+            print(f"[BattleService] Frame recording failed for {role}: {e}")
+
+    def _speculate(self, role: str, state: RoleState, frame: DecodedFrame, required: Optional[str],
+                   distances: dict):
+        """Start generation early when the drawing is close to the required counter."""
+        speculative = self.processor.speculative
+        if not speculative.enabled or not required:
+            return
+        prompt = Config.PROMPT_MAPPING.get(required)
+        if not prompt or state.valid_image_generated or not isinstance(self.state, FightingState):
+            return
+
+        distance = distances.get(required)
+        if distance is not None and distance <= Config.SPECULATIVE_LIKELY_DISTANCE:
+            speculative.start(role, frame.to_jpeg(), prompt)
+        else:
+            speculative.discard(role)
+
+    # --- GENERATION PIPELINE ---
+
+    def _create_pipeline(self) -> GenerationPipeline:
+        return GenerationPipeline(self.roles.keys(), [
+            PipelineStage("recognize", self._recognize_stage),
+            PipelineStage("generate", self._generate_stage, workers=Config.GENERATION_MAX_WORKERS),
+            PipelineStage("matte", self._matte_stage, workers=Config.PIPELINE_MATTE_WORKERS),
+            PipelineStage("publish", self._publish_stage),
+        ], queue_size=Config.PIPELINE_QUEUE_SIZE, on_done=self._on_image_task_done)
+
+    def _recognize_stage(self, role: str, task: _ImageTask, cancel_token: CancelToken):
+        task.state.processing = True
+        # The current state decides whether this frame deserves a generation
+        task.result = self.state.on_image_task(role, task.state, task.frame, task.prediction, cancel_token)
+        return task if task.result else None
+
+    def _generate_stage(self, role: str, task: _ImageTask, cancel_token: CancelToken):
+        task.result = self.processor.generate(task.frame, task.result, cancel_token)
+        return task
+
+    def _matte_stage(self, role: str, task: _ImageTask, cancel_token: CancelToken):
+        task.result = self.processor.matte(task.result, cancel_token)
+        return task
+
+    def _publish_stage(self, role: str, task: _ImageTask, cancel_token: CancelToken):
+        self.state.on_image_result(role, task.state, task.result, cancel_token)
+        return task
+
+    def _on_image_task_done(self, role: str, task: _ImageTask):
+        task.state.processing = False
+        self._emit_status()
+        if task.trace:
+            published = task.result is not None and task.result.output_image is not None
+            task.trace.finish("published" if published else "skipped")
 
     def update_role_crop(self, role: str, crop: dict):
         """Update crop settings for a role."""
@@ -274,9 +381,8 @@ class BattleService:
         self.current_hp = INITIAL_HP
         self.current_attack = None
         
-        # Reset roles? Maybe
-        # self.roles['nightmare'].processing = False
-        # self.roles['dream'].processing = False
+        # Drop queued frames and stop in-flight generations from publishing
+        self.generation.cancel_all("force end fight")
         
         self.change_state(IdleState(self))
         self.broadcast_state("IDLE")
@@ -298,18 +404,23 @@ class BattleService:
             
         # 1. Send to Frontend
         if self.socketio:
-            self.socketio.emit('status', self.get_status())
+            self.status_publisher.request(immediate=True)
             self.socketio.emit('battle_state_update', data) # Explicit event might be useful
             
-        # 2. Send to Rift (Proxy)
-        self.ws.send_raw(data)
+        # 2. Send to Rift (Proxy) - merged into the full state
+        self.ws.send_update(data)
 
     def _emit_status(self):
-        if self.socketio:
-            self.socketio.emit('status', self.get_status())
+        # Coalesced: at most Config.STATUS_MAX_RATE_HZ diffs per second
+        if self.status_publisher:
+            self.status_publisher.request()
 
     def cleanup(self):
         self.running = False
+        self.scheduler.cancel_all()
+        self.generation.shutdown()
+        if hasattr(self.processor.bg_remover, "close"):
+            self.processor.bg_remover.close()
         self.ws.close()
         print("[BattleService] Cleaned up")
 
@@ -1,4 +1,3 @@
-import time
 from .BattleState import BattleState
 
 INITIAL_HP = 3  # 3-phase combat: BOUCLIER → PLUIE → LUNE
@@ -9,18 +8,21 @@ class AppearingState(BattleState):
     
     def __init__(self, service):
         super().__init__(service)
-        self.start_time = 0
+        self.timer = None
 
     def enter(self):
         print(f"[BattleState] Entering APPEARING")
-        self.start_time = time.time()
         # Reset Game Variables
         self.service.current_hp = INITIAL_HP
         self.service.current_attack = None
         self.service.broadcast_state("APPEARING", {"battle_boss_hp": INITIAL_HP})
-
-    def handle_monitor(self):
         # Wait for animation duration
-        if time.time() - self.start_time > APPEARING_DURATION:
-            from .FightingState import FightingState
-            self.service.change_state(FightingState(self.service))
+        self.timer = self.service.scheduler.call_later(APPEARING_DURATION, self._on_animation_done)
+
+    def exit(self):
+        if self.timer:
+            self.service.scheduler.cancel(self.timer)
+
+    def _on_animation_done(self):
+        from .FightingState import FightingState
+        self.service.change_state(FightingState(self.service), expected=self)
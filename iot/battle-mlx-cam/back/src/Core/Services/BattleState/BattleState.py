@@ -5,6 +5,8 @@ from typing import Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from ...Utils import ProcessingResult
     from ..BattleService import BattleService, BattleRoleState
+    from ..FramePipeline import DecodedFrame
+    from ..Cancellation import CancelToken
 
 class BattleState(ABC):
     """Abstract base class for Battle States."""
@@ -17,19 +19,41 @@ class BattleState(ABC):
         """Called when entering the state."""
         pass
 
-    @abstractmethod
-    def handle_monitor(self):
-        """Called periodically by the monitor loop."""
+    def exit(self):
+        """Called when leaving the state (before the next state's enter)."""
+        pass
+
+    def on_rift_update(self, delta: dict, state: dict):
+        """
+        Called as soon as the Rift server state changes.
+
+        delta: only the keys that changed in this message.
+        state: the full Rift state after the message.
+        """
         pass
 
-    def on_image_task(self, role: str, state: 'BattleRoleState', image_bytes: bytes):
+    def is_current(self) -> bool:
+        """False once the service moved on (stale timers must not act)."""
+        return self.service.state is self
+
+    def on_image_task(self, role: str, state: 'BattleRoleState', frame: 'DecodedFrame',
+                      prediction: Optional[tuple] = None,
+                      cancel_token: Optional['CancelToken'] = None) -> Optional['ProcessingResult']:
         """
-        Full pipeline for processing an image task.
-        States can override to do nothing or handle specifically.
+        Recognize stage of the generation pipeline.
+        Returns the recognition result to continue with generation, or None to stop.
+
+        prediction: (label, distance) already computed for this frame, if any.
+        cancel_token: set when the task is cancelled (state change), checked between stages.
         """
         # Default implementation: Do nothing / Log skip
         state.recognition_status = "Skipped (Wrong State)"
-        return
+        return None
+
+    def on_image_result(self, role: str, state: 'BattleRoleState', result: 'ProcessingResult',
+                        cancel_token: Optional['CancelToken'] = None):
+        """Publish stage: a generated (or failed) image for a frame accepted by on_image_task."""
+        pass
 
     def trigger_attack(self):
         """Handle manual attack trigger."""
@@ -7,5 +7,3 @@ class CapturedState(BattleState):
         print(f"[BattleState] Entering CAPTURED")
         self.service.broadcast_state("CAPTURED")
 
-    def handle_monitor(self):
-        pass
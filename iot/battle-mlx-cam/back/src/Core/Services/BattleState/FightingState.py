@@ -1,14 +1,19 @@
 import time
 import base64
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from ...Config import Config
 from .BattleState import BattleState
 from .HitState import HitState
 from .WeakenedState import WeakenedState
+from ..Cancellation import GenerationCancelled
+from ..Tracer import span
 
 if TYPE_CHECKING:
+    from ...Utils import ProcessingResult
     from ..RoleState import RoleState
+    from ..FramePipeline import DecodedFrame
+    from ..Cancellation import CancelToken
 
 class FightingState(BattleState):
     """Main combat loop. Handles KNN recognition and AI image generation."""
@@ -39,26 +44,30 @@ class FightingState(BattleState):
         for role_name in self.service.roles:
             self._emit_output_frame(role_name, None)
 
-    def handle_monitor(self):
-        # ... (unchanged) ...
-        # Sync with Rift State (Game Master Authority)
-        if self.service.ws.last_state:
-            remote_state = self.service.ws.last_state.get("battle_state")
-            remote_hp = self.service.ws.last_state.get("battle_boss_hp", self.service.current_hp)
-            
-            # If Server says HIT, we follow
-            if remote_state == "HIT":
-                print(f"[BattleState] Remote HIT detected! Syncing...")
-                self.service.current_hp = remote_hp
-                self.service.change_state(HitState(self.service))
-                return
-            elif remote_state == "WEAKENED":
-                self.service.current_hp = 0
-                self.service.change_state(WeakenedState(self.service))
-                return
-            
-            # Check for attack confirmation from Rift Server (Rising Edge Detection)
-            current_confirm = self.service.ws.last_state.get("battle_hit_confirmed") is True
+    def exit(self):
+        # Generations started for this phase must not publish into the next one
+        self.service.generation.cancel_all("leaving FIGHTING")
+        self.service.processor.speculative.discard_all()
+
+    def on_rift_update(self, delta: dict, state: dict):
+        # Sync with Rift State (Game Master Authority), reacting to each change
+        remote_state = delta.get("battle_state")
+        
+        # If Server says HIT, we follow
+        if remote_state == "HIT":
+            print(f"[BattleState] Remote HIT detected! Syncing...")
+            self.service.current_hp = state.get("battle_boss_hp", self.service.current_hp)
+            self.service.change_state(HitState(self.service))
+            return
+        elif remote_state == "WEAKENED":
+            self.service.current_hp = 0
+            self.service.change_state(WeakenedState(self.service))
+            return
+        
+        # Check for attack confirmation from Rift Server (Rising Edge Detection).
+        # Every message is seen, so short high->low pulses are not missed.
+        if "battle_hit_confirmed" in delta:
+            current_confirm = delta["battle_hit_confirmed"] is True
             
             if current_confirm and not self.service.last_hit_confirmed:
                 print(f"[BattleState] Attack Confirm received (Rising Edge)! Triggering HIT.")
@@ -69,50 +78,76 @@ class FightingState(BattleState):
             # Reset latch when signal goes low
             if not current_confirm:
                 self.service.last_hit_confirmed = False
-            
-            # Sync HP if changed passively
-            if remote_hp is not None and remote_hp != self.service.current_hp:
-                self.service.current_hp = remote_hp
+        
+        # Sync HP if changed passively
+        remote_hp = delta.get("battle_boss_hp")
+        if remote_hp is not None and remote_hp != self.service.current_hp:
+            self.service.current_hp = remote_hp
 
-    def on_image_task(self, role: str, state: 'RoleState', image_bytes: bytes):
+    def on_image_task(self, role: str, state: 'RoleState', frame: 'DecodedFrame',
+                      prediction: Optional[tuple] = None,
+                      cancel_token: Optional['CancelToken'] = None) -> Optional['ProcessingResult']:
         """
-        Core image processing logic during fight.
+        Recognize stage during fight.
         
-        Flow:
+        Flow (stages run on BattleService's GenerationPipeline):
         1. Check if we can process (not locked, not already generated)
-        2. Process image through ImageProcessor
-        3. Update state with results
-        4. If valid counter, mark validated and check for ULTRA COMBO
-        5. If both sides validated, trigger attack_ready signal
+        2. Recognize the frame (KNN + counter check) and update the role state
+        3. Generation and background removal run in the next stages,
+           then on_image_result publishes
         
-        Note: BattleService handles rate limiting and processing flag before calling us.
+        BattleService passes its KNN `prediction` so the frame is not
+        classified twice. Returns None when no generation is needed.
         """
         sync = self.service.sync_manager
         
         # Guard: Stop if attack already triggered
         if sync and sync.is_locked:
             print(f"[FightingState] ⚠️ Skipping {role} - attack already locked")
-            return
+            return None
         
         # Guard: Stop if this role already has a valid generated image
         if state.valid_image_generated:
-            return
+            return None
 
         try:
             print(f"[FightingState] ⚙️ Processing {role}...")
+            result = self.service.processor.recognize(frame, self.service.current_attack, prediction)
             
-            # 1. Process image via ImageProcessor
-            result = self.service.processor.process_frame(image_bytes, self.service.current_attack)
-            
-            # 2. Update role state with KNN results
             state.update_knn_result(result.label, result.distance, result.status_message)
             state.prompt = result.prompt
             self.service._emit_status()
+            return None if result.should_skip else result
+        except Exception as e:
+            print(f"[FightingState] Error processing {role}: {e}")
+            state.recognition_status = "❌ Error"
+            return None
+
+    def on_image_result(self, role: str, state: 'RoleState', result: 'ProcessingResult',
+                        cancel_token: Optional['CancelToken'] = None):
+        """
+        Publish stage during fight.
+        
+        1. Update state with the final result
+        2. Publish the generated image
+        3. If valid counter, mark validated and check for ULTRA COMBO;
+           if both sides validated, trigger attack_ready signal
+        
+        `cancel_token` is checked before publishing anything.
+        """
+        sync = self.service.sync_manager
+
+        try:
+            state.update_knn_result(result.label, result.distance, result.status_message)
+            self.service._emit_status()
             
             if result.should_skip:
                 return
 
-            # 3. Handle generated image
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+
+            # 2. Handle generated image
             if result.output_image:
                 state.cache_output_image(result.output_image)
                 
@@ -121,12 +156,14 @@ class FightingState(BattleState):
                     state.mark_image_generated()
                 
                 # Emit preview to frontend
-                self._emit_output_frame(role, result.output_image)
+                with span("socketio_emit"):
+                    self._emit_output_frame(role, result.output_image)
                 
                 # Send to Rift Server
-                self._send_to_rift(role, result.output_image, result.is_valid_counter)
+                with span("rift_send"):
+                    self._send_to_rift(role, result.output_image, result.is_valid_counter)
 
-            # 4. Check for ULTRA COMBO (dual-side validation)
+            # 3. Check for ULTRA COMBO (dual-side validation)
             if result.is_valid_counter:
                 state.mark_counter_validated()
                 self._emit_counter_validated(role, result.label)
@@ -136,6 +173,8 @@ class FightingState(BattleState):
                 if final_image:
                     sync.trigger_attack_ready(role, final_image, result.label)
 
+        except GenerationCancelled:
+            print(f"[FightingState] Discarding {role} result - task cancelled")
         except Exception as e:
             print(f"[FightingState] Error processing {role}: {e}")
             state.recognition_status = "❌ Error"
@@ -153,9 +192,16 @@ class FightingState(BattleState):
     
     def _send_to_rift(self, role: str, image: bytes, is_valid: bool):
         """Send image to Rift Server."""
-        b64 = base64.b64encode(image).decode('utf-8')
         extra = {f"battle_drawing_{role}_recognised": is_valid}
-        if self.service.ws.send_image(b64, role, extra):
+        if Config.IMAGE_OFFLOAD:
+            # Devices fetch /images/<id> on demand instead of receiving the PNG
+            store = self.service.image_store
+            image_id, image_hash = store.put(image)
+            sent = self.service.ws.send_image_ref(store.url_for(image_id), image_hash, role, extra)
+        else:
+            b64 = base64.b64encode(image).decode('utf-8')
+            sent = self.service.ws.send_image(b64, role, extra)
+        if sent:
             print(f"[FightingState] Sent {role} to Rift Server")
     
     def _emit_counter_validated(self, role: str, label: str):
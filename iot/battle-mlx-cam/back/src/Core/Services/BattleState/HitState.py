@@ -1,4 +1,3 @@
-import time
 from ...Config import Config
 from .BattleState import BattleState
 
@@ -9,22 +8,26 @@ class HitState(BattleState):
     
     def __init__(self, service):
         super().__init__(service)
-        self.start_time = 0
+        self.timer = None
 
     def enter(self):
         print(f"[BattleState] Entering HIT")
-        self.start_time = time.time()
         self.service.broadcast_state("HIT", {"battle_boss_hp": self.service.current_hp})
+        self.timer = self.service.scheduler.call_later(HIT_DURATION, self._on_hit_done)
 
-    def handle_monitor(self):
-        # Monitor for signal reset (Falling Edge) to re-arm for next hit
-        if self.service.ws.last_state:
-            current_confirm = self.service.ws.last_state.get("battle_hit_confirmed") is True
-            if not current_confirm:
-                 self.service.last_hit_confirmed = False
+    def exit(self):
+        if self.timer:
+            self.service.scheduler.cancel(self.timer)
 
-        if time.time() - self.start_time > HIT_DURATION:
-            # Back to Fighting with new attack
-            self.service.current_attack = Config.get_next_attack(self.service.current_hp)
-            from .FightingState import FightingState
-            self.service.change_state(FightingState(self.service))
+    def on_rift_update(self, delta: dict, state: dict):
+        # Signal reset (Falling Edge) re-arms for next hit
+        if "battle_hit_confirmed" in delta and delta["battle_hit_confirmed"] is not True:
+            self.service.last_hit_confirmed = False
+
+    def _on_hit_done(self):
+        if not self.is_current():
+            return
+        # Back to Fighting with new attack
+        self.service.current_attack = Config.get_next_attack(self.service.current_hp)
+        from .FightingState import FightingState
+        self.service.change_state(FightingState(self.service), expected=self)
@@ -9,11 +9,13 @@ class IdleState(BattleState):
     def enter(self):
         print(f"[BattleState] Entering IDLE")
         self.service.broadcast_state("IDLE")
+        # The condition may already be met when entering
+        if self.service.ws.last_state:
+            self.on_rift_update({}, self.service.ws.last_state)
 
-    def handle_monitor(self):
+    def on_rift_update(self, delta: dict, state: dict):
         # Check Rift for start condition
-        if self.service.ws.last_state:
-            parts = self.service.ws.last_state.get("rift_part_count") or 0
-            if parts >= START_CONDITION_PARTS:
-                print(f"[BattleState] Start Condition Met ({parts} parts)")
-                self.service.change_state(AppearingState(self.service))
+        parts = state.get("rift_part_count") or 0
+        if parts >= START_CONDITION_PARTS:
+            print(f"[BattleState] Start Condition Met ({parts} parts)")
+            self.service.change_state(AppearingState(self.service))
@@ -10,8 +10,5 @@ class WeakenedState(BattleState):
         self.service.current_attack = None # Stop attacking
         self.service.broadcast_state("WEAKENED", {"battle_boss_hp": 0})
 
-    def handle_monitor(self):
-        pass
-        
     def capture(self):
         self.service.change_state(CapturedState(self.service))
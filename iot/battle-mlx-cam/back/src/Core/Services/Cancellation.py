@@ -0,0 +1,27 @@
+"""Cancellation - Cooperative cancellation tokens for generation jobs."""
+import threading
+from typing import Optional
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a task when its CancelToken was cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag handed to each generation task."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> None:
+        self.reason = reason
+        self._event.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason or "cancelled")
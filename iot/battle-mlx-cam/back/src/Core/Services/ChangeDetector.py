@@ -0,0 +1,118 @@
+"""ChangeDetector - Skip decode + KNN for camera frames that did not change."""
+import io
+import threading
+import time
+from typing import Any, Optional
+
+import numpy as np
+from PIL import Image
+
+from ..Config import Config
+
+
+class ChangeDetector:
+    """
+    Per-role gate in front of decode and recognition.
+
+    Each frame is reduced to a tiny grayscale thumbnail of the cropped area
+    (JPEG draft mode: decoded at 1/8 scale, no full decode) and compared with
+    the thumbnail of the last processed frame. While fewer than `min_ratio` of
+    its pixels moved by more than `pixel_delta`, the last processed frame and
+    its result are reused. A full pass is still forced every `refresh_s`,
+    and whenever `context` (attack, rotation, ...) differs from the one the
+    cached result was computed for.
+
+    BattleService only remember()s frames accepted for a stable label, so
+    undecided or rejected drawings are always re-recognized: reused results
+    never vote in the RecognitionStream (its window needs independent frames).
+    """
+
+    def __init__(self, enabled: bool = Config.CHANGE_DETECTION, size: int = Config.CHANGE_THUMB_SIZE,
+                 pixel_delta: int = Config.CHANGE_PIXEL_DELTA, min_ratio: float = Config.CHANGE_MIN_RATIO,
+                 refresh_s: float = Config.CHANGE_REFRESH_S):
+        self.enabled = enabled
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.min_ratio = min_ratio
+        self.refresh_s = refresh_s
+        self._lock = threading.Lock()
+        self._reference: Optional[np.ndarray] = None
+        self._context: Any = None
+        self._processed_at = 0.0
+        self._last: Optional[tuple] = None
+        self.processed = 0
+        self.skipped = 0
+        self.forced = 0
+        self.last_ratio: Optional[float] = None
+
+    def check(self, image_bytes: bytes, crop: Optional[dict] = None, context: Any = None) -> Optional[tuple]:
+        """
+        Cached (frame, result) to reuse for this frame, or None if it must be processed.
+
+        A None return makes this frame the new reference; call remember() once
+        it has been processed.
+        """
+        if not self.enabled:
+            return None
+        try:
+            thumbnail = self.thumbnail(image_bytes, crop)
+        except Exception as e:
+            print(f"[ChangeDetector] Thumbnail failed: {e}")
+            thumbnail = None
+
+        with self._lock:
+            now = time.monotonic()
+            ratio = None
+            if thumbnail is not None and self._reference is not None and self._reference.shape == thumbnail.shape:
+                ratio = float(np.mean(np.abs(thumbnail - self._reference) > self.pixel_delta))
+            self.last_ratio = ratio
+
+            unchanged = ratio is not None and ratio < self.min_ratio
+            if unchanged and self._last is not None and context == self._context:
+                if now - self._processed_at < self.refresh_s:
+                    self.skipped += 1
+                    return self._last
+                self.forced += 1
+
+            self._reference = thumbnail
+            self._context = context
+            self._processed_at = now
+            self._last = None
+            self.processed += 1
+            return None
+
+    def remember(self, frame, result) -> None:
+        """Store the last processed frame's result, reused while nothing changes (until the next check() miss)."""
+        with self._lock:
+            self._last = (frame, result)
+
+    def thumbnail(self, image_bytes: bytes, crop: Optional[dict] = None) -> np.ndarray:
+        """(size, size) float32 grayscale of the cropped area."""
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # JPEG only: let the decoder downscale by up to 8x (DCT scaling)
+            img.draft('L', (max(1, img.width // 8), max(1, img.height // 8)))
+            gray = img.convert('L')
+        if crop and crop.get('w', 0) > 0 and crop.get('h', 0) > 0:
+            w, h = gray.size
+            left, top = max(0, int(crop['x'] * w)), max(0, int(crop['y'] * h))
+            right, bottom = min(w, left + max(1, int(crop['w'] * w))), min(h, top + max(1, int(crop['h'] * h)))
+            if right > left and bottom > top:
+                gray = gray.crop((left, top, right, bottom))
+        return np.asarray(gray.resize((self.size, self.size), Image.BOX), dtype=np.float32)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reference = None
+            self._context = None
+            self._last = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.processed + self.skipped
+            return {
+                "processed": self.processed,
+                "skipped": self.skipped,
+                "forced_refresh": self.forced,
+                "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+                "last_change_ratio": None if self.last_ratio is None else round(self.last_ratio, 4),
+            }
@@ -0,0 +1,135 @@
+"""FramePipeline - Decode-once camera frame processing (crop, rotate, grayscale)."""
+import io
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from ..Config import Config
+
+# ITU-R 601-2 luma weights (same as PIL's convert('L'))
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Smoothing factor for the per-stage moving averages
+TIMING_EMA_ALPHA = 0.2
+
+
+@dataclass
+class DecodedFrame:
+    """
+    A camera frame decoded once into an RGB array.
+
+    `pixels` may be a view (crop/rotation) of the decoded buffer. JPEG bytes
+    are only produced when a consumer asks for them (to_jpeg), and reused.
+    """
+    role: str
+    pixels: np.ndarray
+    source_bytes: bytes
+    transformed: bool = False
+    timings: dict = field(default_factory=dict)
+    _jpeg: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(width, height) like PIL."""
+        return self.pixels.shape[1], self.pixels.shape[0]
+
+    def to_image(self) -> Image.Image:
+        return Image.fromarray(np.ascontiguousarray(self.pixels))
+
+    def to_jpeg(self, quality: int = Config.JPEG_QUALITY) -> bytes:
+        """Encoded bytes for consumers that need them (debug emit, editor)."""
+        if not self.transformed:
+            return self.source_bytes
+        if self._jpeg is None:
+            start = time.perf_counter()
+            buf = io.BytesIO()
+            self.to_image().save(buf, format='JPEG', quality=quality)
+            self._jpeg = buf.getvalue()
+            self.timings['encode'] = (time.perf_counter() - start) * 1000
+        return self._jpeg
+
+
+class FramePipeline:
+    """
+    Decodes each incoming JPEG once and applies the role settings on the array:
+    - crop: slicing (view)
+    - rotation: np.rot90 (view)
+    - grayscale: one luma pass, broadcast back to 3 channels
+
+    Keeps a per-role moving average of each stage duration (ms).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def process(self, role: str, image_bytes: bytes, crop: Optional[dict] = None,
+                rotation: int = 0, grayscale: bool = False) -> DecodedFrame:
+        timings = {}
+
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            pixels = np.asarray(img.convert('RGB'))
+        timings['decode'] = (time.perf_counter() - start) * 1000
+
+        frame = DecodedFrame(role=role, pixels=pixels, source_bytes=image_bytes, timings=timings)
+
+        if crop:
+            start = time.perf_counter()
+            self._crop(frame, crop)
+            timings['crop'] = (time.perf_counter() - start) * 1000
+
+        if rotation:
+            start = time.perf_counter()
+            # np.rot90 is counter-clockwise, so negate for clockwise rotation
+            if rotation in (90, 180, 270):
+                frame.pixels = np.rot90(frame.pixels, k=-(rotation // 90))
+                frame.transformed = True
+            timings['rotate'] = (time.perf_counter() - start) * 1000
+
+        if grayscale:
+            start = time.perf_counter()
+            luma = (frame.pixels @ LUMA_WEIGHTS).round().astype(np.uint8)
+            # Keep an RGB layout for consistent downstream format (read-only view)
+            frame.pixels = np.broadcast_to(luma[..., None], luma.shape + (3,))
+            frame.transformed = True
+            timings['grayscale'] = (time.perf_counter() - start) * 1000
+
+        return frame
+
+    def _crop(self, frame: DecodedFrame, crop: dict) -> None:
+        h, w = frame.pixels.shape[:2]
+        left = int(crop['x'] * w)
+        top = int(crop['y'] * h)
+        width = int(crop['w'] * w)
+        height = int(crop['h'] * h)
+
+        if width <= 0 or height <= 0:
+            print(f"[FramePipeline] Invalid crop dimensions for {frame.role}: width={width}, height={height}")
+            return
+
+        left, top = max(0, left), max(0, top)
+        frame.pixels = frame.pixels[top:min(h, top + height), left:min(w, left + width)]
+        frame.transformed = True
+
+    # --- TIMINGS ---
+
+    def record(self, frame: DecodedFrame) -> None:
+        """Fold a frame's stage timings into the per-role moving averages."""
+        with self._lock:
+            averages = self._timings.setdefault(frame.role, {})
+            for stage, ms in frame.timings.items():
+                prev = averages.get(stage)
+                averages[stage] = ms if prev is None else prev + TIMING_EMA_ALPHA * (ms - prev)
+
+    def get_timings(self) -> dict:
+        """Per-role average duration of each stage in ms."""
+        with self._lock:
+            return {
+                role: {stage: round(ms, 2) for stage, ms in stages.items()}
+                for role, stages in self._timings.items()
+            }
@@ -0,0 +1,241 @@
+"""GenerationPipeline - Staged image pipeline with bounded queues and per-stage worker pools."""
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .Cancellation import CancelToken, GenerationCancelled
+from .LatencyHistogram import LatencyHistogram
+from .Tracer import Trace, activate
+
+
+@dataclass
+class PipelineStage:
+    name: str
+    fn: Callable[[str, Any, CancelToken], Any]  # (role, data, token) -> data for the next stage, None to stop
+    workers: int = 1
+
+
+@dataclass
+class _PipelineJob:
+    role: str
+    data: Any
+    trace: Optional[Trace] = None
+    token: CancelToken = field(default_factory=CancelToken)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _RoleSlot:
+    running: Optional[_PipelineJob] = None
+    pending: Optional[_PipelineJob] = None
+
+
+class GenerationPipeline:
+    """
+    Runs image tasks through stages (recognize -> generate -> matte -> publish).
+
+    Each stage has its own worker pool and a bounded input queue, so while one
+    role's image is in background removal on the CPU, the other role's frame
+    is already waiting on Fal. A full queue blocks the upstream stage
+    (backpressure) instead of growing.
+
+    Admission: one job in flight per role plus one pending, a newer frame
+    replaces the pending one (latest-frame-wins), and cancel_all() cancels
+    tokens and drops pending frames. Stages check the token; `on_done(role, data)` runs once per job
+    however it ended. With a trace, queue waits are recorded as
+    `queue_wait.<stage>` spans and stages run with the trace active.
+    """
+
+    def __init__(self, roles, stages: list[PipelineStage], queue_size: int = 2,
+                 on_done: Optional[Callable[[str, Any], None]] = None):
+        self.stages = stages
+        self.on_done = on_done
+        self._lock = threading.Lock()
+        self._slots = {role: _RoleSlot() for role in roles}
+        # The first queue never blocks submit(): at most one job per role is admitted
+        self._queues = [
+            queue.Queue(maxsize=max(queue_size, len(self._slots)) if i == 0 else queue_size)
+            for i in range(len(stages))
+        ]
+        self._latency = {stage.name: LatencyHistogram() for stage in stages}
+        self._wait = {stage.name: LatencyHistogram() for stage in stages}
+        self._busy = {stage.name: 0 for stage in stages}
+        self._closed = False
+
+        # Metrics
+        self.submitted = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.failed = 0
+
+        for index, stage in enumerate(stages):
+            for n in range(stage.workers):
+                threading.Thread(target=self._work, args=(index,), name=f"Pipeline-{stage.name}-{n}",
+                                 daemon=True).start()
+
+    def submit(self, role: str, data: Any, trace: Optional[Trace] = None) -> bool:
+        """
+        Queue `data` for a role at the first stage.
+
+        Returns True if the job will run (now or after the current one),
+        False if the role is unknown or the pipeline is shut down.
+        """
+        with self._lock:
+            slot = self._slots.get(role)
+            if slot is None or self._closed:
+                return False
+            self.submitted += 1
+            job = _PipelineJob(role=role, data=data, trace=trace)
+
+            if slot.running is None:
+                self._start(slot, job)
+            else:
+                if slot.pending is not None:
+                    self._drop(slot.pending)  # Stale frame replaced by a newer one
+                slot.pending = job
+            return True
+
+    def is_busy(self, role: str) -> bool:
+        with self._lock:
+            slot = self._slots.get(role)
+            return bool(slot and slot.running)
+
+    def cancel_all(self, reason: str = "") -> None:
+        """Cancel jobs in flight and drop every pending frame."""
+        with self._lock:
+            for slot in self._slots.values():
+                if slot.running is not None and not slot.running.token.cancelled:
+                    slot.running.token.cancel(reason)
+                    self.cancelled += 1
+                if slot.pending is not None:
+                    self._drop(slot.pending)
+                    slot.pending = None
+        if reason:
+            print(f"[GenerationPipeline] Cancelled all tasks ({reason})")
+
+    def shutdown(self) -> None:
+        self.cancel_all("shutdown")
+        with self._lock:
+            self._closed = True
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                try:
+                    self._queues[index].put_nowait(None)
+                except queue.Full:
+                    pass  # Busy workers exit on their next job via _closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": sum(1 for s in self._slots.values() if s.running),
+                "queue_depth": sum(1 for s in self._slots.values() if s.pending),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "roles": {
+                    role: {"running": slot.running is not None, "pending": slot.pending is not None}
+                    for role, slot in self._slots.items()
+                },
+                "stages": {
+                    stage.name: {
+                        "workers": stage.workers,
+                        "busy": self._busy[stage.name],
+                        "queued": self._queues[index].qsize(),
+                        "avg_wait_ms": self._wait[stage.name].snapshot()["avg_ms"],
+                        "latency_ms": self._latency[stage.name].snapshot(),
+                    }
+                    for index, stage in enumerate(self.stages)
+                },
+            }
+
+    # --- INTERNALS ---
+
+    def _start(self, slot: _RoleSlot, job: _PipelineJob) -> None:
+        # Called with self._lock held
+        slot.running = job
+        job.enqueued_at = time.monotonic()
+        self._queues[0].put_nowait(job)
+
+    def _drop(self, job: _PipelineJob) -> None:
+        # Called with self._lock held
+        self.dropped += 1
+        if job.trace:
+            job.trace.finish("dropped")
+
+    def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        while True:
+            job = inbox.get()
+            if job is None or self._closed:
+                if job is not None:
+                    self._finish(job)
+                return
+            if job.token.cancelled:
+                self._finish(job)
+                continue
+
+            wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+            self._wait[stage.name].observe(wait_ms)
+            if job.trace:
+                job.trace.add(f"queue_wait.{stage.name}", wait_ms)
+            with self._lock:
+                self._busy[stage.name] += 1
+            start = time.perf_counter()
+            output = None
+            try:
+                with activate(job.trace):
+                    output = stage.fn(job.role, job.data, job.token)
+            except GenerationCancelled as e:
+                print(f"[GenerationPipeline] {job.role} cancelled in {stage.name}: {e}")
+            except Exception as e:
+                print(f"[GenerationPipeline] {job.role} failed in {stage.name}: {e}")
+                with self._lock:
+                    self.failed += 1
+            finally:
+                self._latency[stage.name].observe((time.perf_counter() - start) * 1000)
+                with self._lock:
+                    self._busy[stage.name] -= 1
+
+            if output is None or index == len(self.stages) - 1:
+                self._finish(job)
+            else:
+                job.data = output
+                self._forward(index + 1, job)
+
+    def _forward(self, index: int, job: _PipelineJob) -> None:
+        """Hand a job to the next stage, waiting while its queue is full (backpressure)."""
+        job.enqueued_at = time.monotonic()
+        while not job.token.cancelled and not self._closed:
+            try:
+                self._queues[index].put(job, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        self._finish(job)
+
+    def _finish(self, job: _PipelineJob) -> None:
+        with self._lock:
+            self.completed += 1
+            slot = self._slots[job.role]
+            slot.running = None
+            next_job, slot.pending = slot.pending, None
+
+        if self.on_done:
+            try:
+                self.on_done(job.role, job.data)
+            except Exception as e:
+                print(f"[GenerationPipeline] on_done failed: {e}")
+
+        if next_job is None:
+            return
+        with self._lock:
+            if self._closed or slot.running is not None:
+                self._drop(next_job)  # A newer frame was admitted meanwhile
+            else:
+                self._start(slot, next_job)
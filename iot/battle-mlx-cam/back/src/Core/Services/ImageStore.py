@@ -0,0 +1,74 @@
+"""ImageStore - Content-addressed, size-bounded store for images served over HTTP."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from ..Config import Config
+
+
+class ImageStore:
+    """
+    Keeps generated battle images in memory, addressed by their SHA-256.
+
+    The Rift state then only carries a short URL (/images/<id>) and the hash
+    instead of a multi-hundred-KB base64 PNG that every device would receive
+    and echo back. Display clients fetch the image on demand; since content
+    never changes for an id, it can be cached forever. The least recently
+    used images are evicted above `max_bytes`.
+    """
+
+    ID_LENGTH = 16  # Hex chars of the SHA-256 used as the public id
+
+    def __init__(self, max_bytes: int = Config.IMAGE_STORE_MAX_MB * 1024 * 1024, base_url: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.base_url = base_url or Config.get_public_url()
+        self._lock = threading.Lock()
+        self._images: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._bytes = 0
+
+        self.stored = 0
+        self.served = 0
+        self.evicted = 0
+
+    def put(self, data: bytes, content_type: str = "image/png") -> tuple[str, str]:
+        """Store an image. Returns (image_id, sha256 hex)."""
+        digest = hashlib.sha256(data).hexdigest()
+        image_id = digest[:self.ID_LENGTH]
+        with self._lock:
+            if image_id in self._images:
+                self._images.move_to_end(image_id)
+                return image_id, digest
+
+            self._images[image_id] = (data, content_type)
+            self._bytes += len(data)
+            self.stored += 1
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, (old, _) = self._images.popitem(last=False)
+                self._bytes -= len(old)
+                self.evicted += 1
+        return image_id, digest
+
+    def get(self, image_id: str) -> Optional[tuple[bytes, str]]:
+        """(data, content_type) for an id, or None if unknown/evicted."""
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is None:
+                return None
+            self._images.move_to_end(image_id)
+            self.served += 1
+            return entry
+
+    def url_for(self, image_id: str) -> str:
+        return f"{self.base_url}/images/{image_id}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "images": len(self._images),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "stored": self.stored,
+                "served": self.served,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,73 @@
+"""LatencyHistogram - Fixed-bucket latency histogram with percentile estimates."""
+import bisect
+import threading
+
+
+class LatencyHistogram:
+    """
+    Cumulative histogram of durations in milliseconds.
+
+    Buckets are fixed upper bounds (Prometheus style), so recording is O(log n)
+    with constant memory; percentiles are estimated as the upper bound of the
+    bucket holding that rank (the max for the overflow bucket).
+    """
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self, buckets_ms: tuple = BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # Last = overflow (+Inf)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        index = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Estimated q-th percentile (0-100) in ms, 0.0 when empty."""
+        with self._lock:
+            return self._percentile_locked(q)
+
+    def _percentile_locked(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if count and seen >= rank:
+                if index == len(self.buckets_ms):
+                    return self.max_ms
+                return min(float(self.buckets_ms[index]), self.max_ms)
+        return self.max_ms
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """Cumulative (upper bound ms, count) pairs, ending with (inf, count)."""
+        with self._lock:
+            return self._buckets_locked()
+
+    def _buckets_locked(self) -> list[tuple[float, int]]:
+        cumulative, seen = [], 0
+        for bound, count in zip(self.buckets_ms + (float("inf"),), self._counts):
+            seen += count
+            cumulative.append((bound, seen))
+        return cumulative
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 1),
+                "p50_ms": round(self._percentile_locked(50), 1),
+                "p95_ms": round(self._percentile_locked(95), 1),
+                "p99_ms": round(self._percentile_locked(99), 1),
+                "buckets": {f"le_{bound}": count for bound, count in self._buckets_locked()},
+            }
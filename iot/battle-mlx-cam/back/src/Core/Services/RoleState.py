@@ -3,6 +3,9 @@ from dataclasses import dataclass, field
 from typing import Optional
 import time
 
+from ..Recognition.RecognitionStream import RecognitionStream
+from .ChangeDetector import ChangeDetector
+
 
 @dataclass
 class RoleState:
@@ -26,9 +29,13 @@ class RoleState:
     knn_label: Optional[str] = None
     knn_distance: Optional[float] = None
     last_label: Optional[str] = None
+    recognition: RecognitionStream = field(default_factory=RecognitionStream)  # Stable label (N-of-M vote)
     recognition_status: str = "Waiting..."
     prompt: Optional[str] = None
     
+    # Change detection (reuse the last result while the drawing is held still)
+    change_gate: ChangeDetector = field(default_factory=ChangeDetector)
+    
     # Generated image cache
     last_output_image: Optional[bytes] = None
     
@@ -48,6 +55,7 @@ class RoleState:
         self.counter_validated = False
         self.last_output_image = None
         self.valid_image_generated = False
+        self.recognition.reset()
         print(f"[RoleState] {self.role} reset for new phase")
     
     def reset_all(self) -> None:
@@ -57,6 +65,8 @@ class RoleState:
         self.knn_label = None
         self.knn_distance = None
         self.last_label = None
+        self.recognition.reset()
+        self.change_gate.reset()
         self.recognition_status = "Waiting..."
         self.prompt = None
         self.last_output_image = None
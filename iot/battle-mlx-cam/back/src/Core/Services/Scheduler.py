@@ -0,0 +1,50 @@
+"""Scheduler - Cancellable one-shot timers for battle state durations."""
+import threading
+from typing import Callable
+
+
+class Scheduler:
+    """
+    Runs callbacks after a delay on daemon timer threads.
+
+    Replaces "poll every 0.5 s and compare timestamps": a state schedules its
+    timeout on enter() and cancels it on exit().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: set[threading.Timer] = set()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> threading.Timer:
+        timer = None
+
+        def run():
+            with self._lock:
+                self._timers.discard(timer)
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[Scheduler] Callback failed: {e}")
+
+        timer = threading.Timer(delay, run)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+        return timer
+
+    def cancel(self, timer: threading.Timer) -> None:
+        timer.cancel()
+        with self._lock:
+            self._timers.discard(timer)
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._timers)
@@ -0,0 +1,137 @@
+"""SpeculativeGenerator - Starts Fal generation before KNN confirms the counter."""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ..Config import Config
+
+
+@dataclass
+class _Speculation:
+    prompt: str
+    future: Future
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class SpeculativeGenerator:
+    """
+    One speculative generation slot per role.
+
+    - start(): called while KNN only finds the required counter "likely"
+      (nearest sample within Config.SPECULATIVE_LIKELY_DISTANCE).
+    - take(): called by the generation task once the counter is confirmed;
+      promotes the in-flight result if the prompt matches and it is fresh.
+    - discard(): drawing moved away from the counter or the phase ended.
+
+    Editors exposing submit() (AsyncFalFluxEditor) get truly cancellable
+    futures; blocking editors run on a small private pool and their result
+    is simply dropped.
+    """
+
+    def __init__(self, editor, enabled: bool = Config.SPECULATIVE_GENERATION,
+                 max_age_s: float = Config.SPECULATIVE_MAX_AGE_S):
+        self.editor = editor
+        self.enabled = enabled
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._slots: dict[str, _Speculation] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        # Metrics
+        self.started = 0
+        self.useful = 0
+        self.wasted = 0
+        self._head_start_total_s = 0.0
+
+    # --- PUBLIC API ---
+
+    def start(self, role: str, image_bytes: bytes, prompt: str) -> bool:
+        """Launch a speculative generation unless one is already running for this role."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            current = self._slots.get(role)
+            if current is not None and current.prompt == prompt and not self._is_stale(current):
+                return False
+            if current is not None:
+                self._drop(role, current)
+            self._slots[role] = _Speculation(prompt=prompt, future=self._launch(image_bytes, prompt))
+            self.started += 1
+        print(f"[SpeculativeGenerator] 🔮 Speculating for {role}")
+        return True
+
+    def take(self, role: str, prompt: str) -> Optional[tuple[bytes | None, float]]:
+        """
+        Promote the speculation for a confirmed counter.
+
+        Returns the editor result (waiting for it if still running), or None if
+        there is no usable speculation - the caller then generates normally.
+        """
+        with self._lock:
+            spec = self._slots.pop(role, None)
+            if spec is None:
+                return None
+            if spec.prompt != prompt or self._is_stale(spec):
+                self._drop(role, spec, pop=False)
+                return None
+            head_start = time.monotonic() - spec.started_at
+
+        try:
+            result = spec.future.result()
+        except Exception as e:
+            print(f"[SpeculativeGenerator] Speculation for {role} failed: {e}")
+            result = (None, 0.0)
+
+        with self._lock:
+            if result[0] is None:
+                self.wasted += 1
+                return None
+            self.useful += 1
+            self._head_start_total_s += head_start
+        print(f"[SpeculativeGenerator] ✅ Promoted {role} speculation ({head_start:.2f}s head start)")
+        return result
+
+    def discard(self, role: str) -> None:
+        with self._lock:
+            spec = self._slots.get(role)
+            if spec is not None:
+                self._drop(role, spec)
+
+    def discard_all(self) -> None:
+        with self._lock:
+            for role, spec in list(self._slots.items()):
+                self._drop(role, spec)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "started": self.started,
+                "useful": self.useful,
+                "wasted": self.wasted,
+                "in_flight": sum(1 for s in self._slots.values() if not s.future.done()),
+                "avg_head_start_s": round(self._head_start_total_s / self.useful, 2) if self.useful else 0.0,
+            }
+
+    # --- INTERNALS ---
+
+    def _launch(self, image_bytes: bytes, prompt: str) -> Future:
+        submit = getattr(self.editor, "submit", None)
+        if submit is not None:
+            return submit(image_bytes, prompt)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=Config.SPECULATIVE_MAX_INFLIGHT,
+                                            thread_name_prefix="Speculative")
+        return self._pool.submit(self.editor.edit_image, image_bytes, prompt)
+
+    def _is_stale(self, spec: _Speculation) -> bool:
+        return time.monotonic() - spec.started_at > self.max_age_s
+
+    def _drop(self, role: str, spec: _Speculation, pop: bool = True) -> None:
+        # Called with self._lock held
+        if pop:
+            self._slots.pop(role, None)
+        spec.future.cancel()
+        self.wasted += 1
@@ -0,0 +1,210 @@
+"""StatusPublisher - Coalesced, diff-based emission of BattleService status."""
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from ..Config import Config
+
+
+class StatusPublisher:
+    """
+    Replaces "emit the full get_status() dict on every change".
+
+    request() only marks the status dirty; a worker publishes at most
+    `max_rate_hz` times per second. The first publish is a full `status`
+    event, then only `status_patch` events carrying the fields that changed
+    (nested dicts are diffed recursively, unchanged keys are omitted) and,
+    under "removed", the key paths that disappeared. Clients drop the removed
+    paths, then merge the fields onto their last full status.
+
+    Every publish bumps `version` (included in both events) and is emitted
+    under the lock, so patches always go out in version order. The last
+    `history_size` patches are kept so a client that missed some - or joins
+    late - can catch up with since(version) (/status?since=<version>).
+    """
+
+    def __init__(self, get_status: Callable[[], dict], emit: Callable[[str, dict], None],
+                 max_rate_hz: float = Config.STATUS_MAX_RATE_HZ,
+                 history_size: int = Config.STATUS_HISTORY_SIZE):
+        self.get_status = get_status
+        self.emit = emit
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._last: Optional[dict] = None
+        self.version = 0
+        self._history: deque[tuple[int, dict]] = deque(maxlen=history_size)
+        self._last_publish = 0.0
+        self._worker: Optional[threading.Thread] = None
+
+        self.requests = 0
+        self.published = 0
+
+    def request(self, immediate: bool = False) -> None:
+        """Mark the status as changed. immediate=True publishes now (state transitions)."""
+        self.requests += 1
+        if immediate:
+            self.publish()
+            return
+        self._ensure_worker()
+        self._dirty.set()
+
+    def snapshot(self) -> dict:
+        """Last published full status, with its version (for late joiners)."""
+        with self._lock:
+            if self._last is None:
+                self._publish_locked()
+            return self._last
+
+    def since(self, version: int) -> dict:
+        """
+        Catch-up for a client at `version`.
+
+        Returns {"version", "patch"} merging every patch after `version`, or
+        {"version", "status"} (full snapshot) if that version is no longer in
+        the history.
+        """
+        with self._lock:
+            if self._last is None:
+                self._publish_locked()
+            oldest = self._history[0][0] if self._history else self.version + 1
+            if 0 < version <= self.version and oldest <= version + 1:
+                patch = {}
+                for v, p in self._history:
+                    if v > version:
+                        patch = self.compose(patch, p)
+                return {"version": self.version, "patch": patch}
+            return {"version": self.version, "status": self._last}
+
+    def publish(self) -> None:
+        # Emitted under the lock: a worker publish and an immediate one can
+        # never send version v+1 before v
+        with self._lock:
+            event, data = self._publish_locked()
+            if data:
+                self.published += 1
+                self.emit(event, data)
+
+    def _publish_locked(self) -> tuple[str, Optional[dict]]:
+        # Called with self._lock held
+        status = self.get_status()
+        self._last_publish = time.monotonic()
+        if self._last is None:
+            self.version += 1
+            status["version"] = self.version
+            self._last = status
+            return 'status', status
+
+        previous = {k: v for k, v in self._last.items() if k != "version"}
+        patch = self.diff(previous, status)
+        if not patch:
+            return 'status_patch', None
+
+        self.version += 1
+        status["version"] = patch["version"] = self.version
+        self._last = status
+        self._history.append((self.version, patch))
+        return 'status_patch', patch
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "published": self.published,
+            "coalesced": max(0, self.requests - self.published),
+        }
+
+    @staticmethod
+    def diff(old: dict, new: dict) -> dict:
+        """
+        Fields of `new` that differ from `old` (recursing into dicts).
+
+        Keys missing from `new` are listed as paths, e.g. ["cameras", "dream"],
+        under "removed" (a None field is a real None value).
+        """
+        removed: list[list[str]] = []
+        patch = StatusPublisher._diff(old, new, [], removed)
+        if removed:
+            patch["removed"] = removed
+        return patch
+
+    @staticmethod
+    def _diff(old: dict, new: dict, path: list, removed: list) -> dict:
+        patch = {}
+        for key, value in new.items():
+            previous = old.get(key)
+            if isinstance(value, dict) and isinstance(previous, dict):
+                nested = StatusPublisher._diff(previous, value, path + [key], removed)
+                if nested:
+                    patch[key] = nested
+            elif key not in old or previous != value:
+                patch[key] = value
+        removed.extend(path + [key] for key in old if key not in new)
+        return patch
+
+    @staticmethod
+    def merge(base: dict, patch: dict) -> dict:
+        """Apply a patch onto a status (same semantics as the frontend mergePatch)."""
+        merged = base
+        for path in patch.get("removed", ()):
+            merged = StatusPublisher._without(merged, path)
+        return StatusPublisher._merge_fields(merged, {k: v for k, v in patch.items() if k != "removed"})
+
+    @staticmethod
+    def compose(first: dict, second: dict) -> dict:
+        """One patch equivalent to applying `first`, then `second`."""
+        fields = {k: v for k, v in first.items() if k != "removed"}
+        removed = list(first.get("removed", ()))
+        for path in second.get("removed", ()):
+            fields = StatusPublisher._without(fields, path)
+            if path not in removed:
+                removed.append(path)
+        patch = StatusPublisher._merge_fields(fields, {k: v for k, v in second.items() if k != "removed"})
+        if removed:
+            patch["removed"] = removed
+        return patch
+
+    @staticmethod
+    def _merge_fields(base: dict, fields: dict) -> dict:
+        merged = dict(base)
+        for key, value in fields.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = StatusPublisher._merge_fields(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+
+    @staticmethod
+    def _without(data: dict, path: list) -> dict:
+        """Copy of `data` without the key at `path` (unchanged if absent)."""
+        key, rest = path[0], path[1:]
+        if key not in data:
+            return data
+        copy = dict(data)
+        if not rest:
+            del copy[key]
+        elif isinstance(copy[key], dict):
+            copy[key] = StatusPublisher._without(copy[key], rest)
+        return copy
+
+    # --- WORKER ---
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="StatusPublisher", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait()
+            wait = self._last_publish + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)  # Coalesce the burst into one publish
+            self._dirty.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"[StatusPublisher] Publish failed: {e}")
@@ -0,0 +1,160 @@
+"""Tracer - Per-frame latency traces, span percentiles and Prometheus export."""
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from ..Config import Config
+from .LatencyHistogram import LatencyHistogram
+
+# Trace of the frame being processed on this thread / asyncio task
+_current: ContextVar[Optional["Trace"]] = ContextVar("battle_trace", default=None)
+
+
+class Trace:
+    """Spans recorded for one camera frame, from handle_process_frame to publish."""
+
+    def __init__(self, tracer: "Tracer", trace_id: str, role: str):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.role = role
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: list[tuple[str, float, float]] = []  # (name, offset ms, duration ms)
+        self.outcome: Optional[str] = None
+
+    def add(self, name: str, duration_ms: float, started: Optional[float] = None) -> None:
+        """Record a span. `started` is a perf_counter() value (defaults to now - duration)."""
+        if started is None:
+            started = time.perf_counter() - duration_ms / 1000
+        offset_ms = (started - self._t0) * 1000
+        with self._lock:
+            self.spans.append((name, round(offset_ms, 2), round(duration_ms, 2)))
+        self.tracer.observe(name, duration_ms)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, start)
+
+    def finish(self, outcome: str = "done") -> None:
+        if self.outcome is None:
+            self.outcome = outcome
+            self.tracer.observe("total", (time.perf_counter() - self._t0) * 1000)
+            self.tracer._store(self)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "role": self.role,
+            "started_at": self.started_at,
+            "outcome": self.outcome,
+            "spans": [{"name": n, "offset_ms": o, "duration_ms": d} for n, o, d in spans],
+        }
+
+
+class Tracer:
+    """
+    Keeps the last `buffer_size` finished traces and a latency histogram per
+    span name (p50/p95/p99 over every recorded span, not only the buffer).
+
+    Code deep in the pipeline (editors, background removal) records into the
+    frame's trace through the module-level span()/record() helpers, which
+    follow the trace activated on the current thread or asyncio task.
+    """
+
+    def __init__(self, buffer_size: int = Config.TRACE_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._traces: deque[Trace] = deque(maxlen=buffer_size)
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._ids = itertools.count(1)
+
+    def start(self, role: str) -> Trace:
+        return Trace(self, f"{role[:1]}{next(self._ids):06d}", role)
+
+    def observe(self, name: str, duration_ms: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        histogram.observe(duration_ms)
+
+    def _store(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    # --- EXPORT ---
+
+    def traces(self, limit: int = 50, role: Optional[str] = None) -> list[dict]:
+        """Most recent finished traces first."""
+        with self._lock:
+            traces = [t for t in reversed(self._traces) if role is None or t.role == role]
+        return [t.to_dict() for t in traces[:limit]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {
+            name: {k: v for k, v in h.snapshot().items() if k != "buckets"}
+            for name, h in sorted(histograms.items())
+        }
+
+    def prometheus(self) -> str:
+        """Span histograms in the Prometheus text exposition format (seconds)."""
+        with self._lock:
+            histograms = dict(self._histograms)
+        lines = [
+            "# HELP battle_span_duration_seconds Duration of battle pipeline spans.",
+            "# TYPE battle_span_duration_seconds histogram",
+        ]
+        for name, h in sorted(histograms.items()):
+            for bound, count in h.buckets():
+                le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+                lines.append(f'battle_span_duration_seconds_bucket{{span="{name}",le="{le}"}} {count}')
+            lines.append(f'battle_span_duration_seconds_sum{{span="{name}"}} {h.total_ms / 1000:.6f}')
+            lines.append(f'battle_span_duration_seconds_count{{span="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+# --- CONTEXT HELPERS ---
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """Make `trace` the target of span()/record() in this thread (and tasks it schedules)."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block into the active trace (no-op without one)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def record(name: str, started: float, ended: Optional[float] = None) -> None:
+    """Record a span from perf_counter() timestamps into the active trace."""
+    trace = _current.get()
+    if trace is not None:
+        ended = time.perf_counter() if ended is None else ended
+        trace.add(name, (ended - started) * 1000, started)
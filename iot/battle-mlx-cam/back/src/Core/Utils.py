@@ -1,9 +1,14 @@
 import base64
+import sys
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
 from .Config import Config
-from . import FalFluxEditor, VisionBackgroundRemover, KNNRecognizer
+from .Services.FramePipeline import DecodedFrame
+from .Services.Cancellation import CancelToken, GenerationCancelled
+from .Services.SpeculativeGenerator import SpeculativeGenerator
+from .Services.Tracer import span
+from . import FalFluxEditor, AsyncFalFluxEditor, CachedEditor, VisionBackgroundRemover, RembgBackgroundRemover, KNNRecognizer
 
 @dataclass
 class ProcessingResult:
@@ -22,12 +27,65 @@ class ImageProcessor:
     Decouples business logic (BattleService) from image processing.
     """
     
-    def __init__(self):
-        self.knn = KNNRecognizer(dataset_name="default_dataset")
-        self.editor = FalFluxEditor()
-        self.bg_remover = VisionBackgroundRemover()
+    def __init__(self, knn: Optional[KNNRecognizer] = None):
+        # Injected by BattleService so both share one recognizer / sample store
+        self.knn = knn or KNNRecognizer(dataset_name="default_dataset")
+        self.editor = self._create_editor()
+        self.speculative = SpeculativeGenerator(self.editor)
+        self.bg_remover = self._create_bg_remover()
         
-    def process_frame(self, image_bytes: bytes, current_attack: Optional[str] = None) -> ProcessingResult:
+    @staticmethod
+    def _create_editor():
+        editor = None
+        if Config.FAL_ASYNC_EDITOR:
+            try:
+                editor = AsyncFalFluxEditor(base_url=Config.FAL_BASE_URL)
+            except ImportError as e:
+                print(f"[ImageProcessor] ⚠️ {e} - using FalFluxEditor")
+        editor = editor or FalFluxEditor(base_url=Config.FAL_BASE_URL)
+        if Config.GENERATION_CACHE:
+            editor = CachedEditor(editor)
+        return editor
+
+    @staticmethod
+    def _create_bg_remover():
+        engine = Config.BG_REMOVAL_ENGINE
+        if engine == "rembg" or (engine == "auto" and sys.platform != "darwin"):
+            try:
+                return RembgBackgroundRemover()
+            except ImportError as e:
+                print(f"[ImageProcessor] ⚠️ {e} - using VisionBackgroundRemover")
+        return VisionBackgroundRemover()
+
+    def process_frame(self, frame: Union[DecodedFrame, bytes], current_attack: Optional[str] = None,
+                      prediction: Optional[Tuple[str, float]] = None,
+                      cancel_token: Optional[CancelToken] = None) -> ProcessingResult:
+        """
+        Run KNN -> AI generation -> background removal on a frame, in sequence.
+
+        BattleService runs the same stages (recognize / generate / matte) on
+        a GenerationPipeline instead, so stages of different frames overlap.
+
+        Args:
+            frame: Decoded frame from FramePipeline (or raw encoded bytes).
+                   JPEG bytes are only produced if generation actually runs.
+            prediction: (label, distance) already computed for this frame.
+                        When given, KNN is not run again.
+            cancel_token: Checked before each expensive stage; raises
+                          GenerationCancelled once the task was cancelled.
+        """
+        result = self.recognize(frame, current_attack, prediction)
+        if result.should_skip:
+            return result
+        result = self.generate(frame, result, cancel_token)
+        return self.matte(result, cancel_token)
+
+    # --- STAGES ---
+
+    def recognize(self, frame: Union[DecodedFrame, bytes], current_attack: Optional[str] = None,
+                  prediction: Optional[Tuple[str, float]] = None) -> ProcessingResult:
+        """KNN + counter validation. should_skip=False means the frame deserves a generation."""
+        knn_input = frame.pixels if isinstance(frame, DecodedFrame) else frame
         
         print(f"[ImageProcessor] 🔍 Starting processing (attack: {current_attack})")
         
@@ -42,9 +100,13 @@ class ImageProcessor:
             )
 
         try:
-            # 1. KNN Recognition
-            print(f"[ImageProcessor] 🧠 Calling KNN.predict()...")
-            label, distance = self.knn.predict(image_bytes)
+            # 1. KNN Recognition (reuse the caller's result when available)
+            if prediction is not None:
+                label, distance = prediction
+            else:
+                print(f"[ImageProcessor] 🧠 Calling KNN.predict()...")
+                with span("knn"):
+                    label, distance = self.knn.predict(knn_input)
             print(f"[ImageProcessor] ✅ KNN Result: label='{label}', distance={distance:.2f}")
             
             if label == "Need Training":
@@ -105,47 +167,87 @@ class ImageProcessor:
                     should_skip=True
                 )
 
+            return ProcessingResult(
+                label=label,
+                distance=distance,
+                status_message=f"🎨 {label.upper()}...",
+                prompt=prompt,
+                is_valid_counter=is_valid_counter
+            )
+
+        except Exception as e:
+            return self._error_result(e)
+
+    def generate(self, frame: Union[DecodedFrame, bytes], result: ProcessingResult,
+                 cancel_token: Optional[CancelToken] = None) -> ProcessingResult:
+        """AI generation for a recognized frame (sets output_image to the raw Flux output)."""
+        if isinstance(frame, DecodedFrame):
+            encode, role = frame.to_jpeg, frame.role
+        else:
+            encode, role = (lambda: frame), None
+
+        try:
             # 5. Transform Image (AI)
-            print(f"[ImageProcessor] 🎨 Generating image with AI...")
-            generated_bytes, gen_time = self.editor.edit_image(image_bytes, prompt)
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            speculated = self.speculative.take(role, result.prompt) if role else None
+            if speculated is not None:
+                print(f"[ImageProcessor] 🔮 Using speculative generation")
+                generated_bytes, gen_time = speculated
+            else:
+                print(f"[ImageProcessor] 🎨 Generating image with AI...")
+                generated_bytes, gen_time = self.editor.edit_image(encode(), result.prompt)
             
             if not generated_bytes:
                 print(f"[ImageProcessor] ❌ AI generation failed")
-                return ProcessingResult(
-                    label=label,
-                    distance=distance,
-                    status_message="❌ Generation Failed",
-                    prompt=prompt,
-                    is_valid_counter=is_valid_counter,
-                    should_skip=True
-                )
+                result.status_message = "❌ Generation Failed"
+                result.should_skip = True
+                return result
             
             print(f"[ImageProcessor] ✅ AI generation complete ({gen_time:.2f}s)")
+            result.output_image = generated_bytes
+            return result
 
+        except GenerationCancelled:
+            print(f"[ImageProcessor] ⏹️ Cancelled")
+            raise
+        except Exception as e:
+            return self._error_result(e)
+
+    def matte(self, result: ProcessingResult, cancel_token: Optional[CancelToken] = None) -> ProcessingResult:
+        """Background removal of a generated image (results that were skipped pass through)."""
+        if result.should_skip or not result.output_image:
+            return result
+
+        try:
             # 6. Remove Background
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
             print(f"[ImageProcessor] 🖼️ Removing background...")
-            final_bytes, bg_time = self.bg_remover.remove_background(generated_bytes)
+            with span("bg_removal"):
+                final_bytes, bg_time = self.bg_remover.remove_background(result.output_image)
             print(f"[ImageProcessor] ✅ Background removed ({bg_time:.2f}s)")
             
             # Success
-            print(f"[ImageProcessor] 🎉 SUCCESS: label='{label}', valid_counter={is_valid_counter}")
-            return ProcessingResult(
-                label=label,
-                distance=distance,
-                status_message=f"🧠 {label.upper()}",
-                prompt=prompt,
-                is_valid_counter=is_valid_counter,
-                output_image=final_bytes,
-                should_skip=False
-            )
+            print(f"[ImageProcessor] 🎉 SUCCESS: label='{result.label}', valid_counter={result.is_valid_counter}")
+            result.output_image = final_bytes
+            result.status_message = f"🧠 {result.label.upper()}"
+            return result
 
+        except GenerationCancelled:
+            print(f"[ImageProcessor] ⏹️ Cancelled")
+            raise
         except Exception as e:
-            print(f"[ImageProcessor] ❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
-            return ProcessingResult(
-                label="ERROR",
-                distance=0.0,
-                status_message=f"❌ Error: {str(e)}",
-                should_skip=True
-            )
+            return self._error_result(e)
+
+    @staticmethod
+    def _error_result(e: Exception) -> ProcessingResult:
+        print(f"[ImageProcessor] ❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return ProcessingResult(
+            label="ERROR",
+            distance=0.0,
+            status_message=f"❌ Error: {str(e)}",
+            should_skip=True
+        )
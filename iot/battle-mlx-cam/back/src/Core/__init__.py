@@ -1,5 +1,8 @@
 from .Editors.FalFluxEditor import FalFluxEditor
+from .Editors.AsyncFalFluxEditor import AsyncFalFluxEditor
+from .Editors.CachedEditor import CachedEditor
 from .Background.VisionBackgroundRemover import VisionBackgroundRemover
+from .Background.RembgBackgroundRemover import RembgBackgroundRemover
 from .Recognition.KNNRecognizer import KNNRecognizer
 from .Camera.WebcamCamera import WebcamCamera
 from .Camera.WebcamCamera import WebcamCamera
@@ -8,4 +11,5 @@ from .Camera.CameraSettings import get_camera_settings, update_camera_settings,
 from .Network.RiftWebSocket import RiftWebSocket
 from .Network.BattleWebServer import BattleWebServer
 from .Network.BattleWebServer import BattleWebServer
+from .Network.AsyncBattleWebServer import AsyncBattleWebServer
 from .Config import Config
@@ -0,0 +1,59 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from PIL import Image
+
+# ImageNet normalisation used by MobileNetV2
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+class AbstractFeatureBackend(ABC):
+    """Abstract base class for embedding inference engines (MobileNetV2 features)."""
+
+    name = "abstract"
+
+    def __init__(self, input_size: int = 224):
+        self.input_size = input_size
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load the model (called once, before the first forward)."""
+        pass
+
+    @abstractmethod
+    def forward(self, batch: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Embed a batch of preprocessed images.
+
+        Args:
+            batch: (3, S, S) float32 arrays from preprocess().
+
+        Returns:
+            One 1-D float32 embedding per input.
+        """
+        pass
+
+    def artifacts(self) -> list[str]:
+        """URLs of the weight files load() reads from the local artifact cache."""
+        return []
+
+    def preprocess(self, image: Image.Image) -> np.ndarray:
+        """
+        Resize (shorter side), center crop and normalise to a (3, S, S) float32 array.
+
+        Same result as torchvision Resize(S) + CenterCrop(S) + ToTensor() +
+        Normalize(ImageNet), without importing torch.
+        """
+        size = self.input_size
+        width, height = image.size
+        if width <= height:
+            new_size = (size, int(size * height / width))
+        else:
+            new_size = (int(size * width / height), size)
+        image = image.resize(new_size, Image.BILINEAR)
+
+        left = int(round((new_size[0] - size) / 2.0))
+        top = int(round((new_size[1] - size) / 2.0))
+        pixels = np.asarray(image.crop((left, top, left + size, top + size)), dtype=np.float32) / 255.0
+        return np.ascontiguousarray(((pixels - IMAGENET_MEAN) / IMAGENET_STD).transpose(2, 0, 1))
@@ -9,7 +9,8 @@ class AbstractRecognizer(ABC):
         Predict the label of an image.
         
         Args:
-            image_bytes: The input image data.
+            image_bytes: The input image data (encoded bytes, or a decoded
+                         RGB numpy array for recognizers that support it).
             
         Returns:
             A tuple containing:
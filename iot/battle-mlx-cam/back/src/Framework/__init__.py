@@ -1,6 +1,7 @@
 from .Editors.AbstractEditor import AbstractEditor
 from .Background.AbstractBackgroundRemover import AbstractBackgroundRemover
 from .Recognition.AbstractRecognizer import AbstractRecognizer
+from .Recognition.AbstractFeatureBackend import AbstractFeatureBackend
 from .Camera.AbstractCamera import AbstractCamera
 from .Network.AbstractWebSocket import AbstractWebSocket
 from .Network.AbstractWebServer import AbstractWebServer
@@ -0,0 +1,177 @@
+"""
+Fake Fal.ai queue server for tests and benchmarks.
+
+Implements the subset of the queue protocol used by the editors:
+    POST /<model>                       -> {request_id, status_url, response_url}
+    GET  /<model>/requests/<id>/status  -> {"status": IN_PROGRESS | COMPLETED}
+    GET  /<model>/requests/<id>/status/stream  (SSE, unless streaming disabled)
+    GET  /<model>/requests/<id>         -> {"images": [{"url": ...}]}
+    GET  /images/<id>.png               -> generated image bytes
+
+Run standalone:  python tests/fake_fal_server.py --port 8765 --latency 1.5
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+
+def _png(color=(255, 0, 0)) -> bytes:
+    buf = BytesIO()
+    Image.new('RGB', (560, 420), color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class FakeFalServer:
+    """Threaded fake queue. Each request completes `latency` seconds after submit."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2,
+                 streaming: bool = True, fail: bool = False, inline_images: bool = False):
+        self.latency = latency
+        self.streaming = streaming
+        self.fail = fail
+        self.inline_images = inline_images
+        self.image_bytes = _png()
+        self.requests: dict[str, float] = {}   # request_id -> submit time
+        self.payloads: list[dict] = []
+        self.status_calls = 0
+        self.stream_calls = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeFalServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- PROTOCOL ---
+
+    def _status(self, request_id: str) -> str:
+        submitted = self.requests.get(request_id)
+        if submitted is None:
+            return "FAILED"
+        if time.monotonic() - submitted < self.latency:
+            return "IN_PROGRESS"
+        return "FAILED" if self.fail else "COMPLETED"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, data: dict, code: int = 200):
+                body = json.dumps(data).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                request_id = uuid.uuid4().hex
+                with server._lock:
+                    server.requests[request_id] = time.monotonic()
+                    server.payloads.append(payload)
+                base = f"{server.base_url}{self.path.rstrip('/')}/requests/{request_id}"
+                self._json({
+                    "status": "IN_QUEUE",
+                    "request_id": request_id,
+                    "status_url": f"{base}/status",
+                    "response_url": base,
+                })
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+
+                if parts[0] == "images":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/png")
+                    self.send_header("Content-Length", str(len(server.image_bytes)))
+                    self.end_headers()
+                    self.wfile.write(server.image_bytes)
+                    return
+
+                if "requests" not in parts:
+                    self._json({"detail": "not found"}, 404)
+                    return
+                request_id = parts[parts.index("requests") + 1]
+
+                if parts[-1] == "stream":
+                    self._stream(request_id)
+                elif parts[-1] == "status":
+                    with server._lock:
+                        server.status_calls += 1
+                    self._json({"status": server._status(request_id)})
+                else:
+                    if server.inline_images:
+                        url = "data:image/png;base64," + base64.b64encode(server.image_bytes).decode()
+                    else:
+                        url = f"{server.base_url}/images/{request_id}.png"
+                    self._json({"images": [{"url": url}]})
+
+            def _stream(self, request_id: str):
+                if not server.streaming:
+                    self._json({"detail": "streaming disabled"}, 404)
+                    return
+                with server._lock:
+                    server.stream_calls += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                while True:
+                    status = server._status(request_id)
+                    self.wfile.write(f"data: {json.dumps({'status': status})}\n\n".encode())
+                    self.wfile.flush()
+                    if status != "IN_PROGRESS":
+                        break
+                    time.sleep(0.01)
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Fal.ai queue server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.5)
+    parser.add_argument("--no-stream", action="store_true")
+    args = parser.parse_args()
+
+    fake = FakeFalServer(port=args.port, latency=args.latency, streaming=not args.no_stream)
+    print(f"[FakeFalServer] Listening on {fake.base_url} (latency {args.latency}s)")
+    fake.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,92 @@
+"""Tests for the asyncio Fal editor against a local fake queue server."""
+import pytest
+import sys
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("httpx")
+
+from src.Core.Editors.AsyncFalFluxEditor import AsyncFalFluxEditor
+from src.Core.Editors.FalFluxEditor import FalFluxEditor
+from tests.fake_fal_server import FakeFalServer
+
+
+@pytest.fixture(autouse=True)
+def fal_key(monkeypatch):
+    monkeypatch.setenv("FAL_KEY", "test-key")
+
+
+@pytest.fixture
+def drawing():
+    buf = BytesIO()
+    Image.new('RGB', (640, 480), (20, 30, 40)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+def _editor(server, **kwargs):
+    return AsyncFalFluxEditor(model="fal-ai/test", base_url=server.base_url, **kwargs)
+
+
+class TestAsyncFalFluxEditor:
+    """Tests for submit / status / result against the fake queue."""
+
+    def test_stream_status(self, drawing):
+        """The SSE status stream should be used when the queue provides it."""
+        with FakeFalServer(latency=0.1) as server:
+            editor = _editor(server)
+            output, elapsed = editor.edit_image(drawing, "a sword")
+            editor.close()
+
+        assert output == server.image_bytes
+        assert elapsed > 0
+        assert server.stream_calls == 1
+        assert server.status_calls == 0
+        assert server.payloads[0]["prompt"] == "a sword"
+
+    def test_polling_fallback(self, drawing):
+        """Without streaming, the editor should fall back to adaptive polling."""
+        with FakeFalServer(latency=0.1, streaming=False, inline_images=True) as server:
+            editor = _editor(server)
+            output, _ = editor.edit_image(drawing, "a sun")
+            editor.close()
+
+        assert output == server.image_bytes
+        assert server.status_calls >= 1
+
+    def test_concurrent_requests(self, drawing):
+        """Several requests in flight should overlap instead of queueing."""
+        with FakeFalServer(latency=0.3) as server:
+            editor = _editor(server)
+            start = time.monotonic()
+            futures = [editor.submit(drawing, f"prompt {i}") for i in range(4)]
+            results = [f.result(timeout=5) for f in futures]
+            duration = time.monotonic() - start
+            editor.close()
+
+        assert all(output == server.image_bytes for output, _ in results)
+        assert duration < 0.3 * 4
+
+    def test_failed_generation(self, drawing):
+        """A FAILED status should return (None, 0.0) like FalFluxEditor."""
+        with FakeFalServer(latency=0.05, fail=True) as server:
+            editor = _editor(server)
+            assert editor.edit_image(drawing, "a sword") == (None, 0.0)
+            editor.close()
+
+    def test_sync_editor_against_fake_server(self, drawing):
+        """The blocking editor should speak the same protocol."""
+        with FakeFalServer(latency=0.05) as server:
+            editor = FalFluxEditor(model="fal-ai/test", base_url=server.base_url)
+            output, _ = editor.edit_image(drawing, "an umbrella")
+
+        assert output == server.image_bytes
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
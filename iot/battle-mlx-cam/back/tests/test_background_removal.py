@@ -0,0 +1,131 @@
+"""Tests for rembg background removal and background remover selection (rembg stubbed)."""
+import pytest
+import sys
+import os
+import types
+from io import BytesIO
+
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core import Utils as utils_module
+from src.Core.Background import RembgBackgroundRemover as rembg_module
+from src.Core.Background.RembgBackgroundRemover import RembgBackgroundRemover
+from src.Core.Background.VisionBackgroundRemover import VisionBackgroundRemover
+from src.Core.Config import Config
+
+
+def _png(size=(1120, 840)) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def stub_rembg(monkeypatch):
+    """A fake `rembg` module: records sizes, returns a translucent cutout or a gray mask."""
+    stub = types.ModuleType("rembg")
+    stub.sessions = []
+    stub.calls = []
+    stub.fail = False
+
+    def new_session(model):
+        stub.sessions.append(model)
+        return object()
+
+    def remove(image, session=None, only_mask=False):
+        stub.calls.append((image.size, only_mask))
+        if stub.fail:
+            raise RuntimeError("onnx exploded")
+        if only_mask:
+            return Image.new("L", image.size, 128)
+        cutout = image.convert("RGBA")
+        cutout.putalpha(64)
+        return cutout
+
+    stub.new_session = new_session
+    stub.remove = remove
+    monkeypatch.setitem(sys.modules, "rembg", stub)
+    monkeypatch.setattr(rembg_module, "rembg", stub)
+    return stub
+
+
+def _remove(remover, image_bytes):
+    try:
+        output, _ = remover.remove_background(image_bytes)
+    finally:
+        remover.close()
+    return output
+
+
+class TestRembgBackgroundRemover:
+    """Tests for input capping, alpha-only masks and failure fallback."""
+
+    def test_input_capped_to_flux_size(self, stub_rembg):
+        """Large inputs should be thumbnailed to 560x420 before inference."""
+        output = _remove(RembgBackgroundRemover(model="u2netp", warm_up=False), _png((1120, 840)))
+
+        assert stub_rembg.calls == [((560, 420), False)]
+        assert stub_rembg.sessions == ["u2netp"]
+        with Image.open(BytesIO(output)) as img:
+            assert img.format == "PNG"
+            assert img.size == (560, 420)
+
+    def test_alpha_only_applies_mask(self, stub_rembg):
+        """alpha_only should ask for the mask only and use it as the alpha channel."""
+        output = _remove(RembgBackgroundRemover(alpha_only=True, warm_up=False), _png((280, 210)))
+
+        assert stub_rembg.calls == [((280, 210), True)]
+        with Image.open(BytesIO(output)) as img:
+            assert img.mode == "RGBA"
+            assert img.getpixel((10, 10)) == (200, 40, 40, 128)
+
+    def test_failure_returns_input(self, stub_rembg):
+        """A failing removal should hand back the original bytes instead of raising."""
+        stub_rembg.fail = True
+        image_bytes = _png((280, 210))
+        assert _remove(RembgBackgroundRemover(warm_up=False), image_bytes) == image_bytes
+
+    def test_session_created_once(self, stub_rembg):
+        """The warm-up session should be reused by every removal."""
+        remover = RembgBackgroundRemover()
+        remover.remove_background(_png((280, 210)))
+        _remove(remover, _png((280, 210)))
+        assert len(stub_rembg.sessions) == 1
+
+    def test_missing_rembg_raises(self, monkeypatch):
+        """Without rembg installed, construction should fail with ImportError."""
+        monkeypatch.setattr(rembg_module, "rembg", None)
+        with pytest.raises(ImportError):
+            RembgBackgroundRemover()
+
+
+class TestBackgroundRemoverSelection:
+    """Tests for ImageProcessor._create_bg_remover (BG_REMOVAL_ENGINE and platform)."""
+
+    @pytest.mark.parametrize("engine, platform, expected", [
+        ("auto", "linux", RembgBackgroundRemover),
+        ("auto", "darwin", VisionBackgroundRemover),
+        ("rembg", "darwin", RembgBackgroundRemover),
+        ("vision", "linux", VisionBackgroundRemover),
+    ])
+    def test_engine_and_platform(self, stub_rembg, monkeypatch, engine, platform, expected):
+        """The engine setting should win; "auto" should pick by platform."""
+        monkeypatch.setattr(Config, "BG_REMOVAL_ENGINE", engine)
+        monkeypatch.setattr(utils_module.sys, "platform", platform)
+        remover = utils_module.ImageProcessor._create_bg_remover()
+        assert type(remover) is expected
+        if isinstance(remover, RembgBackgroundRemover):
+            remover.close()
+
+    def test_falls_back_to_vision_without_rembg(self, monkeypatch):
+        """If rembg is missing, the rembg engine should fall back to Vision."""
+        monkeypatch.setattr(rembg_module, "rembg", None)
+        monkeypatch.setattr(Config, "BG_REMOVAL_ENGINE", "rembg")
+        assert type(utils_module.ImageProcessor._create_bg_remover()) is VisionBackgroundRemover
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,137 @@
+"""Tests for BattleService frame handling: recognition gating before generation."""
+import pytest
+import sys
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Config import Config
+from src.Core.Services import BattleService as battle_service_module
+from src.Core.Services.BattleService import BattleService
+from src.Core.Services.ChangeDetector import ChangeDetector
+
+
+def _jpeg(value: int) -> bytes:
+    buf = BytesIO()
+    Image.fromarray(np.full((48, 64, 3), value, dtype=np.uint8)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+class _Extractor:
+    def add_listener(self, callback):
+        pass
+
+
+class _ScriptedKNN:
+    """Stands in for KNNRecognizer (no MobileNet): returns queued results, or raises them."""
+
+    def __init__(self):
+        self.extractor = _Extractor()
+        self.results = []
+
+    def predict_with_distances(self, image_bytes):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(battle_service_module, "KNNRecognizer", _ScriptedKNN)
+    service = BattleService()
+    service.processor.speculative.enabled = False
+    service.running = True
+    service.current_attack = Config.Attack.SHIELD
+    service.submitted = []
+    for state in service.roles.values():
+        state.change_gate.enabled = False  # Every frame goes through KNN
+    service.generation.submit = lambda role, task, trace=None: service.submitted.append(task) or True
+    yield service
+    service.cleanup()
+
+
+def _send(service, value: int, role: str = 'dream'):
+    """One frame, outside the generation rate limit. Returns its trace."""
+    service.roles[role].last_gen_time = 0
+    trace = service.tracer.start(role)
+    service.process_client_frame(role, _jpeg(value), trace=trace)
+    return trace
+
+
+class TestRecognitionGating:
+    """Only frames accepted for a stable label should validate and reach generation."""
+
+    SWORD = Config.Counter.SWORD
+
+    def _near(self):
+        return self.SWORD, 4.0, {self.SWORD: 4.0}
+
+    def test_stable_label_is_submitted(self, service):
+        """Two agreeing frames should validate the counter and submit once stable."""
+        service.knn.results = [self._near(), self._near()]
+        assert _send(service, 10).outcome == "unstable"
+        _send(service, 20)
+
+        assert [task.prediction[0] for task in service.submitted] == [self.SWORD]
+        assert service.roles['dream'].counter_validated
+
+    def test_rejected_frame_after_stable_label_not_submitted(self, service):
+        """A frame beyond the distance threshold should not ride on the stable label."""
+        far = Config.KNN_DISTANCE_THRESHOLD + 5
+        service.knn.results = [self._near(), self._near(), (self.SWORD, far, {self.SWORD: far})]
+        _send(service, 10)
+        _send(service, 20)
+        service.submitted.clear()
+        service.roles['dream'].counter_validated = False
+
+        assert _send(service, 30).outcome == "frame_rejected"
+        assert service.submitted == []
+        assert not service.roles['dream'].counter_validated
+
+    def test_knn_failure_does_not_fall_through(self, service):
+        """A failing KNN should end the frame instead of running an unsmoothed predict."""
+        service.knn.results = [RuntimeError("extractor not ready")]
+        assert _send(service, 10).outcome == "knn_failed"
+        assert service.submitted == []
+
+
+
+class TestChangeGate:
+    """Unchanged frames skip KNN, but never fill the recognition vote."""
+
+    SWORD = Config.Counter.SWORD
+
+    @pytest.fixture
+    def gated(self, service):
+        service.roles['dream'].change_gate = ChangeDetector(enabled=True, refresh_s=60)
+        return service
+
+    def test_undecided_still_frames_are_recognized(self, gated):
+        """Identical frames should each be recognized while the label is not stable."""
+        gated.knn.results = [(self.SWORD, 4.0, {self.SWORD: 4.0})] * 2
+        _send(gated, 100)
+        _send(gated, 100)
+        assert gated.knn.results == []
+        assert gated.roles['dream'].recognition.stats()["frames"] == 2
+
+    def test_held_still_after_accept_reuses_label(self, gated):
+        """Once accepted, an unchanged frame should go to generation without KNN or a vote."""
+        gated.knn.results = [(self.SWORD, 4.0, {self.SWORD: 4.0})] * 2
+        _send(gated, 100)
+        _send(gated, 100)
+        gated.submitted.clear()
+
+        _send(gated, 100)
+        assert [task.prediction[0] for task in gated.submitted] == [self.SWORD]
+        assert gated.roles['dream'].recognition.stats()["frames"] == 2
+        assert gated.roles['dream'].change_gate.stats()["skipped"] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,277 @@
+"""Tests for the BattleWebServer Socket.IO frame protocol."""
+import pytest
+import sys
+import os
+import base64
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Network.BattleWebServer import BattleWebServer
+from src.Core.Services.ImageStore import ImageStore
+from src.Core.Services.Tracer import Tracer
+
+
+class _RecordingService:
+    """Minimal stand-in for BattleService that records received frames."""
+
+    def __init__(self):
+        self.frames = []
+        self.status_publisher = None
+        self.image_store = ImageStore(base_url="http://battle.test")
+        self.tracer = Tracer()
+
+    def process_client_frame(self, role, image_bytes, trace=None):
+        self.frames.append((role, image_bytes))
+        trace.finish()
+
+
+@pytest.fixture
+def server():
+    service = _RecordingService()
+    web = BattleWebServer(lambda: service)
+    web.service = service
+    return web
+
+
+class TestProcessFrame:
+    """Tests for binary and legacy base64 frames."""
+
+    def test_binary_frame(self, server):
+        """Binary attachments should reach the service and preview unchanged."""
+        client = server.socketio.test_client(server.app)
+        client.emit('subscribe_previews', {'events': ['camera_preview'], 'roles': ['dream']})
+        client.emit('process_frame', {'role': 'dream', 'image': b'\xff\xd8jpeg'})
+
+        assert server.service.frames == [('dream', b'\xff\xd8jpeg')]
+        previews = [e for e in client.get_received() if e['name'] == 'camera_preview']
+        assert previews[0]['args'][0]['frame'] == b'\xff\xd8jpeg'
+
+    def test_legacy_base64_frame(self, server):
+        """Base64 strings from older clients should still be accepted."""
+        client = server.socketio.test_client(server.app)
+        client.emit('process_frame', {'role': 'nightmare', 'image': base64.b64encode(b'jpeg').decode()})
+        assert server.service.frames == [('nightmare', b'jpeg')]
+
+    def test_empty_frame_ignored(self, server):
+        """Frames without image data should be dropped."""
+        client = server.socketio.test_client(server.app)
+        client.emit('process_frame', {'role': 'dream', 'image': ''})
+        assert server.service.frames == []
+
+
+class TestPreviewSubscriptions:
+    """Tests for preview rooms and per-client FPS caps."""
+
+    def _previews(self, client):
+        return [e['args'][0] for e in client.get_received() if e['name'] == 'camera_preview']
+
+    def test_unsubscribed_clients_get_no_previews(self, server):
+        """Previews should only go to clients that subscribed to the role."""
+        dream = server.socketio.test_client(server.app)
+        nightmare = server.socketio.test_client(server.app)
+        idle = server.socketio.test_client(server.app)
+        dream.emit('subscribe_previews', {'events': ['camera_preview'], 'roles': ['dream']})
+        nightmare.emit('subscribe_previews', {'events': ['camera_preview'], 'roles': ['nightmare']})
+
+        idle.emit('process_frame', {'role': 'dream', 'image': b'frame'})
+
+        assert len(self._previews(dream)) == 1
+        assert self._previews(nightmare) == []
+        assert self._previews(idle) == []
+
+    def test_fps_cap_keeps_latest_frame(self, server):
+        """Frames arriving faster than the cap should coalesce to the newest."""
+        client = server.socketio.test_client(server.app)
+        client.emit('subscribe_previews', {'events': ['camera_preview'], 'roles': ['dream'], 'fps': 1})
+        for i in range(3):
+            client.emit('process_frame', {'role': 'dream', 'image': f'frame{i}'.encode()})
+
+        assert [p['frame'] for p in self._previews(client)] == [b'frame0']
+        server.previews.flush()  # Not due yet
+        assert self._previews(client) == []
+
+        for sub in server.previews._rooms['camera_preview:dream'].values():
+            sub.next_due = 0.0
+        server.previews.flush()
+        assert [p['frame'] for p in self._previews(client)] == [b'frame2']
+        assert server.previews.stats()['coalesced'] == 1
+
+
+class TestImageStore:
+    """Tests for content-addressed battle images served over HTTP."""
+
+    def test_served_by_id(self, server):
+        """Stored images should be served immutably at their URL."""
+        store = server.service.image_store
+        image_id, digest = store.put(b"\x89PNG-data")
+        assert store.url_for(image_id) == f"http://battle.test/images/{image_id}"
+        assert digest.startswith(image_id)
+
+        response = server.app.test_client().get(f"/images/{image_id}")
+        assert response.status_code == 200
+        assert response.data == b"\x89PNG-data"
+        assert response.mimetype == "image/png"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert server.app.test_client().get("/images/unknown").status_code == 404
+
+    def test_lru_eviction(self):
+        """The oldest images should be evicted above max_bytes; duplicates are stored once."""
+        store = ImageStore(max_bytes=10, base_url="http://battle.test")
+        first, _ = store.put(b"aaaaa")
+        assert store.put(b"aaaaa")[0] == first
+        second, _ = store.put(b"bbbbb")
+        store.put(b"ccccc")
+        assert store.get(first) is None
+        assert store.get(second) is not None
+        assert store.stats()["evicted"] == 1
+
+
+class TestReadiness:
+    """Tests for the /ready endpoint."""
+
+    def test_not_ready_without_model(self, server):
+        """Without a loaded extractor, /ready should answer 503."""
+        response = server.app.test_client().get('/ready')
+        assert response.status_code == 503
+        assert response.get_json()["ready"] is False
+
+    def test_ready_once_extractor_warm(self, server):
+        """/ready should mirror the extractor lifecycle."""
+        from types import SimpleNamespace
+        readiness = {"state": "loading", "ready": False}
+        server.service.knn = SimpleNamespace(extractor=SimpleNamespace(readiness=lambda: dict(readiness)))
+
+        assert server.app.test_client().get('/ready').status_code == 503
+        readiness.update(state="ready", ready=True)
+        response = server.app.test_client().get('/ready')
+        assert response.status_code == 200
+        assert response.get_json()["state"] == "ready"
+
+
+class TestTracing:
+    """Tests for frame traces, /debug/traces and /metrics."""
+
+    def test_frame_trace_exposed(self, server):
+        """Each frame should get a trace ID and show up with its spans."""
+        client = server.socketio.test_client(server.app)
+        client.emit('process_frame', {'role': 'dream', 'image': b'jpeg'})
+
+        data = server.app.test_client().get('/debug/traces?role=dream').get_json()
+        trace = data["traces"][0]
+        assert trace["trace_id"].startswith("d")
+        assert [s["name"] for s in trace["spans"]] == ["socketio_emit"]
+        assert data["spans"]["socketio_emit"]["count"] == 1
+
+        metrics = server.app.test_client().get('/metrics').get_data(as_text=True)
+        assert 'battle_span_duration_seconds_count{span="total"} 1' in metrics
+        assert 'span="socketio_emit",le="+Inf"} 1' in metrics
+
+    def test_spans_follow_the_active_trace(self):
+        """Module-level span() should record into the activated trace only."""
+        from src.Core.Services.Tracer import activate, span
+        tracer = Tracer()
+        trace = tracer.start('nightmare')
+        with span("ignored"):
+            pass
+        with activate(trace), span("bg_removal"):
+            pass
+        trace.finish()
+        assert [s["name"] for s in tracer.traces()[0]["spans"]] == ["bg_removal"]
+
+
+class TestAsyncServer:
+    """Tests for the ASGI server mode (same handlers, frames off the event loop)."""
+
+    @pytest.fixture
+    def asgi(self):
+        uvicorn = pytest.importorskip("uvicorn")
+        pytest.importorskip("a2wsgi")
+        import socket
+        import threading
+        import time
+        from src.Core.Network.AsyncBattleWebServer import AsyncBattleWebServer
+
+        service = _RecordingService()
+        web = AsyncBattleWebServer(lambda: service)
+        web.service = service
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(web.asgi_app(), host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        web.url = f"http://127.0.0.1:{port}"
+        yield web
+        server.should_exit = True
+        web.stop()
+
+    def _wait(self, condition, timeout=2.0):
+        import time
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_rest_and_frames(self, asgi):
+        """REST routes and process_frame/previews should behave as in threading mode."""
+        import requests
+        import socketio
+
+        assert requests.get(f"{asgi.url}/health").json()["server"]["mode"] == "asgi"
+
+        client = socketio.Client()
+        previews = []
+        client.on('camera_preview', previews.append)
+        client.connect(asgi.url)
+        try:
+            client.call('subscribe_previews', {'events': ['camera_preview'], 'roles': ['dream']})
+            client.emit('process_frame', {'role': 'dream', 'image': b'\xff\xd8jpeg'})
+            assert self._wait(lambda: previews)
+        finally:
+            client.disconnect()
+
+        assert asgi.service.frames == [('dream', b'\xff\xd8jpeg')]
+        assert previews[0]['frame'] == b'\xff\xd8jpeg'
+
+    def test_slow_route_does_not_block_others(self, asgi):
+        """REST requests should run concurrently, not on one shared thread."""
+        import threading
+        import requests
+
+        entered, release = threading.Event(), threading.Event()
+        asgi.app.view_functions['metrics'] = lambda: (entered.set(), release.wait(5), "")[2]
+        slow = threading.Thread(target=requests.get, args=(f"{asgi.url}/metrics",), daemon=True)
+        slow.start()
+        try:
+            assert entered.wait(2)
+            assert requests.get(f"{asgi.url}/health", timeout=2).ok
+        finally:
+            release.set()
+            slow.join()
+
+    def test_waiting_frames_coalesced(self):
+        """While workers are busy, only the latest waiting frame of a role is processed."""
+        import threading
+        from src.Core.Network.AsyncBattleWebServer import AsyncBattleWebServer
+
+        service = _RecordingService()
+        web = AsyncBattleWebServer(lambda: service, frame_workers=1)
+        release = threading.Event()
+        process = service.process_client_frame
+        service.process_client_frame = lambda *args: (release.wait(2), process(*args))
+
+        web._submit_frame("sid", {'role': 'dream', 'image': b'frame0'})
+        assert self._wait(lambda: web.server_stats()["frames_waiting"] == 0)  # Picked, now blocked
+        for n in range(1, 4):
+            web._submit_frame("sid", {'role': 'dream', 'image': b'frame%d' % n})
+        release.set()
+
+        assert self._wait(lambda: len(service.frames) == 2)
+        assert service.frames == [('dream', b'frame0'), ('dream', b'frame3')]
+        assert web.server_stats()["frames_coalesced"] == 2
+        web.stop()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
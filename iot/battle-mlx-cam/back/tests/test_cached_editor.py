@@ -0,0 +1,126 @@
+"""Tests for the persistent generated-image cache."""
+import pytest
+import sys
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Editors.CachedEditor import CachedEditor
+from src.Core.Editors.FalFluxEditor import FalFluxEditor
+from src.Core.Recognition.EmbeddingCache import EmbeddingCache
+
+
+class _CountingEditor(FalFluxEditor):
+    """FalFluxEditor preprocessing without the network call."""
+
+    def __init__(self):
+        super().__init__(model="fal-ai/test")
+        self.calls = 0
+        self.prepared = 0
+
+    def _prepare_input(self, image_bytes):
+        self.prepared += 1
+        return super()._prepare_input(image_bytes)
+
+    def edit_prepared(self, compressed, prompt):
+        self.calls += 1
+        return f"out-{self.calls}".encode(), 1.0
+
+
+def _drawing(noise=0, seed=0, guard=300):
+    img = np.full((480, 640, 3), 255, dtype=np.uint8)
+    img[100:380, 300:340] = 0  # blade
+    img[guard:guard + 20, 220:420] = 0  # guard
+    if noise:
+        rng = np.random.default_rng(seed)
+        img = np.clip(img.astype(int) + rng.integers(-noise, noise + 1, img.shape), 0, 255).astype(np.uint8)
+    buf = BytesIO()
+    Image.fromarray(img).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def editor():
+    return _CountingEditor()
+
+
+class TestCachedEditor:
+    """Tests for hits, near-duplicates, persistence and eviction."""
+
+    def test_exact_hit(self, editor, tmp_path):
+        """The same input and prompt should only call the editor once."""
+        cached = CachedEditor(editor, cache_dir=tmp_path)
+        first, _ = cached.edit_image(_drawing(), "sword")
+        second, _ = cached.edit_image(_drawing(), "sword")
+        assert first == second == b"out-1"
+        assert editor.calls == 1
+        assert cached.stats()["hits"] == 1
+
+    def test_near_duplicate_hit(self, editor, tmp_path):
+        """With a tolerance, a slightly different re-draw should reuse the cached output."""
+        cached = CachedEditor(editor, cache_dir=tmp_path, tolerance=6)
+        cached.edit_image(_drawing(), "sword")
+        output, _ = cached.edit_image(_drawing(noise=6, seed=1, guard=330), "sword")
+        assert output == b"out-1"
+        assert editor.calls == 1
+        assert cached.stats()["near_hits"] == 1
+
+    def test_exact_only_by_default(self, editor, tmp_path):
+        """By default only the same input bytes are a hit; a near re-draw is generated."""
+        cached = CachedEditor(editor, cache_dir=tmp_path)
+        cached.edit_image(_drawing(), "sword")
+        output, _ = cached.edit_image(_drawing(guard=330), "sword")
+        assert output == b"out-2"
+        assert cached.stats()["near_hits"] == 0
+
+    def test_same_dhash_different_input_is_a_miss(self, editor, tmp_path):
+        """By default the key is the input bytes, so an input with the same dHash is still generated."""
+        prepared = (editor._prepare_input(_drawing()), editor._prepare_input(_drawing(noise=6, seed=1)))
+        assert EmbeddingCache.perceptual_hash(prepared[0]) == EmbeddingCache.perceptual_hash(prepared[1])
+        assert prepared[0] != prepared[1]
+
+        cached = CachedEditor(editor, cache_dir=tmp_path)
+        cached.edit_image(_drawing(), "sword")
+        output, _ = cached.edit_image(_drawing(noise=6, seed=1), "sword")
+        assert output == b"out-2"
+        assert cached.stats()["hits"] == 0
+
+    def test_miss_prepares_input_once(self, editor, tmp_path):
+        """The resized input hashed for the lookup should be the one sent on a miss."""
+        cached = CachedEditor(editor, cache_dir=tmp_path)
+        cached.edit_image(_drawing(), "sword")
+        assert editor.calls == 1
+        assert editor.prepared == 1
+
+    def test_prompt_is_part_of_key(self, editor, tmp_path):
+        """A different prompt must not reuse another prompt's output."""
+        cached = CachedEditor(editor, cache_dir=tmp_path)
+        cached.edit_image(_drawing(), "sword")
+        output, _ = cached.edit_image(_drawing(), "sun")
+        assert output == b"out-2"
+
+    def test_persists_across_instances(self, editor, tmp_path):
+        """Entries should survive a restart (index.json + files)."""
+        CachedEditor(editor, cache_dir=tmp_path).edit_image(_drawing(), "sword")
+        reopened = CachedEditor(editor, cache_dir=tmp_path)
+        output, _ = reopened.edit_image(_drawing(), "sword")
+        assert output == b"out-1"
+        assert editor.calls == 1
+
+    def test_size_bounded(self, editor, tmp_path):
+        """Oldest entries should be evicted once max_bytes is exceeded."""
+        cached = CachedEditor(editor, cache_dir=tmp_path, max_bytes=8)
+        cached.edit_image(_drawing(), "sword")
+        cached.edit_image(_drawing(), "sun")
+        stats = cached.stats()
+        assert stats["entries"] == 1
+        assert stats["bytes"] <= 8
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
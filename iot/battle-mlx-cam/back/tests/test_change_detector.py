@@ -0,0 +1,91 @@
+"""Tests for the per-role change-detection gate in front of decode and KNN."""
+import pytest
+import sys
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Services.ChangeDetector import ChangeDetector
+
+
+def _jpeg(drawing: np.ndarray) -> bytes:
+    buf = BytesIO()
+    Image.fromarray(drawing).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def paper():
+    """640x480 camera frame: white sheet with a dark stroke, plus JPEG-level noise."""
+    rng = np.random.default_rng(0)
+    img = np.full((480, 640, 3), 235, dtype=np.uint8)
+    img[200:220, 100:400] = 30
+    noisy = np.clip(img.astype(np.int16) + rng.integers(-6, 7, img.shape), 0, 255).astype(np.uint8)
+    return img, noisy
+
+
+class TestChangeDetector:
+    """Tests for the per-role unchanged-frame gate."""
+
+    def test_still_frame_reuses_last_result(self, paper):
+        """A noisy copy of the processed frame should reuse its result."""
+        img, noisy = paper
+        gate = ChangeDetector(refresh_s=60)
+        assert gate.check(_jpeg(img), context="BOUCLIER") is None
+        gate.remember("frame", ("shield", 4.0))
+
+        assert gate.check(_jpeg(noisy), context="BOUCLIER") == ("frame", ("shield", 4.0))
+        assert gate.stats()["processed"] == 1 and gate.stats()["skipped"] == 1
+
+    def test_new_stroke_is_processed(self, paper):
+        """Drawing a new stroke should trigger a full pass."""
+        img, _ = paper
+        gate = ChangeDetector(refresh_s=60)
+        gate.check(_jpeg(img))
+        gate.remember("frame", None)
+
+        changed = img.copy()
+        changed[300:330, 150:450] = 30
+        assert gate.check(_jpeg(changed)) is None
+
+    def test_context_change_and_refresh_force_processing(self, paper):
+        """A new attack, or an expired refresh interval, should bypass the cache."""
+        img, _ = paper
+        gate = ChangeDetector(refresh_s=60)
+        gate.check(_jpeg(img), context="BOUCLIER")
+        gate.remember("frame", None)
+        assert gate.check(_jpeg(img), context="PLUIE") is None
+
+        gate = ChangeDetector(refresh_s=0)
+        gate.check(_jpeg(img))
+        gate.remember("frame", None)
+        assert gate.check(_jpeg(img)) is None
+        assert gate.stats()["forced_refresh"] == 1
+
+    def test_nothing_reused_before_remember(self, paper):
+        """A frame that failed processing (no remember) should not be reused."""
+        img, _ = paper
+        gate = ChangeDetector(refresh_s=60)
+        gate.check(_jpeg(img))
+        assert gate.check(_jpeg(img)) is None
+
+    def test_crop_limits_compared_area(self, paper):
+        """Changes outside the crop should be ignored."""
+        img, _ = paper
+        gate = ChangeDetector(refresh_s=60)
+        crop = {'x': 0.0, 'y': 0.25, 'w': 0.75, 'h': 0.5}
+        gate.check(_jpeg(img), crop=crop)
+        gate.remember("frame", None)
+
+        outside = img.copy()
+        outside[:, 500:] = 0
+        assert gate.check(_jpeg(outside), crop=crop) is not None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,97 @@
+"""Tests for the decode-once camera frame pipeline."""
+import pytest
+import sys
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Services.FramePipeline import FramePipeline
+
+
+@pytest.fixture
+def frame_bytes():
+    """Lossless-ish 80x60 frame with distinct colour quadrants."""
+    img = np.zeros((60, 80, 3), dtype=np.uint8)
+    img[:30, :40] = (255, 0, 0)
+    img[:30, 40:] = (0, 255, 0)
+    img[30:, :40] = (0, 0, 255)
+    img[30:, 40:] = (255, 255, 255)
+    buf = BytesIO()
+    Image.fromarray(img).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pipeline():
+    return FramePipeline()
+
+
+def _pil(frame_bytes):
+    return Image.open(BytesIO(frame_bytes)).convert('RGB')
+
+
+class TestFramePipeline:
+    """Tests for crop / rotate / grayscale on the decoded array."""
+
+    def test_untouched_frame_reuses_source_bytes(self, pipeline, frame_bytes):
+        """Without settings, no re-encoding should happen."""
+        frame = pipeline.process('dream', frame_bytes)
+        assert not frame.transformed
+        assert frame.to_jpeg() is frame_bytes
+        assert frame.size == (80, 60)
+
+    def test_crop_matches_pil(self, pipeline, frame_bytes):
+        """Crop should match PIL's crop of the same normalized box."""
+        crop = {'x': 0.25, 'y': 0.5, 'w': 0.5, 'h': 0.5}
+        frame = pipeline.process('dream', frame_bytes, crop=crop)
+        expected = np.asarray(_pil(frame_bytes).crop((20, 30, 60, 60)))
+        np.testing.assert_array_equal(frame.pixels, expected)
+        assert frame.transformed
+
+    def test_invalid_crop_is_ignored(self, pipeline, frame_bytes):
+        """Zero-sized crops should leave the frame untouched."""
+        frame = pipeline.process('dream', frame_bytes, crop={'x': 0, 'y': 0, 'w': 0, 'h': 0.5})
+        assert frame.size == (80, 60)
+
+    @pytest.mark.parametrize("rotation,transpose", [
+        (90, Image.ROTATE_270),
+        (180, Image.ROTATE_180),
+        (270, Image.ROTATE_90),
+    ])
+    def test_rotation_is_clockwise(self, pipeline, frame_bytes, rotation, transpose):
+        """Rotation should match the previous PIL transpose behaviour."""
+        frame = pipeline.process('dream', frame_bytes, rotation=rotation)
+        expected = np.asarray(_pil(frame_bytes).transpose(transpose))
+        np.testing.assert_array_equal(frame.pixels, expected)
+
+    def test_grayscale_matches_pil(self, pipeline, frame_bytes):
+        """Grayscale should match PIL's L conversion within rounding."""
+        frame = pipeline.process('dream', frame_bytes, grayscale=True)
+        expected = np.asarray(_pil(frame_bytes).convert('L').convert('RGB')).astype(int)
+        assert np.abs(frame.pixels.astype(int) - expected).max() <= 1
+
+    def test_encode_only_on_demand(self, pipeline, frame_bytes):
+        """Transformed frames should be encoded once, lazily."""
+        frame = pipeline.process('dream', frame_bytes, rotation=90, grayscale=True)
+        assert 'encode' not in frame.timings
+        jpeg = frame.to_jpeg()
+        assert Image.open(BytesIO(jpeg)).size == (60, 80)
+        assert frame.to_jpeg() is jpeg
+        assert 'encode' in frame.timings
+
+    def test_timings_recorded_per_role(self, pipeline, frame_bytes):
+        """Stage timings should be averaged per role."""
+        frame = pipeline.process('nightmare', frame_bytes, crop={'x': 0, 'y': 0, 'w': 0.5, 'h': 0.5})
+        pipeline.record(frame)
+        timings = pipeline.get_timings()
+        assert set(timings['nightmare']) >= {'decode', 'crop'}
+        assert 'dream' not in timings
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,177 @@
+"""Tests for the staged AI generation pipeline and speculative generation."""
+import pytest
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Services.GenerationPipeline import GenerationPipeline, PipelineStage
+from src.Core.Services.LatencyHistogram import LatencyHistogram
+from src.Core.Services.SpeculativeGenerator import SpeculativeGenerator
+
+
+class _SlowEditor:
+    """Blocking editor stub that records calls."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+
+    def edit_image(self, image_bytes, prompt):
+        self.calls.append(prompt)
+        time.sleep(self.delay)
+        return b"generated:" + prompt.encode(), self.delay
+
+
+def _wait_pipeline_idle(pipeline, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pipeline.stats()["active"] == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError("pipeline did not drain")
+
+
+class TestGenerationPipeline:
+    """Tests for stage overlap, admission and per-stage metrics."""
+
+    def test_stages_overlap_across_roles(self):
+        """One role's matte should run while the other role is generating."""
+        matte_started, release_matte = threading.Event(), threading.Event()
+        generating = []
+
+        def generate(role, data, token):
+            generating.append(role)
+            return data
+
+        def matte(role, data, token):
+            if role == 'dream':
+                matte_started.set()
+                release_matte.wait(1)
+            return data
+
+        pipeline = GenerationPipeline(['dream', 'nightmare'], [
+            PipelineStage("generate", generate, workers=2),
+            PipelineStage("matte", matte),
+        ])
+        pipeline.submit('dream', 'frame')
+        assert matte_started.wait(1)
+        pipeline.submit('nightmare', 'frame')
+
+        deadline = time.monotonic() + 1
+        while 'nightmare' not in generating and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert generating == ['dream', 'nightmare']  # Not blocked behind dream's matte
+        release_matte.set()
+        _wait_pipeline_idle(pipeline)
+
+    def test_latest_frame_wins_and_on_done(self):
+        """A role runs one job at a time; only its newest waiting frame follows."""
+        gate = threading.Event()
+        done = []
+
+        def stage(role, frame_id, token):
+            if frame_id == 0:
+                gate.wait(1)
+            return frame_id
+
+        pipeline = GenerationPipeline(['dream'], [PipelineStage("generate", stage)],
+                                      on_done=lambda role, data: done.append(data))
+        for frame_id in range(4):
+            pipeline.submit('dream', frame_id)
+        gate.set()
+        _wait_pipeline_idle(pipeline)
+
+        assert done == [0, 3]
+        assert pipeline.stats()["dropped"] == 2
+
+    def test_stopping_and_cancelled_jobs_skip_later_stages(self):
+        """None stops a job; cancelled jobs never reach the next stage."""
+        reached = []
+        started, release = threading.Event(), threading.Event()
+
+        def first(role, data, token):
+            if data == "slow":
+                started.set()
+                release.wait(1)
+            return None if data == "stop" else data
+
+        pipeline = GenerationPipeline(['dream', 'nightmare'], [
+            PipelineStage("recognize", first, workers=2),
+            PipelineStage("publish", lambda role, data, token: reached.append(data)),
+        ])
+        pipeline.submit('dream', "stop")
+        pipeline.submit('nightmare', "slow")
+        started.wait(1)
+        pipeline.cancel_all("test")
+        release.set()
+        _wait_pipeline_idle(pipeline)
+
+        assert reached == []
+        stats = pipeline.stats()
+        assert stats["cancelled"] == 1
+        assert stats["stages"]["recognize"]["latency_ms"]["count"] == 2
+
+
+class TestLatencyHistogram:
+    """Tests for bucketed latency percentiles."""
+
+    def test_percentiles(self):
+        """Percentiles should land on the bucket upper bound holding that rank."""
+        hist = LatencyHistogram(buckets_ms=(10, 100, 1000))
+        for ms in [1] * 90 + [50] * 9 + [2000]:
+            hist.observe(ms)
+        assert hist.percentile(50) == 10
+        assert hist.percentile(95) == 100
+        assert hist.percentile(100) == 2000
+        assert hist.buckets()[-1] == (float("inf"), 100)
+
+
+class TestSpeculativeGenerator:
+    """Tests for promote / discard of early generations."""
+
+    def test_promoted_when_confirmed(self):
+        """A matching prompt should reuse the in-flight generation."""
+        editor = _SlowEditor()
+        spec = SpeculativeGenerator(editor, enabled=True)
+        assert spec.start('dream', b"jpeg", "sword")
+        assert not spec.start('dream', b"jpeg", "sword")  # already in flight
+
+        output, _ = spec.take('dream', "sword")
+        assert output == b"generated:sword"
+        assert editor.calls == ["sword"]
+        assert spec.stats()["useful"] == 1
+
+    def test_discarded_is_counted_as_wasted(self):
+        """Discarded or mismatched speculations should not be promoted."""
+        spec = SpeculativeGenerator(_SlowEditor(), enabled=True)
+        spec.start('dream', b"jpeg", "sword")
+        spec.discard('dream')
+        assert spec.take('dream', "sword") is None
+
+        spec.start('nightmare', b"jpeg", "sword")
+        assert spec.take('nightmare', "sun") is None
+        stats = spec.stats()
+        assert stats["wasted"] == 2
+        assert stats["useful"] == 0
+
+    def test_stale_speculation_not_promoted(self):
+        """Speculations older than max_age_s belong to an outdated drawing."""
+        spec = SpeculativeGenerator(_SlowEditor(delay=0), enabled=True, max_age_s=0.0)
+        spec.start('dream', b"jpeg", "sword")
+        time.sleep(0.01)
+        assert spec.take('dream', "sword") is None
+
+    def test_disabled_does_nothing(self):
+        """When disabled, nothing should be launched."""
+        editor = _SlowEditor()
+        spec = SpeculativeGenerator(editor, enabled=False)
+        assert not spec.start('dream', b"jpeg", "sword")
+        assert editor.calls == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,505 @@
+"""Tests for the recognition layer: KNN index, sample store, embedding cache, batching, backends."""
+import pytest
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Recognition.KNNIndex import KNNIndex
+from src.Core.Recognition.SampleStore import SampleStore
+from src.Core.Recognition.EmbeddingCache import EmbeddingCache
+from src.Core.Recognition.InferenceBatcher import InferenceBatcher
+from src.Core.Recognition.FeatureExtractor import FeatureExtractor, create_feature_backend
+from src.Core.Recognition.RecognitionStream import RecognitionStream
+from src.Framework.Recognition.AbstractFeatureBackend import AbstractFeatureBackend
+
+
+def _vec(*values):
+    return np.array(values, dtype=np.float32)
+
+
+@pytest.fixture
+def index():
+    """Small 2-D index with two well separated labels."""
+    idx = KNNIndex(capacity=2)
+    idx.add(_vec(0, 0), "sword")
+    idx.add(_vec(0, 1), "sword")
+    idx.add(_vec(10, 10), "sun")
+    return idx
+
+
+class TestKNNIndexQuery:
+    """Tests for nearest-neighbour queries."""
+
+    def test_empty_index_returns_unknown(self):
+        """Empty index should return Unknown with infinite distance."""
+        label, dist = KNNIndex().query(_vec(1, 2))
+        assert label == "Unknown"
+        assert dist == float('inf')
+
+    def test_nearest_neighbour(self, index):
+        """k=1 should return the closest sample and its euclidean distance."""
+        label, dist = index.query(_vec(9, 10))
+        assert label == "sun"
+        assert dist == pytest.approx(1.0)
+
+    def test_matches_linear_scan(self):
+        """Batched distances should agree with a naive linear scan."""
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 1280)).astype(np.float32)
+        idx = KNNIndex()
+        idx.reset(vectors, [f"l{i}" for i in range(50)])
+        q = rng.normal(size=1280).astype(np.float32)
+        expected = np.linalg.norm(vectors - q, axis=1)
+        np.testing.assert_allclose(idx.distances(q), expected, rtol=1e-4)
+        assert idx.query(q)[0] == f"l{int(np.argmin(expected))}"
+
+    def test_majority_vote(self, index):
+        """k=3 should let two close 'sword' samples outvote one 'sun'."""
+        index.add(_vec(6, 6), "sun")
+        label, _ = index.query(_vec(4, 4), k=1)
+        assert label == "sun"
+        label, dist = index.query(_vec(2, 2), k=3)
+        assert label == "sword"
+        assert dist == pytest.approx(np.sqrt(5))
+
+    def test_centroid_mode(self, index):
+        """Centroid mode should compare against per-label means."""
+        label, dist = index.query(_vec(0, 0.5), use_centroids=True)
+        assert label == "sword"
+        assert dist == pytest.approx(0.0, abs=1e-5)
+
+    def test_nearest_per_label(self, index):
+        """Every label should report the distance to its closest sample."""
+        nearest = index.nearest_per_label(_vec(0, 2))
+        assert nearest["sword"] == pytest.approx(1.0)
+        assert nearest["sun"] == pytest.approx(np.hypot(10, 8))
+
+
+class TestKNNIndexMutations:
+    """Tests for keeping the index in sync with the sample list."""
+
+    def test_grows_past_capacity(self, index):
+        """Adding beyond the initial capacity should keep all vectors."""
+        assert len(index) == 3
+        assert index.labels == ["sword", "sword", "sun"]
+        np.testing.assert_array_equal(index.vectors[2], _vec(10, 10))
+
+    def test_remove_label(self, index):
+        """remove_label should drop every vector of that label."""
+        assert index.remove_label("sword") == 2
+        assert index.labels == ["sun"]
+        assert index.query(_vec(0, 0))[0] == "sun"
+
+    def test_pop(self, index):
+        """pop should remove the most recent vector."""
+        assert index.pop() == "sun"
+        assert index.query(_vec(10, 10))[0] == "sword"
+
+    def test_centroids_refresh_after_add(self, index):
+        """Centroids should be recomputed after a mutation."""
+        index.query(_vec(0, 0), use_centroids=True)
+        index.add(_vec(0, 20), "umbrella")
+        assert index.query(_vec(0, 19), use_centroids=True)[0] == "umbrella"
+
+    def test_dimension_mismatch_rejected(self, index):
+        """Vectors of a different size should be rejected."""
+        with pytest.raises(ValueError):
+            index.add(_vec(1, 2, 3), "sword")
+
+
+class TestSampleStore:
+    """Tests for the binary .npy + sidecar dataset format."""
+
+    def test_append_and_load(self, tmp_path):
+        """Appended rows should be readable with np.load and the store loader."""
+        store = SampleStore(tmp_path, "ds")
+        store.append(_vec(1, 2, 3), {"label": "sword", "id": "a"})
+        store.append(_vec(4, 5, 6), {"label": "sun", "id": "b"})
+
+        vectors, meta = store.load()
+        assert isinstance(vectors, np.memmap)
+        np.testing.assert_array_equal(vectors, [[1, 2, 3], [4, 5, 6]])
+        assert [m["label"] for m in meta] == ["sword", "sun"]
+        np.testing.assert_array_equal(np.load(tmp_path / "ds.npy"), vectors)
+
+    def test_pop_truncates(self, tmp_path):
+        """pop should drop the last row and sidecar line."""
+        store = SampleStore(tmp_path, "ds")
+        store.append(_vec(1, 2), {"label": "sword", "id": "a"})
+        store.append(_vec(3, 4), {"label": "sun", "id": "b"})
+        store.pop()
+        vectors, meta = store.load()
+        assert vectors.shape == (1, 2)
+        assert meta == [{"label": "sword", "id": "a"}]
+        store.pop()
+        assert store.load() == (None, [])
+        store.append(_vec(5, 6), {"label": "sun", "id": "c"})
+        assert store.load()[0].shape == (1, 2)
+
+    def test_crash_before_header_is_repaired(self, tmp_path):
+        """A sidecar line without its header update should be dropped, keeping later labels aligned."""
+        store = SampleStore(tmp_path, "ds")
+        store.append(_vec(1, 2), {"label": "sword", "id": "a"})
+        # Crash mid-append: row and sidecar line written, header not patched
+        with open(tmp_path / "ds.npy", "ab") as f:
+            f.write(_vec(3, 4).tobytes())
+        with open(tmp_path / "ds.labels.jsonl", "a") as f:
+            f.write(json.dumps({"label": "lost", "id": "b"}) + "\n")
+
+        reopened = SampleStore(tmp_path, "ds")
+        reopened.append(_vec(5, 6), {"label": "sun", "id": "c"})
+        vectors, meta = SampleStore(tmp_path, "ds").load()
+        np.testing.assert_array_equal(vectors, [[1, 2], [5, 6]])
+        assert [m["label"] for m in meta] == ["sword", "sun"]
+        assert len((tmp_path / "ds.labels.jsonl").read_text().splitlines()) == 2
+
+    def test_torn_sidecar_line_is_repaired(self, tmp_path):
+        """A half-written last label line should be truncated on open."""
+        store = SampleStore(tmp_path, "ds")
+        store.append(_vec(1, 2), {"label": "sword", "id": "a"})
+        with open(tmp_path / "ds.labels.jsonl", "a") as f:
+            f.write('{"label": "su')
+        assert [m["label"] for m in SampleStore(tmp_path, "ds").load()[1]] == ["sword"]
+        assert (tmp_path / "ds.labels.jsonl").read_text() == json.dumps({"label": "sword", "id": "a"}) + "\n"
+
+    def test_pop_truncates_sidecar_in_place(self, tmp_path):
+        """pop should cut the sidecar at its last line, leaving earlier lines untouched."""
+        store = SampleStore(tmp_path, "ds")
+        for i in range(20):
+            store.append(_vec(i, i), {"label": f"l{i}", "id": str(i)})
+        before = (tmp_path / "ds.labels.jsonl").read_bytes()
+        store.pop()
+        after = (tmp_path / "ds.labels.jsonl").read_bytes()
+        assert before.startswith(after) and after.endswith(b"\n")
+        assert SampleStore._line_offset(BytesIO(before), 1, chunk_size=7) == len(after)
+        assert [m["label"] for m in store.load()[1]][-1] == "l18"
+
+    def test_write_all_replaces_content(self, tmp_path):
+        """write_all should rewrite the dataset atomically."""
+        store = SampleStore(tmp_path, "ds")
+        store.append(_vec(1, 2), {"label": "sword", "id": "a"})
+        store.write_all(np.array([[7, 8]], dtype=np.float32), [{"label": "sun", "id": "z"}])
+        vectors, meta = store.load()
+        np.testing.assert_array_equal(vectors, [[7, 8]])
+        assert meta[0]["label"] == "sun"
+
+    def test_migrates_legacy_json(self, tmp_path):
+        """Legacy model/*.json datasets should be converted once."""
+        legacy = [{"label": "sword", "vector": [1.0, 2.0], "id": "1"},
+                  {"label": "sun", "vector": [3.0, 4.0], "id": "2"}]
+        (tmp_path / "old.json").write_text(json.dumps(legacy))
+
+        assert SampleStore.migrate_all(tmp_path) == 1
+        assert SampleStore.migrate_all(tmp_path) == 0
+        assert (tmp_path / "old.json.migrated").exists()
+        assert SampleStore.list_names(tmp_path) == ["old"]
+
+        vectors, meta = SampleStore(tmp_path, "old").load()
+        np.testing.assert_array_equal(vectors, [[1, 2], [3, 4]])
+        assert meta == [{"label": "sword", "id": "1"}, {"label": "sun", "id": "2"}]
+
+
+
+def _jpeg(array, quality=90):
+    buf = BytesIO()
+    Image.fromarray(array.astype(np.uint8)).save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def drawing():
+    """Synthetic 'drawing': a dark diagonal gradient with a bright square."""
+    y, x = np.mgrid[0:120, 0:160]
+    img = (x + y).astype(np.float32) / 2
+    img[30:90, 50:110] = 250
+    return np.stack([img] * 3, axis=-1)
+
+
+class TestEmbeddingCache:
+    """Tests for the LRU embedding cache."""
+
+    def test_exact_hit_after_put(self, drawing):
+        """Identical bytes should hit after the first miss."""
+        cache = EmbeddingCache(max_size=4)
+        frame = _jpeg(drawing)
+        vector, key, phash = cache.get(frame)
+        assert vector is None and phash is None
+        cache.put(key, _vec(1, 2), phash)
+        np.testing.assert_array_equal(cache.get(frame)[0], _vec(1, 2))
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Oldest entries should be evicted beyond max_size."""
+        cache = EmbeddingCache(max_size=2)
+        for i in range(3):
+            cache.put(cache.content_key(bytes([i])), _vec(i))
+        assert cache.get(bytes([0]))[0] is None
+        assert cache.get(bytes([2]))[0] is not None
+        assert cache.stats()["size"] == 2
+
+    def test_perceptual_match_on_near_duplicate(self, drawing):
+        """A re-encoded, slightly noisy frame should match by perceptual hash."""
+        cache = EmbeddingCache(max_size=4, use_phash=True, phash_tolerance=4)
+        _, key, phash = cache.get(_jpeg(drawing, quality=90))
+        assert phash is not None
+        cache.put(key, _vec(7), phash)
+
+        noisy = np.clip(drawing + np.random.default_rng(1).normal(0, 2, drawing.shape), 0, 255)
+        vector, _, _ = cache.get(_jpeg(noisy, quality=70))
+        np.testing.assert_array_equal(vector, _vec(7))
+        assert cache.stats()["phash_hits"] == 1
+
+    def test_different_frame_misses(self, drawing):
+        """A different drawing should not match within the tolerance."""
+        cache = EmbeddingCache(max_size=4, use_phash=True, phash_tolerance=4)
+        _, key, phash = cache.get(_jpeg(drawing))
+        cache.put(key, _vec(7), phash)
+        assert cache.get(_jpeg(drawing[:, ::-1]))[0] is None
+
+
+
+class TestInferenceBatcher:
+    """Tests for the micro-batching inference queue."""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Requests arriving within the wait window should run in one call."""
+        calls = []
+
+        def infer(items):
+            calls.append(list(items))
+            return [i * 10 for i in items]
+
+        batcher = InferenceBatcher(infer, max_batch=4, max_wait_ms=200)
+        futures = [batcher.submit(1), batcher.submit(2)]
+        assert [f.result(timeout=2) for f in futures] == [10, 20]
+        assert calls == [[1, 2]]
+        assert batcher.stats()["avg_batch_size"] == 2
+
+    def test_max_batch_splits(self):
+        """No batch should exceed max_batch."""
+        sizes = []
+
+        def infer(items):
+            sizes.append(len(items))
+            return items
+
+        batcher = InferenceBatcher(infer, max_batch=2, max_wait_ms=100)
+        futures = [batcher.submit(i) for i in range(5)]
+        assert [f.result(timeout=2) for f in futures] == list(range(5))
+        assert max(sizes) <= 2
+
+    def test_errors_reach_every_caller(self):
+        """A failing forward pass should fail all futures of the batch."""
+        def infer(items):
+            raise RuntimeError("boom")
+
+        future = InferenceBatcher(infer, max_wait_ms=0).submit(1)
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+
+
+class _MeanBackend(AbstractFeatureBackend):
+    """Backend whose 'embedding' is the per-channel mean of the input."""
+
+    name = "mean"
+
+    def __init__(self, input_size=32):
+        super().__init__(input_size)
+        self.loads = 0
+        self.batches = []
+
+    def load(self):
+        self.loads += 1
+
+    def forward(self, batch):
+        self.batches.append(len(batch))
+        return [array.mean(axis=(1, 2)) for array in batch]
+
+
+class TestFeatureBackends:
+    """Tests for the pluggable feature-extractor backends."""
+
+    @pytest.mark.parametrize("size,shape", [(224, (120, 160)), (160, (160, 120)), (224, (301, 300))])
+    def test_preprocess_matches_torchvision(self, size, shape):
+        """Preprocessing without torch should equal torchvision's Resize/CenterCrop/Normalize."""
+        transforms = pytest.importorskip("torchvision.transforms")
+        image = Image.fromarray(np.random.default_rng(0).integers(0, 255, shape + (3,), dtype=np.uint8))
+        expected = transforms.Compose([
+            transforms.Resize(size),
+            transforms.CenterCrop(size),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        ])(image).numpy()
+
+        array = _MeanBackend(size).preprocess(image)
+        assert array.shape == (3, size, size) and array.dtype == np.float32
+        np.testing.assert_allclose(array, expected, atol=1e-6)
+
+    def test_onnx_matches_torch(self, tmp_path, monkeypatch):
+        """The exported ONNX model should give the torch backend's embeddings up to float rounding."""
+        torch = pytest.importorskip("torch")
+        models = pytest.importorskip("torchvision.models")
+        pytest.importorskip("onnxruntime")
+        from src.Core.Config import Config
+        from src.Core.Recognition.ModelArtifacts import weights_path
+        from src.Core.Recognition.OnnxFeatureBackend import OnnxFeatureBackend
+        from src.Core.Recognition.TorchFeatureBackend import TorchFeatureBackend
+
+        # Seeded weights stand in for the ImageNet checkpoint (same graph, no download).
+        # BatchNorm statistics are calibrated so activations do not vanish with depth.
+        monkeypatch.setattr(Config, "KNN_WEIGHTS_DIR", str(tmp_path / "weights"))
+        torch.manual_seed(0)
+        model = models.mobilenet_v2(weights=None)
+        for module in model.modules():
+            if isinstance(module, torch.nn.BatchNorm2d):
+                module.momentum = None
+        with torch.no_grad():
+            model.train()(torch.randn(8, 3, 96, 96))
+        reference = TorchFeatureBackend(input_size=96)
+        os.makedirs(Config.KNN_WEIGHTS_DIR)
+        torch.save(model.state_dict(), weights_path(reference.artifacts()[0]))
+
+        onnx = OnnxFeatureBackend(input_size=96, model_dir=str(tmp_path))
+        reference.load()
+        onnx.load()
+        assert os.path.exists(onnx.model_path)
+
+        batch = []
+        for box in [(70, 10, 90, 110), (30, 50, 130, 70), (50, 30, 110, 90)]:  # blade, bar, block
+            img = np.full((120, 160, 3), 255, dtype=np.uint8)
+            img[box[1]:box[3], box[0]:box[2]] = 0
+            batch.append(reference.preprocess(Image.fromarray(img)))
+        expected, actual = np.stack(reference.forward(batch)), np.stack(onnx.forward(batch))
+        assert actual.shape == expected.shape == (3, 1280)
+        np.testing.assert_allclose(actual, expected, rtol=1e-3, atol=1e-4 * np.abs(expected).max())
+        # Same nearest neighbour: distances between embeddings agree too
+        np.testing.assert_allclose(np.linalg.norm(actual[0] - actual[1:], axis=1),
+                                   np.linalg.norm(expected[0] - expected[1:], axis=1), rtol=1e-3)
+
+    def test_unknown_backend_falls_back_to_torch(self):
+        """A misconfigured backend name should not break recognition."""
+        backend = create_feature_backend("tpu", 160)
+        assert backend.name == "torch" and backend.input_size == 160
+
+    def test_extractor_uses_backend(self, drawing):
+        """FeatureExtractor should load the backend once and embed at its input size."""
+        backend = _MeanBackend(input_size=32)
+        extractor = FeatureExtractor(cache=EmbeddingCache(max_size=0), backend=backend)
+
+        vector = extractor.extract(drawing.astype(np.uint8))
+        extractor.extract(_jpeg(drawing))
+
+        assert backend.loads == 1
+        assert vector.shape == (3,)
+        assert sum(backend.batches) == 3  # Warm-up + two frames
+
+
+class _SlowBackend(_MeanBackend):
+    """Backend whose load takes a while (or fails), to exercise the lifecycle."""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+
+    def load(self):
+        time.sleep(0.05)
+        super().load()
+        if self.fail:
+            raise FileNotFoundError("weights missing")
+
+
+class TestExtractorLifecycle:
+    """Tests for the locked load, warm-up and readiness of the extractor."""
+
+    def test_concurrent_callers_load_once(self, drawing):
+        """Frames arriving during the load should wait for it, not load the model again."""
+        backend = _SlowBackend()
+        extractor = FeatureExtractor(cache=EmbeddingCache(max_size=0), backend=backend)
+        assert extractor.readiness()["state"] == "cold"
+
+        frame = drawing.astype(np.uint8)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            vectors = list(pool.map(lambda _: extractor.extract(frame), range(4)))
+
+        assert backend.loads == 1
+        assert all(v is not None for v in vectors)
+        readiness = extractor.readiness()
+        assert readiness["ready"] and readiness["state"] == "ready"
+        assert readiness["load_ms"] >= 40 and readiness["warmup_ms"] is not None
+
+    def test_state_changes_notify_listeners(self):
+        """Listeners should see loading then ready."""
+        extractor = FeatureExtractor(cache=EmbeddingCache(max_size=0), backend=_MeanBackend())
+        states = []
+        extractor.add_listener(lambda: states.append(extractor.state))
+        extractor.ensure_loaded()
+        assert states == ["loading", "ready"]
+
+    def test_failed_load_reported(self, drawing):
+        """A missing artifact should leave the extractor 'failed' with the error, without retrying."""
+        backend = _SlowBackend(fail=True)
+        extractor = FeatureExtractor(cache=EmbeddingCache(max_size=0), backend=backend)
+
+        assert extractor.extract(drawing.astype(np.uint8)) is None
+        assert extractor.extract(drawing.astype(np.uint8)) is None
+        readiness = extractor.readiness()
+        assert readiness["state"] == "failed" and not readiness["ready"]
+        assert "weights missing" in readiness["error"]
+        assert backend.loads == 1
+
+
+
+class TestRecognitionStream:
+    """Tests for per-role threshold / margin / N-of-M smoothing."""
+
+    @pytest.fixture
+    def stream(self):
+        return RecognitionStream(threshold=10.0, margin=2.0, window=3, votes=2)
+
+    def test_single_frame_is_not_stable(self, stream):
+        """One matching frame should not be enough to validate."""
+        assert stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0}) == (None, False)
+        assert stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0}) == ("sword", True)
+
+    def test_far_and_ambiguous_frames_rejected(self, stream):
+        """Frames beyond the threshold or without margin should not vote."""
+        stream.update("sword", 12.0, {"sword": 12.0, "shield": 20.0})
+        stream.update("sword", 4.0, {"sword": 4.0, "shield": 5.0})
+        assert stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0}) == (None, False)
+        stats = stream.stats()
+        assert stats["rejected_distance"] == 1 and stats["rejected_margin"] == 1
+
+    def test_noise_does_not_flip_stable_label(self, stream):
+        """A stray frame should keep the decision but not be accepted for it."""
+        stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0})
+        stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0})
+        assert stream.update("shield", 4.0, {"shield": 4.0, "sword": 9.0}) == ("sword", False)
+
+    def test_rejected_frame_not_accepted_for_stable_label(self, stream):
+        """Once stable, a frame beyond the threshold should keep the label but not be accepted."""
+        stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0})
+        stream.update("sword", 4.0, {"sword": 4.0, "shield": 9.0})
+        assert stream.update("sword", 15.0, {"sword": 15.0, "shield": 20.0}) == ("sword", False)
+
+    def test_untrained_labels_rejected_and_reset(self, stream):
+        """Labels without distances (Need Training) never stabilise; reset clears the window."""
+        assert stream.update("Need Training", 0.0, {}) == (None, False)
+        stream.update("sword", 4.0, {"sword": 4.0})
+        stream.update("sword", 4.0, {"sword": 4.0})
+        assert stream.stable_label == "sword"
+        stream.reset()
+        assert stream.stable_label is None and stream.stats()["window"] == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
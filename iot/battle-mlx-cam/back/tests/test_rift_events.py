@@ -0,0 +1,140 @@
+"""Tests for the merged Rift state store, its update events and the state scheduler."""
+import pytest
+import sys
+import os
+import json
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Network.RiftWebSocket import RiftWebSocket
+from src.Core.Services.Scheduler import Scheduler
+
+
+@pytest.fixture
+def ws():
+    client = RiftWebSocket(url="ws://unused")
+    client.events = []
+    client.subscribe(lambda delta, state: client.events.append(delta))
+    return client
+
+
+class TestRiftStateBus:
+    """Tests for delta publishing in RiftWebSocket."""
+
+    def test_only_changed_keys_are_published(self, ws):
+        """Subscribers should receive the keys that changed."""
+        ws._handle_message(json.dumps({"battle_state": "FIGHTING", "battle_boss_hp": 3}))
+        ws._handle_message(json.dumps({"battle_state": "FIGHTING", "battle_boss_hp": 2}))
+        assert ws.events == [{"battle_state": "FIGHTING", "battle_boss_hp": 3}, {"battle_boss_hp": 2}]
+
+    def test_short_pulse_is_not_missed(self, ws):
+        """A high->low pulse between two polls must produce both edges."""
+        ws._handle_message(json.dumps({"battle_hit_confirmed": False}))
+        ws._handle_message(json.dumps({"battle_hit_confirmed": True}))
+        ws._handle_message(json.dumps({"battle_hit_confirmed": False}))
+        assert [e["battle_hit_confirmed"] for e in ws.events] == [False, True, False]
+
+    def test_unchanged_and_invalid_messages_ignored(self, ws):
+        """Identical or malformed messages should not notify subscribers."""
+        ws._handle_message(json.dumps({"a": 1}))
+        ws._handle_message(json.dumps({"a": 1}))
+        ws._handle_message("not json")
+        assert ws.events == [{"a": 1}]
+
+    def test_subscriber_errors_are_isolated(self, ws):
+        """A failing subscriber should not break the others."""
+        received = []
+        ws.subscribe(lambda delta, state: 1 / 0)
+        ws.subscribe(lambda delta, state: received.append(delta))
+        ws._handle_message(json.dumps({"a": 1}))
+        assert received == [{"a": 1}]
+
+
+class _SentMessages:
+    """Stands in for the websocket-client connection and records sent payloads."""
+
+    def __init__(self):
+        self.payloads = []
+
+    def send(self, message):
+        self.payloads.append(json.loads(message))
+
+
+@pytest.fixture
+def connected(ws):
+    ws.ws = _SentMessages()
+    ws.connected = True
+    return ws
+
+
+class TestRiftStateStore:
+    """Tests for partial-update merging and full-state sends."""
+
+    def test_partial_updates_are_merged(self, ws):
+        """A partial message should update its keys and keep the others."""
+        ws._handle_message(json.dumps({"battle_state": "FIGHTING", "battle_boss_hp": 3}))
+        ws._handle_message(json.dumps({"battle_boss_hp": 2}))
+        assert ws.last_state == {"battle_state": "FIGHTING", "battle_boss_hp": 2}
+
+    def test_full_state_is_sent(self, connected):
+        """Relay clients replace their state: every message carries the whole merged state."""
+        connected._handle_message(json.dumps({"battle_state": "FIGHTING", "battle_boss_hp": 3, "device_id": "esp"}))
+        connected.send_update({"battle_boss_hp": 2})
+        connected.send_update({"battle_boss_hp": 2})
+        expected = {"device_id": "battle-camera", "battle_state": "FIGHTING", "battle_boss_hp": 2}
+        assert connected.ws.payloads == [expected, expected]
+
+    def test_images_are_never_echoed(self, connected):
+        """Large fields from an earlier state must not be sent back."""
+        image = "data:image/png;base64," + "A" * 10000
+        connected._handle_message(json.dumps({"battle_drawing_dream_image": image, "battle_state": "FIGHTING"}))
+        connected.send_update({"battle_drawing_dream_image": image + "B", "battle_state": "HIT"})
+        assert connected.ws.payloads == [{"device_id": "battle-camera", "battle_state": "HIT"}]
+        assert "battle_drawing_dream_image" not in connected.summary()
+
+    def test_send_image_carries_state_and_new_image(self, connected):
+        """send_image should send the new image with the rest of the state, minus other images."""
+        connected._handle_message(json.dumps({"battle_drawing_nightmare_image": "data:" + "N" * 10000,
+                                              "battle_state": "FIGHTING"}))
+        connected.send_image("A" * 10000, "dream", {"battle_dream_valid": True})
+        sent = connected.ws.payloads[0]
+        assert set(sent) == {"device_id", "battle_state", "battle_drawing_dream_image", "battle_dream_valid"}
+
+    def test_forward_keeps_payload_and_resends(self, connected):
+        """Proxied frontend payloads go out as-is, repeated ones included, only without images."""
+        payload = {"device_id": "battle-front", "battle_state": "IDLE", "reset_system": True,
+                   "battle_drawing_dream_image": "data:" + "A" * 10000}
+        connected.forward(payload)
+        connected.forward(payload)
+        expected = {"device_id": "battle-front", "battle_state": "IDLE", "reset_system": True}
+        assert connected.ws.payloads == [expected, expected]
+        assert connected.last_state == {"battle_state": "IDLE", "reset_system": True}
+
+
+class TestScheduler:
+    """Tests for cancellable state timers."""
+
+    def test_call_later_runs(self):
+        """Callbacks should run after their delay."""
+        done = threading.Event()
+        Scheduler().call_later(0.01, done.set)
+        assert done.wait(1)
+
+    def test_cancel(self):
+        """Cancelled timers should never fire."""
+        scheduler = Scheduler()
+        fired = []
+        timer = scheduler.call_later(0.05, fired.append, 1)
+        scheduler.cancel(timer)
+        scheduler.call_later(0.05, fired.append, 2)
+        scheduler.cancel_all()
+        time.sleep(0.1)
+        assert fired == []
+        assert scheduler.pending == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,141 @@
+"""Tests for diff-based, coalesced status publishing."""
+import pytest
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Core.Services.StatusPublisher import StatusPublisher
+
+
+class _Status:
+    """Mutable status source with an emit recorder."""
+
+    def __init__(self):
+        self.status = {"battle_state": "IDLE", "cameras": {"dream": {"label": None, "processing": False}}}
+        self.emitted = []
+
+    def get(self):
+        return {k: (dict(v) if isinstance(v, dict) else v) for k, v in self.status.items()}
+
+    def emit(self, event, data):
+        self.emitted.append((event, data))
+
+
+@pytest.fixture
+def source():
+    return _Status()
+
+
+class TestStatusPublisher:
+    """Tests for snapshots, diffs and coalescing."""
+
+    def test_first_publish_is_full_then_patches(self, source):
+        """The first emit is a full status, later ones only changed fields."""
+        publisher = StatusPublisher(source.get, source.emit)
+        initial = source.get()
+        publisher.publish()
+        source.status["cameras"] = {"dream": {"label": "sword", "processing": False}}
+        publisher.publish()
+
+        assert source.emitted[0] == ('status', {**initial, "version": 1})
+        assert source.emitted[1] == ('status_patch', {"cameras": {"dream": {"label": "sword"}}, "version": 2})
+
+    def test_unchanged_status_emits_nothing(self, source):
+        """No patch should be sent when nothing changed."""
+        publisher = StatusPublisher(source.get, source.emit)
+        publisher.publish()
+        publisher.publish()
+        assert len(source.emitted) == 1
+
+    def test_burst_is_coalesced(self, source):
+        """Many requests within one interval should produce one publish."""
+        publisher = StatusPublisher(source.get, source.emit, max_rate_hz=10)
+        publisher.publish()
+        for hp in range(20):
+            source.status["current_hp"] = hp
+            publisher.request()
+        time.sleep(0.3)
+
+        patches = [data for event, data in source.emitted if event == 'status_patch']
+        assert 1 <= len(patches) <= 2
+        assert patches[-1] == {"current_hp": 19, "version": 1 + len(patches)}
+
+    def test_since_merges_missed_patches(self, source):
+        """A client behind by a few versions gets one merged patch."""
+        publisher = StatusPublisher(source.get, source.emit)
+        publisher.publish()
+        for hp in (3, 2):
+            source.status["current_hp"] = hp
+            publisher.publish()
+        source.status["battle_state"] = "FIGHTING"
+        publisher.publish()
+
+        assert publisher.since(1) == {"version": 4, "patch": {"current_hp": 2, "battle_state": "FIGHTING", "version": 4}}
+        assert publisher.since(4) == {"version": 4, "patch": {}}
+
+    def test_since_falls_back_to_snapshot(self, source):
+        """Versions older than the history (or unknown) get the full status."""
+        publisher = StatusPublisher(source.get, source.emit, history_size=1)
+        publisher.publish()
+        for hp in (3, 2, 1):
+            source.status["current_hp"] = hp
+            publisher.publish()
+
+        result = publisher.since(1)
+        assert result["version"] == 4
+        assert result["status"]["current_hp"] == 1
+        assert "status" in publisher.since(0)
+
+    def test_diff_removed_keys(self):
+        """Removed keys should be listed as paths, not sent as None."""
+        old = {"a": 1, "b": 2, "cameras": {"dream": {"label": "sword"}, "nightmare": {}}}
+        new = {"a": None, "cameras": {"dream": {}}}
+        patch = StatusPublisher.diff(old, new)
+        assert patch == {"a": None, "removed": [["cameras", "dream", "label"], ["cameras", "nightmare"], ["b"]]}
+        assert StatusPublisher.merge(old, patch) == new
+
+    def test_since_composes_removals(self, source):
+        """A catch-up patch should carry removals, and a key re-added later should survive them."""
+        publisher = StatusPublisher(source.get, source.emit)
+        publisher.publish()
+        initial = publisher.snapshot()
+        del source.status["cameras"]
+        publisher.publish()
+        source.status["current_hp"] = 2
+        publisher.publish()
+
+        patch = publisher.since(1)["patch"]
+        assert patch["removed"] == [["cameras"]]
+        assert StatusPublisher.merge(initial, patch) == {"battle_state": "IDLE", "current_hp": 2, "version": 3}
+
+        source.status["cameras"] = {"dream": {}}
+        publisher.publish()
+        assert StatusPublisher.merge(initial, publisher.since(1)["patch"])["cameras"] == {"dream": {}}
+
+    def test_patches_are_emitted_in_version_order(self, source):
+        """A slow emit must not let a concurrent publish overtake it."""
+        import threading
+
+        def emit(event, data):
+            if data["version"] == 2:
+                time.sleep(0.1)  # Worker publish stalls on the socket
+            source.emit(event, data)
+
+        publisher = StatusPublisher(source.get, emit)
+        publisher.publish()
+        source.status["current_hp"] = 3
+        worker = threading.Thread(target=publisher.publish)
+        worker.start()
+        time.sleep(0.02)
+        source.status["current_hp"] = 2
+        publisher.request(immediate=True)
+        worker.join()
+
+        assert [data["version"] for _, data in source.emitted] == [1, 2, 3]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,5 +1,6 @@
 
 import { io, Socket } from 'socket.io-client';
+import { useStatusSync } from '~/composables/useStatusSync';
 
 // Global singleton to reuse connection
 let globalSocket: Socket | null = null;
@@ -11,6 +12,35 @@ export const useRiftSocket = () => {
     const isConnected = useState<boolean>('rift-socket-connected', () => false);
     const lastPayload = useState<any>('rift-socket-payload', () => null);
 
+    const applyStatus = (data: any) => {
+        // BattleService emits 'status' with local state + ws_state (Rift State)
+        // Priority: Use local backend's battle_state for responsiveness,
+        // fall back to ws_state from Rift server
+        if (data) {
+            const payload: any = {};
+            
+            // Always use local backend state if available (faster, more responsive)
+            if (data.battle_state) {
+                payload.battle_state = data.battle_state;
+            }
+            if (data.current_hp !== undefined) {
+                payload.battle_boss_hp = data.current_hp;
+            }
+            if (data.current_attack !== undefined) {
+                payload.battle_boss_attack = data.current_attack;
+            }
+            
+            // Merge with Rift state if available (for other fields)
+            if (data.ws_state) {
+                // Rift state provides additional fields, but local state takes priority
+                lastPayload.value = { ...data.ws_state, ...payload };
+            } else if (Object.keys(payload).length > 0) {
+                // Only local state available
+                lastPayload.value = { ...lastPayload.value, ...payload };
+            }
+        }
+    };
+
     const connect = () => {
         if (globalSocket && globalSocket.connected) {
             isConnected.value = true;
@@ -38,35 +68,11 @@ export const useRiftSocket = () => {
 
         // Backend acts as a proxy, forwarding Rift events as 'rift_state_update'
         // or potentially broadcasting 'status' which contains everything.
-        // Let's listen for 'status' as it's what BattleService emits currently.
-        globalSocket.on('status', (data: any) => {
-            // BattleService emits 'status' with local state + ws_state (Rift State)
-            // Priority: Use local backend's battle_state for responsiveness,
-            // fall back to ws_state from Rift server
-            if (data) {
-                const payload: any = {};
-                
-                // Always use local backend state if available (faster, more responsive)
-                if (data.battle_state) {
-                    payload.battle_state = data.battle_state;
-                }
-                if (data.current_hp !== undefined) {
-                    payload.battle_boss_hp = data.current_hp;
-                }
-                if (data.current_attack !== undefined) {
-                    payload.battle_boss_attack = data.current_attack;
-                }
-                
-                // Merge with Rift state if available (for other fields)
-                if (data.ws_state) {
-                    // Rift state provides additional fields, but local state takes priority
-                    lastPayload.value = { ...data.ws_state, ...payload };
-                } else if (Object.keys(payload).length > 0) {
-                    // Only local state available
-                    lastPayload.value = { ...lastPayload.value, ...payload };
-                }
-            }
-        });
+        // BattleService sends one full 'status' on connect, then 'status_patch'
+        // diffs with only the changed fields.
+        const statusSync = useStatusSync(() => SOCKET_URL, applyStatus);
+        globalSocket.on('status', statusSync.onStatus);
+        globalSocket.on('status_patch', statusSync.onPatch);
 
         // Listen for explicit battle state updates from backend (force_start_fight, etc.)
         globalSocket.on('battle_state_update', (data: any) => {
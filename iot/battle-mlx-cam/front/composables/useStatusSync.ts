@@ -0,0 +1,71 @@
+// Status Sync Composable
+// Keeps the last full backend status from a 'status' snapshot and the
+// 'status_patch' diffs that follow it (shared by the battle page and config)
+
+const mergeFields = (target: any, fields: any): any => {
+    const merged = { ...target };
+    for (const [key, value] of Object.entries(fields || {})) {
+        const current = merged[key];
+        merged[key] = value && typeof value === 'object' && !Array.isArray(value)
+            && current && typeof current === 'object' && !Array.isArray(current)
+            ? mergeFields(current, value)
+            : value;
+    }
+    return merged;
+};
+
+const withoutPath = (target: any, path: string[]): any => {
+    const [key, ...rest] = path;
+    if (!target || typeof target !== 'object' || !(key in target)) return target;
+    const copy = { ...target };
+    if (rest.length) copy[key] = withoutPath(copy[key], rest);
+    else delete copy[key];
+    return copy;
+};
+
+// Same semantics as StatusPublisher.merge: drop the "removed" key paths, then merge the fields
+export const mergePatch = (target: any, patch: any): any => {
+    const { removed, ...fields } = patch || {};
+    let base = target;
+    for (const path of removed || []) base = withoutPath(base, path);
+    return mergeFields(base, fields);
+};
+
+export function useStatusSync(baseUrl: () => string, apply: (status: any) => void) {
+    let snapshot: any = {};
+    let catchingUp = false;
+
+    // Missed patches (e.g. reconnect): catch up from the server history (or full snapshot)
+    const catchUp = async () => {
+        catchingUp = true;
+        try {
+            const res = await fetch(`${baseUrl()}/status?since=${snapshot.version}`);
+            if (!res.ok) return;
+            const data = await res.json();
+            snapshot = data.status ? data.status : mergePatch(snapshot, data.patch);
+            apply(snapshot);
+        } catch (e) {
+            console.warn('[StatusSync] Status catch-up failed:', e);
+        } finally {
+            catchingUp = false;
+        }
+    };
+
+    const onStatus = (data: any) => {
+        snapshot = data || {};
+        apply(snapshot);
+    };
+
+    const onPatch = async (patch: any) => {
+        if (!patch || catchingUp) return;
+        if (snapshot.version && patch.version <= snapshot.version) return; // Already in the snapshot
+        if (snapshot.version && patch.version !== snapshot.version + 1) {
+            await catchUp();
+            return;
+        }
+        snapshot = mergePatch(snapshot, patch);
+        apply(snapshot);
+    };
+
+    return { onStatus, onPatch };
+}
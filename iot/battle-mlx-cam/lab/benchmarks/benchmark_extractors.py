@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Extractor Benchmark - Per-frame latency and KNN parity of the feature backends.
+
+Each backend (torch fp32, torch-int8, onnx, optionally at a smaller input
+size with "@160") embeds the same camera frames:
+- latency: load time and per-frame preprocess + forward (batch of 1)
+- parity: nearest-neighbour label of every frame against a stored dataset
+  (back/model/<dataset>.npy), compared with the reference backend - the one
+  the dataset was recorded with (first of --backends)
+
+    python lab/benchmarks/benchmark_extractors.py --frames lab/benchmarks/frames
+    python lab/benchmarks/benchmark_extractors.py --backends torch,onnx@160 --tolerance 0.02
+
+Frames are every image under --frames (e.g. a BATTLE_RECORD_DIR recording).
+Exits 1 if a backend's label agreement is below 1 - tolerance.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+# ANSI Colors
+class Colors:
+    HEADER = '\033[95m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+# Add back directory to path for src imports
+# lab/benchmarks -> lab -> root -> back
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(bench_dir))
+sys.path.append(os.path.join(root_dir, "back"))
+
+from PIL import Image
+
+from src.Core.Config import Config
+from src.Core.Recognition.FeatureExtractor import create_feature_backend
+from src.Core.Recognition.KNNIndex import KNNIndex
+from src.Core.Recognition.SampleStore import SampleStore
+
+
+def load_frames(frames_dir: str, limit: int) -> list:
+    paths = sorted(
+        p for ext in ("jpg", "jpeg", "png")
+        for p in glob.glob(os.path.join(frames_dir, "**", f"*.{ext}"), recursive=True)
+    )
+    if not paths:
+        print(f"{Colors.WARNING}⚠️ No frames in {frames_dir} - using original.png (parity is not meaningful){Colors.ENDC}")
+        paths = [os.path.join(bench_dir, "original.png")]
+    return [Image.open(p).convert("RGB") for p in paths[:limit]]
+
+
+def load_index(dataset: str) -> KNNIndex:
+    vectors, meta = SampleStore(Config.KNN_MODEL_DIR, dataset).load()
+    index = KNNIndex()
+    if vectors is not None:
+        index.reset(vectors, [m["label"] for m in meta])
+    return index
+
+
+def parse_backend(spec: str) -> tuple[str, int]:
+    name, _, size = spec.partition("@")
+    return name, int(size) if size else Config.KNN_INPUT_SIZE
+
+
+def run_backend(spec: str, frames: list, iterations: int) -> dict:
+    name, size = parse_backend(spec)
+    backend = create_feature_backend(name, size)
+    if backend.name != name:
+        raise RuntimeError(f"{name} unavailable")
+
+    start = time.perf_counter()
+    backend.load()
+    load_s = time.perf_counter() - start
+
+    backend.forward([backend.preprocess(frames[0])])  # Warm-up (allocations, kernel selection)
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        backend.forward([backend.preprocess(frames[i % len(frames)])])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    embeddings = [backend.forward([backend.preprocess(frame)])[0] for frame in frames]
+    return {
+        "backend": spec,
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "embeddings": embeddings,
+    }
+
+
+def predictions(index: KNNIndex, embeddings: list) -> list:
+    """(label, accepted) per frame: nearest label and whether it passes the distance threshold."""
+    results = []
+    for vector in embeddings:
+        label, distance = index.query(vector, k=Config.KNN_K)
+        results.append((label, distance <= Config.KNN_DISTANCE_THRESHOLD))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature extractor backend benchmark + KNN parity")
+    parser.add_argument("--backends", default="torch,torch-int8,onnx,torch@160,onnx@160",
+                        help="Comma-separated backend[@input_size]; the first is the parity reference")
+    parser.add_argument("--frames", default=os.path.join(bench_dir, "frames"), help="Directory of camera frames")
+    parser.add_argument("--max-frames", type=int, default=200, help="Max frames used for parity")
+    parser.add_argument("--dataset", default="default_dataset", help="Stored KNN dataset (back/model)")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed frames per backend")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed share of disagreeing labels")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.max_frames)
+    index = load_index(args.dataset)
+    if not len(index):
+        print(f"{Colors.WARNING}⚠️ Dataset '{args.dataset}' is empty - parity skipped{Colors.ENDC}")
+
+    print(f"{Colors.HEADER}{Colors.BOLD}🧠 FEATURE BACKENDS ({len(frames)} frames, dataset '{args.dataset}'){Colors.ENDC}")
+    results = []
+    for spec in args.backends.split(","):
+        print(f"{Colors.OKCYAN}🚀 {spec}...{Colors.ENDC}")
+        try:
+            results.append(run_backend(spec, frames, args.iterations))
+        except Exception as e:
+            print(f"{Colors.FAIL}   ❌ {spec}: {e}{Colors.ENDC}")
+
+    if not results:
+        return 1
+
+    reference = predictions(index, results[0]["embeddings"]) if len(index) else None
+    failed = []
+    print(f"\n{Colors.BOLD}   {'backend':<14} {'load':>8} {'p50':>9} {'p95':>9} {'labels':>8} {'accepted':>9}{Colors.ENDC}")
+    for result in results:
+        labels = accepted = "-"
+        color = Colors.OKGREEN
+        if reference is not None:
+            current = predictions(index, result["embeddings"])
+            label_agreement = np.mean([a[0] == b[0] for a, b in zip(reference, current)])
+            decision_agreement = np.mean([a == b for a, b in zip(reference, current)])
+            labels, accepted = f"{label_agreement:.1%}", f"{decision_agreement:.1%}"
+            if label_agreement < 1 - args.tolerance:
+                failed.append(result["backend"])
+                color = Colors.FAIL
+        print(f"{color}   {result['backend']:<14} {result['load_s']:>7.2f}s {result['p50_ms']:>7.1f}ms "
+              f"{result['p95_ms']:>7.1f}ms {labels:>8} {accepted:>9}{Colors.ENDC}")
+
+    print("\n   labels = same nearest label as the reference, accepted = same label and same threshold decision")
+    print("   load includes the first torch import for the first torch-based backend")
+    if failed:
+        print(f"\n{Colors.FAIL}❌ Parity below {1 - args.tolerance:.0%}: {', '.join(failed)}{Colors.ENDC}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark - Replays recorded camera frames through BattleService offline.
+
+Frames go through the real process_client_frame path (decode, crop, KNN,
+staged generation, background removal, sync), but Fal is replaced by the
+local fake queue from back/tests/fake_fal_server.py, so runs need no network
+and are reproducible.
+
+Record frames from a real session first:
+    BATTLE_RECORD_DIR=lab/benchmarks/frames python main_headless.py
+(layout: <frames>/dream/*.jpg, <frames>/nightmare/*.jpg, replayed in name order)
+
+Then:
+    python lab/benchmarks/benchmark_pipeline.py --fps 10 --duration 60 --fal-latency 1.5
+    python lab/benchmarks/benchmark_pipeline.py --save-baseline      # store as the reference
+    python lab/benchmarks/benchmark_pipeline.py                      # compare, exit 1 on regression
+
+Reports frames/s, KNN latency, validation -> attack_ready latency (both roles
+recognized the counter -> attack_ready emitted), CPU and RSS.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+# ANSI Colors
+class Colors:
+    HEADER = '\033[95m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+# Add back directory to path for src imports
+# lab/benchmarks -> lab -> root -> back
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(bench_dir))
+back_dir = os.path.join(root_dir, "back")
+sys.path.append(back_dir)
+sys.path.append(os.path.join(back_dir, "tests"))
+
+from fake_fal_server import FakeFalServer
+
+DEFAULT_FRAMES_DIR = os.path.join(bench_dir, "frames")
+DEFAULT_BASELINE = os.path.join(bench_dir, "baseline_pipeline.json")
+ROLES = ("dream", "nightmare")
+
+# (metric path, True if higher is better)
+COMPARED_METRICS = [
+    ("fps", True),
+    ("knn_ms.p50", False),
+    ("knn_ms.p95", False),
+    ("attack_ready_ms.p50", False),
+    ("attack_ready_ms.p95", False),
+    ("cpu_percent", False),
+    ("rss_peak_mb", False),
+]
+
+
+class RecordingSocketIO:
+    """Stands in for Flask-SocketIO: counts emits and timestamps attack_ready."""
+
+    def __init__(self):
+        self.emits = {}
+        self.attack_ready = threading.Event()
+        self.attack_ready_at = None
+
+    def emit(self, event, data=None, **kwargs):
+        self.emits[event] = self.emits.get(event, 0) + 1
+        if event == 'attack_ready' and not self.attack_ready.is_set():
+            self.attack_ready_at = time.perf_counter()
+            self.attack_ready.set()
+
+    def reset_round(self):
+        self.attack_ready.clear()
+        self.attack_ready_at = None
+
+
+# --- FRAMES ---
+
+def load_frames(frames_dir: str) -> dict:
+    """Recorded frames per role, or frames derived from original.png when none were recorded."""
+    frames = {}
+    for role in ROLES:
+        paths = sorted(
+            p for ext in ("jpg", "jpeg", "png")
+            for p in glob.glob(os.path.join(frames_dir, role, f"*.{ext}"))
+        )
+        frames[role] = [open(p, "rb").read() for p in paths]
+
+    if all(frames.values()):
+        return frames
+
+    print(f"{Colors.WARNING}⚠️ No recording in {frames_dir} - using frames derived from original.png "
+          f"(KNN will likely never validate, so no attack_ready){Colors.ENDC}")
+    from io import BytesIO
+    from PIL import Image, ImageEnhance
+    original = Image.open(os.path.join(bench_dir, "original.png")).convert("RGB")
+    synthetic = []
+    for i in range(20):
+        buffer = BytesIO()
+        ImageEnhance.Brightness(original).enhance(0.8 + i * 0.02).save(buffer, format="JPEG", quality=85)
+        synthetic.append(buffer.getvalue())
+    return {role: frames[role] or synthetic for role in ROLES}
+
+
+# --- MEASUREMENTS ---
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))], 1)
+
+    return {"count": len(ordered), "p50": at(50), "p95": at(95), "max": round(ordered[-1], 1)}
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), falls back to the peak elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return rss_peak_mb()
+
+
+def rss_peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KB on Linux
+
+
+def metric(report: dict, path: str):
+    value = report
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+# --- RUN ---
+
+def run(args) -> dict:
+    os.environ.setdefault("FAL_KEY", "bench")  # The fake queue ignores it, the editors require one
+
+    from src.Core.Config import Config
+    from src.Core.Services.BattleService import BattleService, INITIAL_HP
+    from src.Core.Services.BattleState.FightingState import FightingState
+
+    frames = load_frames(args.frames)
+
+    with FakeFalServer(latency=args.fal_latency) as fal:
+        Config.FAL_BASE_URL = fal.base_url
+        Config.GENERATION_CACHE = False   # Every generation must reach the fake queue
+        Config.FRAME_RECORD_DIR = None
+        if args.bg_engine:
+            Config.BG_REMOVAL_ENGINE = args.bg_engine
+
+        service = BattleService()
+        socketio = RecordingSocketIO()
+        service.set_socketio(socketio)
+        service.start()
+
+        print(f"{Colors.OKCYAN}🚀 Replaying {sum(len(f) for f in frames.values())} frames at "
+              f"{args.fps} fps/role for {args.duration}s (fake Fal latency {args.fal_latency}s){Colors.ENDC}")
+
+        interval = 1.0 / args.fps
+        sent = 0
+        late = 0
+        rounds = 0
+        attack_ready_ms = []
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        deadline = wall_start + args.duration
+
+        while time.perf_counter() < deadline:
+            # New round: straight into FIGHTING (skips the 10s APPEARING animation)
+            rounds += 1
+            socketio.reset_round()
+            service.current_hp = INITIAL_HP
+            service.current_attack = None
+            service.change_state(FightingState(service))
+            round_end = min(deadline, time.perf_counter() + args.round_timeout)
+            validated_at = None
+            next_tick = time.perf_counter()
+
+            while time.perf_counter() < round_end and not socketio.attack_ready.is_set():
+                for role in ROLES:
+                    service.process_client_frame(role, frames[role][sent // len(ROLES) % len(frames[role])])
+                    sent += 1
+                if validated_at is None and all(state.counter_validated for state in service.roles.values()):
+                    validated_at = time.perf_counter()
+
+                next_tick += interval
+                wait = next_tick - time.perf_counter()
+                if wait > 0:
+                    socketio.attack_ready.wait(wait)
+                else:
+                    late += 1
+                    next_tick = time.perf_counter()  # Fell behind: do not burst to catch up
+
+            if validated_at is not None and socketio.attack_ready.wait(max(0.0, round_end - time.perf_counter())):
+                attack_ready_ms.append((socketio.attack_ready_at - validated_at) * 1000)
+            service.force_end_fight()
+
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        spans = service.tracer.stats()
+        knn = spans.get("knn", {})
+        pipeline = service.generation.stats()
+        unchanged = sum(state.change_gate.stats()["skipped"] for state in service.roles.values())
+        service.cleanup()
+
+        return {
+            "config": {
+                "frames_dir": args.frames,
+                "fps_target": args.fps,
+                "duration_s": args.duration,
+                "fal_latency_s": args.fal_latency,
+                "round_timeout_s": args.round_timeout,
+            },
+            "frames": sent,
+            "late_ticks": late,
+            "frames_unchanged": unchanged,
+            "fps": round(sent / wall, 2),
+            "knn_ms": {"count": knn.get("count", 0), "p50": knn.get("p50_ms", 0.0),
+                       "p95": knn.get("p95_ms", 0.0), "max": knn.get("max_ms", 0.0)},
+            "rounds": rounds,
+            "attack_ready_ms": percentiles(attack_ready_ms),
+            "fal_requests": len(fal.requests),
+            "cpu_percent": round(100 * cpu / wall, 1),
+            "rss_mb": round(rss_mb(), 1),
+            "rss_peak_mb": round(rss_peak_mb(), 1),
+            "pipeline": {k: pipeline[k] for k in ("submitted", "completed", "dropped", "cancelled", "failed")},
+            "spans": spans,
+        }
+
+
+# --- REPORT ---
+
+def print_report(report: dict):
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📊 PIPELINE BENCHMARK{Colors.ENDC}")
+    print(f"   Frames:        {report['frames']} ({report['fps']} fps, {report['late_ticks']} late ticks, "
+          f"{report.get('frames_unchanged', 0)} unchanged - decode + KNN skipped)")
+    knn = report["knn_ms"]
+    print(f"   KNN:           p50 {knn['p50']}ms | p95 {knn['p95']}ms | max {knn['max']}ms")
+    ready = report["attack_ready_ms"]
+    print(f"   attack_ready:  {ready['count']}/{report['rounds']} rounds | "
+          f"p50 {ready['p50']}ms | p95 {ready['p95']}ms | max {ready['max']}ms")
+    print(f"   Fal requests:  {report['fal_requests']}")
+    print(f"   CPU:           {report['cpu_percent']}%")
+    print(f"   RSS:           {report['rss_mb']} MB (peak {report['rss_peak_mb']} MB)")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Print each metric against the baseline, return the regressed ones."""
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📐 VS BASELINE (tolerance {tolerance:.0%}){Colors.ENDC}")
+    regressions = []
+    for path, higher_is_better in COMPARED_METRICS:
+        current, reference = metric(report, path), metric(baseline, path)
+        if current is None or not reference:
+            continue
+        change = (current - reference) / reference
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        color = Colors.FAIL if regressed else Colors.OKGREEN
+        print(f"{color}   {path:<22} {reference:>9} -> {current:<9} ({change:+.1%}){Colors.ENDC}")
+        if regressed:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline BattleService pipeline benchmark")
+    parser.add_argument("--frames", default=DEFAULT_FRAMES_DIR, help="Recorded frames (<dir>/<role>/*.jpg)")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second sent for each role")
+    parser.add_argument("--duration", type=float, default=60.0, help="Benchmark duration in seconds")
+    parser.add_argument("--round-timeout", type=float, default=20.0, help="Max seconds per fight round")
+    parser.add_argument("--fal-latency", type=float, default=1.5, help="Fake Fal queue latency in seconds")
+    parser.add_argument("--bg-engine", choices=("auto", "vision", "rembg"), help="Background removal engine")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--output", help="Also write the full report (with every span) as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n{Colors.OKGREEN}✓ Baseline saved to {args.baseline}{Colors.ENDC}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n{Colors.WARNING}No baseline at {args.baseline} (run with --save-baseline){Colors.ENDC}")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(report, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n{Colors.FAIL}❌ Regressed: {', '.join(regressions)}{Colors.ENDC}")
+        return 1
+    print(f"\n{Colors.OKGREEN}✓ No regression{Colors.ENDC}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Socket.IO Load Test - How many camera clients the battle server sustains.
+
+Ramps up Socket.IO clients that each stream `process_frame` at a fixed FPS,
+while a probe measures /health latency (is the I/O loop still responsive?).
+The server's processed frame rate comes from /debug/traces (one finished
+trace per frame handled), as does the KNN (MobileNet) rate and latency
+(p95 since server start).
+Clients cycle through --variants slightly different frames (each from its
+own offset) so the change gate does not skip them, and the ramp only starts once /ready reports a
+warm extractor (otherwise the numbers would not include MobileNet).
+
+Against a running server:
+    python lab/benchmarks/loadtest_socketio.py --url http://127.0.0.1:5010 --clients 1,2,4,8,16
+
+Before/after (starts main_headless.py in each BATTLE_SERVER_MODE on :5010):
+    python lab/benchmarks/loadtest_socketio.py --spawn threading,asgi
+
+A step is "supported" when every client connected and kept its FPS (a
+blocked socket slows the sender down), the server processed at least
+--min-ratio of the frames sent, and /health p95 stayed under --max-latency-ms.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from io import BytesIO
+
+import requests
+import socketio
+from PIL import Image, ImageDraw
+
+# ANSI Colors
+class Colors:
+    HEADER = '\033[95m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+# lab/benchmarks -> lab -> root -> back
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+back_dir = os.path.join(os.path.dirname(os.path.dirname(bench_dir)), "back")
+
+ROLES = ("dream", "nightmare")
+
+
+def load_frames(path: str, variants: int) -> list:
+    """Camera-sized JPEGs, as sent by the frontend, each with a different stroke."""
+    base = Image.open(path).convert("RGB").resize((640, 480))
+    frames = []
+    for n in range(max(1, variants)):
+        image = base.copy()
+        if n:
+            ImageDraw.Draw(image).rectangle((40 * n % 560, 60, 40 * n % 560 + 80, 420), fill=(20, 20, 20))
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def span_stats(url: str) -> dict:
+    return requests.get(f"{url}/debug/traces", params={"limit": 0}, timeout=10).json().get("spans", {})
+
+
+def wait_ready(url: str, timeout: float = 300) -> dict:
+    """Readiness of the KNN extractor, waiting while it loads."""
+    deadline = time.time() + timeout
+    while True:
+        response = requests.get(f"{url}/ready", timeout=5)
+        readiness = response.json()
+        if response.ok or readiness.get("state") == "failed" or time.time() > deadline:
+            return readiness
+        time.sleep(0.5)
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+# --- LOAD ---
+
+def stream_frames(url: str, role: str, frames: list, offset: int, fps: float, stop: threading.Event, result: dict):
+    client = socketio.Client(reconnection=False)
+    try:
+        client.connect(url, transports=["websocket"], wait_timeout=10)
+    except Exception as e:
+        result["error"] = str(e)
+        return
+    interval = 1.0 / fps
+    next_tick = time.perf_counter()
+    try:
+        while not stop.is_set():
+            sent = result.get("sent", 0)
+            client.emit("process_frame", {"role": role, "image": frames[(sent + offset) % len(frames)]})
+            result["sent"] = sent + 1
+            next_tick += interval
+            stop.wait(max(0.0, next_tick - time.perf_counter()))
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        client.disconnect()
+
+
+def probe_health(url: str, stop: threading.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            requests.get(f"{url}/health", timeout=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except requests.RequestException:
+            latencies.append(5000.0)
+        stop.wait(0.1)
+
+
+def run_step(url: str, clients: int, fps: float, duration: float, frames: list) -> dict:
+    stop = threading.Event()
+    results = [{} for _ in range(clients)]
+    latencies = []
+    threads = [
+        threading.Thread(target=stream_frames, args=(url, ROLES[i % len(ROLES)], frames, i, fps, stop, results[i]), daemon=True)
+        for i in range(clients)
+    ]
+    threads.append(threading.Thread(target=probe_health, args=(url, stop, latencies), daemon=True))
+
+    before = span_stats(url)
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=10)
+    elapsed = time.perf_counter() - start
+    time.sleep(1.0)  # Let in-flight frames finish their traces
+    after = span_stats(url)
+    processed = after.get("total", {}).get("count", 0) - before.get("total", {}).get("count", 0)
+    knn_runs = after.get("knn", {}).get("count", 0) - before.get("knn", {}).get("count", 0)
+
+    sent = sum(r.get("sent", 0) for r in results)
+    return {
+        "clients": clients,
+        "connected": sum(1 for r in results if "error" not in r),
+        "sent_fps": round(sent / elapsed, 1),
+        "processed_fps": round(processed / elapsed, 1),
+        "knn_fps": round(knn_runs / elapsed, 1),
+        "knn_p95_ms": after.get("knn", {}).get("p95_ms", 0.0),
+        "health_p50_ms": round(percentile(latencies, 50), 1),
+        "health_p95_ms": round(percentile(latencies, 95), 1),
+    }
+
+
+def run_ramp(url: str, args, frames: list) -> list:
+    readiness = wait_ready(url)
+    if not readiness.get("ready"):
+        print(f"{Colors.WARNING}⚠️ KNN extractor not ready ({readiness.get('state')}: {readiness.get('error')}) - "
+              f"frames will not run MobileNet{Colors.ENDC}")
+    else:
+        print(f"{Colors.OKCYAN}   extractor: {readiness.get('backend')} {readiness.get('input_size')}px, "
+              f"warm-up {readiness.get('warmup_ms')}ms{Colors.ENDC}")
+    steps = []
+    for clients in args.clients:
+        step = run_step(url, clients, args.fps, args.duration, frames)
+        step["supported"] = (
+            step["connected"] == clients
+            and step["sent_fps"] >= args.min_ratio * clients * args.fps
+            and step["processed_fps"] >= args.min_ratio * step["sent_fps"]
+            and step["health_p95_ms"] <= args.max_latency_ms
+        )
+        color = Colors.OKGREEN if step["supported"] else Colors.FAIL
+        print(f"{color}   {clients:>3} clients | connected {step['connected']:>3} | sent {step['sent_fps']:>6} fps | "
+              f"processed {step['processed_fps']:>6} fps | KNN {step['knn_fps']:>5}/s p95 {step['knn_p95_ms']}ms | /health p50 {step['health_p50_ms']}ms "
+              f"p95 {step['health_p95_ms']}ms{Colors.ENDC}")
+        steps.append(step)
+    return steps
+
+
+def supported_clients(steps: list) -> int:
+    best = 0
+    for step in steps:
+        if not step["supported"]:
+            break
+        best = step["clients"]
+    return best
+
+
+# --- SERVER ---
+
+def spawn_server(mode: str, url: str) -> subprocess.Popen:
+    env = dict(os.environ, BATTLE_SERVER_MODE=mode)
+    process = subprocess.Popen([sys.executable, "main_headless.py"], cwd=back_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"main_headless.py ({mode}) exited with {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"main_headless.py ({mode}) did not come up on {url}")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO camera client load test")
+    parser.add_argument("--url", default="http://127.0.0.1:5010", help="Battle server URL")
+    parser.add_argument("--spawn", help="Comma-separated server modes to start and compare (threading,asgi)")
+    parser.add_argument("--clients", default="1,2,4,8,16", help="Comma-separated client counts")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--frame", default=os.path.join(bench_dir, "original.png"), help="Image sent as the frame")
+    parser.add_argument("--variants", type=int, default=8, help="Distinct frames cycled per client (1 = identical frames)")
+    parser.add_argument("--min-ratio", type=float, default=0.9, help="Min processed/sent ratio of a supported step")
+    parser.add_argument("--max-latency-ms", type=float, default=250.0, help="Max /health p95 of a supported step")
+    args = parser.parse_args()
+    args.clients = [int(n) for n in args.clients.split(",")]
+
+    frames = load_frames(args.frame, args.variants)
+    modes = args.spawn.split(",") if args.spawn else [None]
+    summary = {}
+
+    for mode in modes:
+        print(f"\n{Colors.HEADER}{Colors.BOLD}📡 {mode or args.url} - {args.fps} fps/client, "
+              f"{args.duration}s/step{Colors.ENDC}")
+        process = spawn_server(mode, args.url) if mode else None
+        try:
+            steps = run_ramp(args.url, args, frames)
+        finally:
+            if process:
+                stop_server(process)
+        summary[mode or args.url] = (supported_clients(steps), max(s["processed_fps"] for s in steps))
+
+    print(f"\n{Colors.HEADER}{Colors.BOLD}📊 SUMMARY{Colors.ENDC}")
+    for name, (clients, fps) in summary.items():
+        print(f"{Colors.OKCYAN}   {name:<24} supported clients: {clients:<4} peak processed: {fps} fps{Colors.ENDC}")
+
+
+if __name__ == "__main__":
+    main()